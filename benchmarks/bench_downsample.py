@@ -0,0 +1,78 @@
+"""Benchmark for server-side downsampling at the sizes ``maxPoints`` is meant for.
+
+Runs min/max buckets and LTTB over a full live cache (14 days of 15 s samples) and over
+extended-range interval series (15-minute intervals for 1 and 3 years), timing the pure-Python
+loops against the NumPy path when NumPy is installed.
+
+    python benchmarks/bench_downsample.py --max-points 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import Any, Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from dashboard.api import downsample  # noqa: E402
+
+SERIES = {
+    "live 14d @ 15s": (14 * 86400 // 15, 15),
+    "interval 1y @ 15m": (365 * 96, 900),
+    "interval 3y @ 15m": (3 * 365 * 96, 900),
+}
+
+
+def make_series(count: int, native_seconds: int) -> tuple[array, array]:
+    # Same column types the live cache hands to downsample_indices.
+    epochs = array("q", (1_700_000_000 + index * native_seconds for index in range(count)))
+    values = array("d", (400.0 + 150.0 * math.sin(index / 97.0) + (index * 7919) % 61 for index in range(count)))
+    values[count // 3] = 2500.0
+    return epochs, values
+
+
+def best_of(fn: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark downsampling paths")
+    parser.add_argument("--max-points", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    vectorized = downsample.np
+    paths = {"python": None}
+    if vectorized is not None:
+        paths["numpy"] = vectorized
+    else:
+        print("NumPy not installed: timing the pure-Python path only")
+
+    print(f"{'series':<20} {'points':>8} {'method':<7} " + " ".join(f"{name + ' ms':>10}" for name in paths))
+    for name, (count, native_seconds) in SERIES.items():
+        epochs, values = make_series(count, native_seconds)
+        for method in downsample.METHODS:
+            cells = []
+            results = []
+            for np_module in paths.values():
+                downsample.np = np_module
+                run = lambda: downsample.downsample_indices(epochs, values, args.max_points, native_seconds, method)
+                results.append(run())
+                cells.append(f"{best_of(run, args.repeat) * 1000:>10.1f}")
+            downsample.np = vectorized
+            assert all(result == results[0] for result in results), f"{method} paths disagree on {name}"
+            print(f"{name:<20} {count:>8} {method:<7} " + " ".join(cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Micro-benchmark for MQTT payload parsing.
+
+Compares the previous dispatch (``json.loads`` first, packed parser on
+``JSONDecodeError``) with format sniffing plus the packed fast path.
+
+    python benchmarks/bench_payload_parse.py --iterations 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from main import _parse_bool_field, _parse_int_field, parse_packed_pulse_payload, payload_looks_like_json  # noqa: E402
+
+PAYLOADS = {
+    "packed": "d=3,c=1234567",
+    "packed+flags": "d=3,c=1234567,r17Exclude=0,kyzInvalidAlarm=1",
+    "packed (general)": " d=3 , c=1234567 , r17Exclude=no ",
+    "json": '{"d": 3, "c": 1234567, "r17Exclude": false}',
+}
+
+
+def _parse_packed_general(raw_payload: str):
+    parsed = {}
+    for token in raw_payload.split(","):
+        if token.strip():
+            key, value = token.split("=", 1)
+            parsed[key.strip()] = value.strip()
+    return (
+        _parse_int_field(parsed, "d", "pulseDelta", required=False),
+        _parse_int_field(parsed, "c", "pulseTotal", "t", required=False),
+        _parse_bool_field(parsed, "r17Exclude"),
+        _parse_bool_field(parsed, "kyzInvalidAlarm"),
+    )
+
+
+def _parse_json(payload: dict):
+    return (
+        _parse_int_field(payload, "d", "pulseDelta", required=False),
+        _parse_int_field(payload, "c", "pulseTotal", "t", required=False),
+        _parse_bool_field(payload, "r17Exclude"),
+        _parse_bool_field(payload, "kyzInvalidAlarm"),
+    )
+
+
+def legacy_dispatch(raw_payload: str):
+    try:
+        return _parse_json(json.loads(raw_payload))
+    except json.JSONDecodeError:
+        return _parse_packed_general(raw_payload)
+
+
+def sniffing_dispatch(raw_payload: str):
+    if payload_looks_like_json(raw_payload):
+        return _parse_json(json.loads(raw_payload))
+    return parse_packed_pulse_payload(raw_payload)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark MQTT payload parsing paths")
+    parser.add_argument("--iterations", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'payload':<18} {'legacy us/msg':>14} {'sniffed us/msg':>15} {'speedup':>8}")
+    for name, raw_payload in PAYLOADS.items():
+        assert legacy_dispatch(raw_payload) == sniffing_dispatch(raw_payload), name
+        legacy = min(timeit.repeat(lambda: legacy_dispatch(raw_payload), number=args.iterations, repeat=args.repeat))
+        sniffed = min(timeit.repeat(lambda: sniffing_dispatch(raw_payload), number=args.iterations, repeat=args.repeat))
+        print(
+            f"{name:<18} {legacy / args.iterations * 1e6:>14.2f} {sniffed / args.iterations * 1e6:>15.2f} "
+            f"{legacy / sniffed:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
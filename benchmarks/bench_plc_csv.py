@@ -0,0 +1,117 @@
+"""Benchmark for PLC CSV parsing on a synthetic multi-year export.
+
+Compares the previous ``csv.DictReader`` + ``strptime`` + ``re.search`` parser with the current
+list, streaming and columnar paths, reporting rows/s and peak traced memory for each.
+
+    python benchmarks/bench_plc_csv.py --years 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from plc_csv import REQUIRED_COLUMNS, iter_plc_csv, iter_plc_csv_columns, parse_plc_csv  # noqa: E402
+
+HEADER = (
+    "Date, Time, Sys_Year, Sys_Month, Sys_Day, Sys_Hour, Sys_Minute, Sys_Second, counter15min, LastEnergyUsage, "
+    "LastDemand, TotalEnergyUsed, R17_Last_ExcludeDemand, KYZ_InvalidAlarm, KYZ_InvalidAlarmCount, KYZ_InvalidAlarmCountHourly"
+)
+
+
+def write_csv(path: Path, years: float) -> int:
+    rows = int(years * 365 * 96)
+    start = datetime(2020, 1, 1)
+    total = 0.0
+    with path.open("w", encoding="utf-8", newline="") as handle:
+        handle.write(HEADER + "\n")
+        for i in range(rows):
+            end = start + timedelta(minutes=15 * (i + 1))
+            pulses = 400 + (i * 37) % 300
+            total += pulses * 1.7
+            r17 = "ON - 1" if i % 97 == 0 else "OFF - 0"
+            handle.write(
+                f"{end.month}/{end.day}/{end.year}, {end:%H:%M:%S}.{i % 1000:03d}, {end.year}, {end.month}, {end.day}, "
+                f"{end.hour}, {end.minute}, 0, {pulses}, {pulses * 1.7:.3f}, {pulses * 6.8:.6f}, {total:.3f}, {r17}, OFF - 0, 0, 0\n"
+            )
+    return rows
+
+
+def legacy_parse_plc_csv(path: Path) -> list[dict]:
+    def parse_flag(value: str) -> int:
+        match = re.search(r"([01])\s*$", (value or "").strip())
+        return int(match.group(1)) if match else 0
+
+    with path.open("r", encoding="utf-8-sig", newline="") as handle:
+        reader = csv.DictReader(handle)
+        missing = REQUIRED_COLUMNS - {header.strip() for header in reader.fieldnames or []}
+        if missing:
+            raise ValueError(f"CSV missing required columns: {', '.join(sorted(missing))}")
+        deduped: dict[datetime, dict] = {}
+        for raw_row in reader:
+            row = {str(key).strip(): value for key, value in raw_row.items() if key is not None}
+            interval_end = datetime.strptime(f"{row['Date'].strip()} {row['Time'].strip().split('.', 1)[0]}", "%m/%d/%Y %H:%M:%S")
+            deduped[interval_end] = {
+                "IntervalEnd": interval_end,
+                "PulseCount": int(float(row["counter15min"].strip())),
+                "kWh": float(row["LastEnergyUsage"].strip()),
+                "kW": float(row["LastDemand"].strip()),
+                "Total_kWh": float(row["TotalEnergyUsed"].strip()),
+                "R17Exclude": parse_flag(row.get("R17_Last_ExcludeDemand", "")),
+                "KyzInvalidAlarm": parse_flag(row.get("KYZ_InvalidAlarm", "")),
+            }
+    return [deduped[key] for key in sorted(deduped)]
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> tuple[float, int]:
+    best = min(_timed(fn) for _ in range(repeat))
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def _timed(fn: Callable[[], Any]) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark PLC CSV parsing paths")
+    parser.add_argument("--years", type=float, default=3.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "plc_history.csv"
+        rows = write_csv(path, args.years)
+        assert legacy_parse_plc_csv(path) == parse_plc_csv(path)
+        print(f"{rows} rows, {path.stat().st_size / 1e6:.1f} MB")
+
+        cases = {
+            "legacy (DictReader)": lambda: legacy_parse_plc_csv(path),
+            "parse_plc_csv": lambda: parse_plc_csv(path),
+            "iter_plc_csv": lambda: deque(iter_plc_csv(path), maxlen=0),
+            "iter_plc_csv_columns": lambda: deque(iter_plc_csv_columns(path), maxlen=0),
+        }
+        print(f"{'parser':<22} {'seconds':>8} {'krows/s':>8} {'peak MB':>8}")
+        for name, fn in cases.items():
+            seconds, peak = measure(fn, args.repeat)
+            print(f"{name:<22} {seconds:>8.2f} {rows / seconds / 1000:>8.0f} {peak / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
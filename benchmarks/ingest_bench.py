@@ -0,0 +1,225 @@
+"""End-to-end ingestion benchmark with a local MQTT stand-in and a SQLite sink.
+
+Synthetic packed/JSON pulse streams for N meters are delivered straight to
+``MqttSqlService.on_message``-equivalent ``handle_message`` calls (no broker
+round trip), using simulated receive timestamps so live and interval buckets
+close at full speed. Finalized rows flow through the real ``BucketWriter`` into
+an in-memory SQLite stand-in for ``IntervalIngestor``.
+
+    python benchmarks/ingest_bench.py --meters 20 --messages 200000
+    python benchmarks/ingest_bench.py --meters 1 --rate 50 --duration 10 --format json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from main import BatchWriteResult, MqttSqlService, _percentile  # noqa: E402
+
+START_EPOCH = int(datetime(2025, 1, 6, 0, 0).timestamp())
+
+
+class SqliteIngestor:
+    """Stand-in for IntervalIngestor with the same batch API and idempotent inserts."""
+
+    def __init__(self, path: str = ":memory:"):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.executescript(
+            """
+            CREATE TABLE KYZ_Interval (
+                IntervalEnd TEXT NOT NULL, MeterId TEXT NOT NULL, PulseCount INTEGER, kWh REAL, kW REAL,
+                Total_kWh REAL, R17Exclude INTEGER, KyzInvalidAlarm INTEGER, PRIMARY KEY (IntervalEnd, MeterId)
+            );
+            CREATE TABLE KYZ_Live15s (
+                SampleEnd TEXT NOT NULL, MeterId TEXT NOT NULL, PulseCount INTEGER, kWh REAL, kW REAL,
+                Total_kWh REAL, PRIMARY KEY (SampleEnd, MeterId)
+            );
+            """
+        )
+
+    def _insert(self, sql: str, params: list[tuple]) -> BatchWriteResult:
+        with self.lock:
+            before = self.conn.total_changes
+            self.conn.executemany(sql, params)
+            self.conn.commit()
+            inserted = self.conn.total_changes - before
+        return BatchWriteResult(inserted=inserted, deduplicated=len(params) - inserted)
+
+    def insert_interval_many(self, rows: list[dict]) -> BatchWriteResult:
+        return self._insert(
+            "INSERT OR IGNORE INTO KYZ_Interval VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    row["intervalEnd"].isoformat(),
+                    row.get("meterId", "main"),
+                    row["pulseCount"],
+                    row["kWh"],
+                    row["kW"],
+                    row["total_kWh"],
+                    1 if row.get("r17Exclude") else 0,
+                    1 if row.get("kyzInvalidAlarm") else 0,
+                )
+                for row in rows
+            ],
+        )
+
+    def insert_live_many(self, rows: list[dict]) -> BatchWriteResult:
+        return self._insert(
+            "INSERT OR IGNORE INTO KYZ_Live15s VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (row["sampleEnd"].isoformat(), row.get("meterId", "main"), row["pulseCount"], row["kWh"], row["kW"], row["total_kWh"])
+                for row in rows
+            ],
+        )
+
+    def row_counts(self) -> tuple[int, int]:
+        with self.lock:
+            intervals = self.conn.execute("SELECT COUNT(*) FROM KYZ_Interval").fetchone()[0]
+            live = self.conn.execute("SELECT COUNT(*) FROM KYZ_Live15s").fetchone()[0]
+        return intervals, live
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+
+def synthetic_stream(meters: int, messages: int, cadence_seconds: float, payload_format: str):
+    """Yield (topic, payload bytes, simulated receive epoch) in arrival order."""
+    totals = [1_000_000 * (index + 1) for index in range(meters)]
+    for sequence in range(messages):
+        meter = sequence % meters
+        delta = 1 + (sequence * 7 + meter) % 5
+        totals[meter] += delta
+        if payload_format == "json" or (payload_format == "mixed" and sequence % 2):
+            payload = json.dumps({"d": delta, "c": totals[meter]}).encode()
+        else:
+            payload = f"d={delta},c={totals[meter]}".encode()
+        yield f"pri/energy/m{meter}/pulseCount", payload, START_EPOCH + (sequence // meters) * cadence_seconds
+
+
+def peak_rss_mb() -> float | None:
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS bytes.
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        try:
+            import psutil  # type: ignore[import-not-found]
+
+            return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+        except (ImportError, AttributeError):
+            return None
+
+
+def run_benchmark(
+    meters: int,
+    messages: int,
+    cadence_seconds: float,
+    payload_format: str,
+    rate: float,
+    batch_max_rows: int,
+) -> dict:
+    os.environ.setdefault("MQTT_HOST", "localhost")
+    os.environ.setdefault("KYZ_PULSES_PER_KWH", "1")
+    os.environ["MQTT_TOPIC_PULSE"] = "pri/energy/+/pulseCount"
+    os.environ["KYZ_MAX_METERS"] = str(max(meters, 1))
+    os.environ["INGEST_BATCH_MAX_ROWS"] = str(batch_max_rows)
+    os.environ["INGEST_QUEUE_STATS_LOG_SECONDS"] = "3600"
+
+    logger = logging.getLogger("ingest_bench")
+    ingestor = SqliteIngestor()
+    service = MqttSqlService(logger, ingestor)  # type: ignore[arg-type]
+    service.start_processing()
+
+    handle_us: list[float] = []
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for sequence, (topic, payload, receive_epoch) in enumerate(
+        synthetic_stream(meters, messages, cadence_seconds, payload_format)
+    ):
+        if rate > 0:
+            delay = wall_start + sequence / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        started = time.perf_counter()
+        service.handle_message(topic, payload, datetime.fromtimestamp(receive_epoch))
+        handle_us.append((time.perf_counter() - started) * 1e6)
+    feed_seconds = time.perf_counter() - wall_start
+
+    # Close every open bucket and wait for the writer to commit them.
+    service._flush_closed_buckets(datetime.fromtimestamp(START_EPOCH + messages * cadence_seconds + 3600))
+    service.writer.stop()
+    wall_seconds = time.perf_counter() - wall_start
+    cpu_seconds = time.process_time() - cpu_start
+
+    stats = service.writer.stats()
+    intervals, live = ingestor.row_counts()
+    ingestor.close()
+    handle_us.sort()
+    return {
+        "meters": meters,
+        "messages": messages,
+        "format": payload_format,
+        "feedSeconds": round(feed_seconds, 3),
+        "wallSeconds": round(wall_seconds, 3),
+        "messagesPerSecond": round(messages / feed_seconds, 1) if feed_seconds > 0 else None,
+        "handleUsP50": _percentile(handle_us, 50),
+        "handleUsP99": _percentile(handle_us, 99),
+        "commitLatencyMsP50": stats["latencyMsP50"],
+        "commitLatencyMsP99": stats["latencyMsP99"],
+        "rowsCommitted": stats["committed"],
+        "intervalRows": intervals,
+        "liveRows": live,
+        "dropped": stats["dropped"],
+        "cpuSeconds": round(cpu_seconds, 3),
+        "cpuPercent": round(100.0 * cpu_seconds / wall_seconds, 1) if wall_seconds > 0 else None,
+        "peakRssMb": peak_rss_mb(),
+    }
+
+
+def _fmt(value: float | None, digits: int = 1) -> str:
+    return "-" if value is None else f"{value:.{digits}f}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the MQTT -> SQL ingestion hot path")
+    parser.add_argument("--meters", type=int, default=1)
+    parser.add_argument("--messages", type=int, default=None, help="Total messages (default: rate * duration, or 100000)")
+    parser.add_argument("--rate", type=float, default=0.0, help="Target messages/s across all meters (0 = as fast as possible)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run when --rate is set and --messages is not")
+    parser.add_argument("--cadence", type=float, default=1.0, help="Simulated seconds between messages from one meter")
+    parser.add_argument("--format", choices=("packed", "json", "mixed"), default="packed")
+    parser.add_argument("--batch-max-rows", type=int, default=500)
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    args = parser.parse_args()
+
+    messages = args.messages or (int(args.rate * args.duration) if args.rate > 0 else 100_000)
+    result = run_benchmark(args.meters, messages, args.cadence, args.format, args.rate, args.batch_max_rows)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    print(f"meters={result['meters']} messages={result['messages']} format={result['format']}")
+    print(f"  throughput     {_fmt(result['messagesPerSecond'])} msg/s (feed {result['feedSeconds']}s, total {result['wallSeconds']}s)")
+    print(f"  handle         p50 {_fmt(result['handleUsP50'])} us   p99 {_fmt(result['handleUsP99'])} us")
+    print(f"  enqueue->commit p50 {_fmt(result['commitLatencyMsP50'], 2)} ms   p99 {_fmt(result['commitLatencyMsP99'], 2)} ms")
+    print(f"  rows           interval={result['intervalRows']} live={result['liveRows']} dropped={result['dropped']}")
+    print(f"  cpu            {result['cpuSeconds']}s ({_fmt(result['cpuPercent'])}%)   peak RSS {_fmt(result['peakRssMb'])} MB")
+
+
+if __name__ == "__main__":
+    main()
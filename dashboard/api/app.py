@@ -1,52 +1,40 @@
-import json
+import functools
 import logging
 import os
 import sys
 import time
-from dataclasses import dataclass
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from datetime import datetime, timedelta
 from logging.handlers import TimedRotatingFileHandler
 from pathlib import Path
 from threading import Lock
-from typing import Any, Callable, Iterator
+from typing import Annotated, Any, AsyncIterator, Callable, Iterator, TypeVar
 
 import pyodbc
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 
 from dashboard.api.analytics import BillingMonth, TariffConfig, annualized_peak_cost, compute_billing_series
+from dashboard.api.billing_engine import BillingEngine
 from dashboard.api.billing_periods import add_months_clamped, billing_period_end, parse_billing_anchor
+from dashboard.api.columnar import BINARY_MEDIA_TYPE, Column, encode_binary, encode_columns_json, negotiate_format
+from dashboard.api.conditional import CONDITIONAL_DATASETS, build_etag, dataset_version, etag_matches, version_end
+from dashboard.api.db_executor import DbExecutor, EndpointBusyError
+from dashboard.api.db_pool import ConnectionPool
+from dashboard.api.downsample import METHODS as DOWNSAMPLE_METHODS, downsample_indices
+from dashboard.api.live_cache import LiveSampleCache, live_points, naive_epoch
+from dashboard.api.live_feed import LiveFeed
+from dashboard.api.perf import PROMETHEUS_MEDIA_TYPE, PerfRecorder, TimedLease
+from dashboard.api.ttl_cache import TTLCache
 from dashboard.api.usage_store import UsageStore
 
 load_dotenv()
 
 
-@dataclass
-class CacheEntry:
-    expires_at: float
-    payload: Any
-
-
-class TTLCache:
-    def __init__(self) -> None:
-        self._store: dict[str, CacheEntry] = {}
-        self._lock = Lock()
-
-    def get_or_set(self, key: str, ttl_seconds: int, producer: Callable[[], Any]) -> Any:
-        now = time.time()
-        with self._lock:
-            cached = self._store.get(key)
-            if cached and cached.expires_at > now:
-                return cached.payload
-        payload = producer()
-        with self._lock:
-            self._store[key] = CacheEntry(expires_at=now + ttl_seconds, payload=payload)
-        return payload
-
-
 def configure_logging() -> logging.Logger:
     logs_dir = Path("logs")
     logs_dir.mkdir(parents=True, exist_ok=True)
@@ -79,8 +67,11 @@ def configure_logging() -> logging.Logger:
 
 
 logger = configure_logging()
-cache = TTLCache()
+cache = TTLCache(max_entries=int(os.getenv("DASHBOARD_CACHE_MAX_ENTRIES", "256")), logger=logger)
+# Stale-while-revalidate window for endpoints whose data is historical (daily, billing); others never serve stale.
+CACHE_STALE_SECONDS = float(os.getenv("DASHBOARD_CACHE_STALE_SECONDS", "300"))
 usage_store = UsageStore()
+perf = PerfRecorder(slow_query_ms=float(os.getenv("DASHBOARD_SLOW_QUERY_MS", "500")), logger=logger)
 
 
 def get_usage_retention_days() -> int:
@@ -101,6 +92,11 @@ def get_series_max_days() -> int:
     return int(os.getenv("API_SERIES_MAX_DAYS", "60"))
 
 
+def get_use_rollups() -> bool:
+    # Needs sql/012_rollups.sql applied and kept current (SQL_UPDATE_ROLLUPS / rollup_catchup.py).
+    return os.getenv("DASHBOARD_USE_ROLLUPS", "false").strip().lower() in {"1", "true", "yes"}
+
+
 def get_allow_extended_ranges() -> bool:
     return os.getenv("API_ALLOW_EXTENDED_RANGE", "false").strip().lower() in {"1", "true", "yes"}
 
@@ -140,8 +136,70 @@ def resolve_dashboard_sql_credentials() -> tuple[str, str, str]:
     return os.getenv("SQL_USERNAME", ""), os.getenv("SQL_PASSWORD", ""), "rw"
 
 
-def get_db_connection() -> pyodbc.Connection:
-    return pyodbc.connect(get_sql_connection_string(), autocommit=True)
+def get_dashboard_meter_id() -> str:
+    # Never unscoped: without a meter, row-level security shows every meter and sub-meters
+    # would be summed into billing, KPIs and series.
+    return os.getenv("DASHBOARD_METER_ID", "").strip() or "main"
+
+
+def open_db_connection() -> pyodbc.Connection:
+    conn = pyodbc.connect(get_sql_connection_string(), autocommit=True)
+    # Row-level security from sql/011_multi_meter.sql filters every query to this meter;
+    # harmless before that migration, when there is only one meter.
+    conn.execute(
+        "EXEC sys.sp_set_session_context @key = N'kyz_meter_id', @value = ?, @read_only = 1",
+        get_dashboard_meter_id(),
+    )
+    return conn
+
+
+_db_pool: ConnectionPool | None = None
+_db_pool_lock = Lock()
+
+
+def get_db_pool_size() -> int:
+    return int(os.getenv("DASHBOARD_DB_POOL_SIZE", "8"))
+
+
+def get_db_pool() -> ConnectionPool:
+    global _db_pool
+    with _db_pool_lock:
+        if _db_pool is None:
+            _db_pool = ConnectionPool(
+                open_db_connection,
+                max_size=get_db_pool_size(),
+                max_lifetime_seconds=float(os.getenv("DASHBOARD_DB_POOL_MAX_LIFETIME_SECONDS", "1800")),
+                validate_after_idle_seconds=float(os.getenv("DASHBOARD_DB_POOL_VALIDATE_IDLE_SECONDS", "30")),
+                acquire_timeout_seconds=float(os.getenv("DASHBOARD_DB_POOL_TIMEOUT_SECONDS", "15")),
+                discard_on=(pyodbc.Error,),
+                logger=logger,
+            )
+        return _db_pool
+
+
+def get_db_connection() -> TimedLease:
+    return perf.lease(get_db_pool().lease())
+
+
+# Blocking handlers run here rather than in Starlette's shared threadpool; one worker per pooled connection.
+db_executor = DbExecutor(
+    max_workers=int(os.getenv("DASHBOARD_DB_EXECUTOR_WORKERS") or get_db_pool_size()),
+    max_concurrency=int(os.getenv("DASHBOARD_ENDPOINT_MAX_CONCURRENCY", "4")),
+    max_queue=int(os.getenv("DASHBOARD_ENDPOINT_MAX_QUEUE", "64")),
+)
+
+
+def get_db_pool_stats() -> dict[str, Any] | None:
+    with _db_pool_lock:
+        return _db_pool.stats() if _db_pool is not None else None
+
+
+def close_db_pool() -> None:
+    global _db_pool
+    with _db_pool_lock:
+        pool, _db_pool = _db_pool, None
+    if pool is not None:
+        pool.close()
 
 
 def row_to_latest(row: Any) -> dict[str, Any]:
@@ -194,7 +252,15 @@ def enforce_series_window(start_dt: datetime, end_dt: datetime) -> None:
         raise HTTPException(status_code=400, detail=f"Range exceeds limit of {max_days} days")
 
 
-app = FastAPI(title="Plant Energy Dashboard API")
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    yield
+    cache.close()
+    db_executor.close()
+    close_db_pool()
+
+
+app = FastAPI(title="Plant Energy Dashboard API", lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -204,6 +270,101 @@ app.add_middleware(
 )
 
 
+Handler = TypeVar("Handler", bound=Callable[..., Any])
+
+
+def db_route(path: str, method: str = "GET", **route_kwargs: Any) -> Callable[[Handler], Handler]:
+    """Register a blocking handler as an async route whose body runs on ``db_executor``.
+
+    The plain function is returned unchanged so other handlers and tests can still call it directly.
+    """
+
+    def decorator(handler: Handler) -> Handler:
+        @functools.wraps(handler)
+        async def endpoint(*args: Any, **kwargs: Any) -> Any:
+            result = await db_executor.run(path, handler, *args, **kwargs)
+            perf.mark_handler_done()
+            return result
+
+        app.add_api_route(path, endpoint, methods=[method], **route_kwargs)
+        return handler
+
+    return decorator
+
+
+@app.exception_handler(EndpointBusyError)
+async def endpoint_busy_handler(_request: Request, exc: EndpointBusyError) -> JSONResponse:
+    return JSONResponse(status_code=503, content={"detail": f"{exc} is busy; retry shortly"}, headers={"Retry-After": "1"})
+
+
+def fetch_dataset_versions() -> dict[str, str]:
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT
+                (SELECT MAX(IntervalEnd) FROM dbo.KYZ_Interval) AS interval_end,
+                (SELECT COUNT_BIG(*) FROM dbo.KYZ_Interval) AS interval_rows,
+                (SELECT MAX(SampleEnd) FROM dbo.KYZ_Live15s) AS live_end,
+                (SELECT COUNT_BIG(*) FROM dbo.KYZ_Live15s) AS live_rows
+            """
+        )
+        row = cursor.fetchone()
+    return {
+        "interval": dataset_version(row.interval_end, row.interval_rows),
+        "live": dataset_version(row.live_end, row.live_rows),
+    }
+
+
+def get_dataset_versions() -> dict[str, str]:
+    # One version probe per TTL however many screens poll; never served stale.
+    ttl = float(os.getenv("DASHBOARD_VERSION_TTL_SECONDS", "5"))
+    return cache.get_or_set("dataset-versions", ttl_seconds=ttl, producer=fetch_dataset_versions, stale_seconds=0)
+
+
+# Versions the current request's ETag was built from (set by conditional_get_middleware).
+_request_versions: ContextVar[dict[str, str] | None] = ContextVar("kyz_request_versions", default=None)
+
+
+def request_dataset_version(name: str) -> str:
+    """Cached payloads key on this, so a body is never older than the version its ETag names."""
+    versions = _request_versions.get()
+    return versions.get(name, "") if versions else ""
+
+
+# Registered before auth_middleware so that it runs inside it: unauthenticated requests never reach it.
+@app.middleware("http")
+async def conditional_get_middleware(request: Request, call_next: Callable[..., Any]) -> Response:
+    datasets = CONDITIONAL_DATASETS.get(request.url.path)
+    if request.method != "GET" or datasets is None:
+        return await call_next(request)
+    try:
+        versions = await db_executor.run("dataset-versions", get_dataset_versions)
+    except Exception:
+        logger.exception("Dataset version probe failed; serving without ETag")
+        return await call_next(request)
+
+    etag = build_etag(
+        request.url.path,
+        request.query_params.multi_items(),
+        request.headers.get("accept"),
+        versions,
+        datasets,
+        time.time(),
+    )
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    token = _request_versions.set(versions)
+    try:
+        response = await call_next(request)
+    finally:
+        _request_versions.reset(token)
+    if response.status_code == 200:
+        response.headers.update(headers)
+    return response
+
+
 @app.middleware("http")
 async def auth_middleware(request: Request, call_next: Callable[..., Any]) -> JSONResponse:
     if request.url.path.startswith("/api"):
@@ -215,9 +376,27 @@ async def auth_middleware(request: Request, call_next: Callable[..., Any]) -> JS
     return await call_next(request)
 
 
+# Registered last so that it is outermost and times auth, ETag checks and the handler alike.
+@app.middleware("http")
+async def perf_middleware(request: Request, call_next: Callable[..., Any]) -> Response:
+    trace = perf.start_request()
+    trace.route = request.url.path
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        # Route templates keep label cardinality bounded; the event stream stays open for minutes.
+        trace.route = getattr(route, "path", None) or "unmatched"
+        if trace.route != "/api/stream":
+            perf.observe_request(request.method, trace.route, status, trace)
+
+
 
 
-@app.post("/api/usage/pageview")
+@db_route("/api/usage/pageview", method="POST")
 def track_page_view(payload: dict[str, Any]) -> dict[str, bool]:
     raw_path = str(payload.get("path", ""))
     try:
@@ -229,7 +408,7 @@ def track_page_view(payload: dict[str, Any]) -> dict[str, bool]:
     return {"ok": True}
 
 
-@app.get("/api/usage/summary")
+@db_route("/api/usage/summary")
 def get_usage_summary(days: int = 30) -> dict[str, Any]:
     days = max(1, min(days, 365))
     try:
@@ -239,7 +418,7 @@ def get_usage_summary(days: int = 30) -> dict[str, Any]:
         logger.exception("Failed to read usage summary")
         raise HTTPException(status_code=500, detail="Failed to fetch usage summary")
 
-@app.get("/api/health")
+@db_route("/api/health")
 def get_health() -> dict[str, Any]:
     server_time = datetime.now()
     db_connected = False
@@ -284,7 +463,45 @@ def get_health() -> dict[str, Any]:
     }
 
 
-@app.get("/api/metrics")
+@app.get("/api/cache/stats")
+async def get_cache_stats() -> dict[str, Any]:
+    return cache.stats()
+
+
+def cache_hit_ratio(stats: dict[str, Any]) -> float | None:
+    served = stats["hits"] + stats["staleHits"] + stats["coalesced"]
+    lookups = served + stats["misses"]
+    return round(served / lookups, 4) if lookups else None
+
+
+@app.get("/api/perf")
+async def get_perf(reset: bool = False) -> dict[str, Any]:
+    cache_stats = cache.stats()
+    payload = {
+        **perf.stats(),
+        "cache": {**cache_stats, "hitRatio": cache_hit_ratio(cache_stats)},
+        "dbPool": get_db_pool_stats(),
+        "dbExecutor": db_executor.stats(),
+    }
+    if reset:
+        perf.reset()
+    return payload
+
+
+@app.get("/api/perf/prometheus")
+async def get_perf_prometheus() -> Response:
+    cache_stats = cache.stats()
+    pool_stats = get_db_pool_stats() or {}
+    gauges = {
+        "kyz_cache_hit_ratio": cache_hit_ratio(cache_stats),
+        "kyz_cache_entries": cache_stats["entries"],
+        "kyz_db_pool_in_use": pool_stats.get("inUse"),
+        "kyz_db_pool_wait_p99_seconds": pool_stats["waitMsP99"] / 1000.0 if pool_stats.get("waitMsP99") is not None else None,
+    }
+    return Response(content=perf.prometheus(gauges), media_type=PROMETHEUS_MEDIA_TYPE)
+
+
+@db_route("/api/metrics")
 def get_metrics() -> dict[str, Any]:
     try:
         with get_db_connection() as conn:
@@ -308,6 +525,12 @@ def get_metrics() -> dict[str, Any]:
             "rowCount24h": int(row.rows24h or 0),
             "r17Exclude24h": int(row.r17Exclude24h or 0),
             "kyzInvalidAlarm24h": int(row.kyzInvalidAlarm24h or 0),
+            "dbPool": get_db_pool_stats(),
+            "liveFeed": live_feed.stats(),
+            "liveCache": live_cache.stats(),
+            "billingEngine": billing_engine.stats(),
+            "cache": cache.stats(),
+            "dbExecutor": db_executor.stats(),
         }
     except Exception:
         logger.exception("Metrics query failed")
@@ -318,10 +541,16 @@ def get_metrics() -> dict[str, Any]:
             "rowCount24h": 0,
             "r17Exclude24h": 0,
             "kyzInvalidAlarm24h": 0,
+            "dbPool": get_db_pool_stats(),
+            "liveFeed": live_feed.stats(),
+            "liveCache": live_cache.stats(),
+            "billingEngine": billing_engine.stats(),
+            "cache": cache.stats(),
+            "dbExecutor": db_executor.stats(),
         }
 
 
-@app.get("/api/latest")
+@db_route("/api/latest")
 def get_latest() -> dict[str, Any]:
     with get_db_connection() as conn:
         cursor = conn.cursor()
@@ -338,8 +567,68 @@ def get_latest() -> dict[str, Any]:
         return row_to_latest(row)
 
 
-@app.get("/api/live/latest")
+INTERVAL_SECONDS = 15 * 60
+LIVE_SAMPLE_SECONDS = 15
+
+
+def parse_downsample_method(raw: str) -> str:
+    method = raw.strip().lower()
+    if method not in DOWNSAMPLE_METHODS:
+        raise HTTPException(status_code=400, detail="downsample must be 'minmax' or 'lttb'")
+    return method
+
+
+def series_resolution(source_points: int, points: int, bucket_seconds: int, max_points: int | None, method: str) -> dict[str, Any]:
+    return {
+        "bucketSeconds": bucket_seconds,
+        "sourcePoints": source_points,
+        "points": points,
+        "downsampled": points < source_points,
+        "method": method if max_points is not None else None,
+    }
+
+
+def fetch_live_samples_since(since: datetime) -> list[Any]:
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        # No MeterId column: row-level security (sql/011) already scopes this to the session's
+        # meter, and before sql/008/011 the column does not exist.
+        cursor.execute(
+            """
+            SELECT SampleEnd, PulseCount, kWh, kW, Total_kWh
+            FROM dbo.KYZ_Live15s
+            WHERE SampleEnd >= ?
+            ORDER BY SampleEnd ASC
+            """,
+            since,
+        )
+        return cursor.fetchall()
+
+
+live_cache = LiveSampleCache(
+    fetch_live_samples_since,
+    meter_id=get_dashboard_meter_id(),
+    retention_seconds=max(0, int(os.getenv("DASHBOARD_LIVE_CACHE_HOURS", str(24 * 14)))) * 3600,
+    refresh_seconds=float(os.getenv("DASHBOARD_LIVE_CACHE_REFRESH_SECONDS", "5")),
+    logger=logger,
+)
+
+
+def refresh_live_cache(now: datetime | None = None) -> None:
+    # Skip the refresh throttle when the request's ETag already names a newer sample than the cache holds.
+    live_end = version_end(request_dataset_version("live"))
+    live_cache.refresh(now=now, force=live_end is not None and not live_cache.has_through(live_end))
+
+
+@db_route("/api/live/latest")
 def get_live_latest() -> dict[str, Any]:
+    if live_cache.enabled:
+        refresh_live_cache()
+        latest = live_cache.latest()
+        if latest is None:
+            raise HTTPException(status_code=404, detail="No live rows found")
+        return latest
+
     with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(
@@ -355,11 +644,58 @@ def get_live_latest() -> dict[str, Any]:
         return row_to_live_latest(row)
 
 
-@app.get("/api/live/series")
-def get_live_series(minutes: int = 240) -> dict[str, Any]:
+def series_start_after(start_dt: datetime, since: str | None) -> datetime:
+    """Delta fetch: only rows strictly newer than the client's last point (keys are whole seconds)."""
+    if not since:
+        return start_dt
+    return max(start_dt, parse_iso(since).replace(microsecond=0) + timedelta(seconds=1))
+
+
+def parse_response_format(format: str | None, accept: str | None) -> str:
+    try:
+        return negotiate_format(format, accept)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+def columnar_response(fmt: str, columns: list[Column], rows: int, meta: dict[str, Any]) -> Response:
+    """``columns`` JSON or ``binary`` typed arrays (dashboard/api/columnar.py) instead of row objects."""
+    headers = {"Vary": "Accept"}
+    if fmt == "binary":
+        return Response(encode_binary(columns, rows, meta), media_type=BINARY_MEDIA_TYPE, headers=headers)
+    return Response(encode_columns_json(columns, rows, meta), media_type="application/json", headers=headers)
+
+
+@db_route("/api/live/series", response_model=None)
+def get_live_series(
+    minutes: int = 240,
+    maxPoints: int | None = None,
+    downsample: str = "minmax",
+    since: str | None = None,
+    format: str | None = None,
+    accept: Annotated[str | None, Header()] = None,
+) -> dict[str, Any] | Response:
     minutes = max(1, min(minutes, 24 * 60 * 14))
     end_dt = datetime.now()
-    start_dt = end_dt - timedelta(minutes=minutes)
+    start_dt = series_start_after(end_dt - timedelta(minutes=minutes), since)
+    method = parse_downsample_method(downsample)
+    fmt = parse_response_format(format, accept)
+
+    if live_cache.enabled:
+        refresh_live_cache(now=end_dt)
+        if live_cache.covers(start_dt):
+            epochs, iso, kw, kwh = live_cache.window(start_dt, end_dt)
+            indices, bucket_seconds = None, LIVE_SAMPLE_SECONDS
+            if maxPoints is not None:
+                indices, bucket_seconds = downsample_indices(epochs, kw, max(2, maxPoints), LIVE_SAMPLE_SECONDS, method)
+            if fmt != "rows":
+                if indices is not None:
+                    epochs, kw, kwh = ([column[i] for i in indices] for column in (epochs, kw, kwh))
+                resolution = series_resolution(len(iso), len(epochs), bucket_seconds, maxPoints, method)
+                columns = [("t", "u32", epochs), ("kW", "f32", kw), ("kWh", "f32", kwh)]
+                return columnar_response(fmt, columns, len(epochs), {"resolution": resolution})
+            points = live_points(iso, kw, kwh, indices)
+            return {"points": points, "resolution": series_resolution(len(iso), len(points), bucket_seconds, maxPoints, method)}
 
     with get_db_connection() as conn:
         cursor = conn.cursor()
@@ -375,16 +711,42 @@ def get_live_series(minutes: int = 240) -> dict[str, Any]:
         )
         rows = cursor.fetchall()
 
+    source_points = len(rows)
+    bucket_seconds = LIVE_SAMPLE_SECONDS
+    if maxPoints is not None:
+        epochs = [naive_epoch(row.t) for row in rows]
+        indices, bucket_seconds = downsample_indices(epochs, [float(row.kW) for row in rows], max(2, maxPoints), LIVE_SAMPLE_SECONDS, method)
+        rows = [rows[index] for index in indices]
+    if fmt != "rows":
+        resolution = series_resolution(source_points, len(rows), bucket_seconds, maxPoints, method)
+        columns = [
+            ("t", "u32", [naive_epoch(row.t) for row in rows]),
+            ("kW", "f32", [float(row.kW) for row in rows]),
+            ("kWh", "f32", [float(row.kWh) for row in rows]),
+        ]
+        return columnar_response(fmt, columns, len(rows), {"resolution": resolution})
     points = [{"t": row.t.isoformat(), "kW": float(row.kW), "kWh": float(row.kWh)} for row in rows]
-    return {"points": points}
-
-
-@app.get("/api/series")
-def get_series(minutes: int = 240, start: str | None = None, end: str | None = None) -> dict[str, Any]:
+    return {"points": points, "resolution": series_resolution(source_points, len(points), bucket_seconds, maxPoints, method)}
+
+
+@db_route("/api/series", response_model=None)
+def get_series(
+    minutes: int = 240,
+    start: str | None = None,
+    end: str | None = None,
+    maxPoints: int | None = None,
+    downsample: str = "minmax",
+    since: str | None = None,
+    format: str | None = None,
+    accept: Annotated[str | None, Header()] = None,
+) -> dict[str, Any] | Response:
     minutes = max(15, min(minutes, get_series_max_days() * 24 * 60))
     end_dt = parse_iso(end) if end else datetime.now()
     start_dt = parse_iso(start) if start else (end_dt - timedelta(minutes=minutes))
     enforce_series_window(start_dt, end_dt)
+    start_dt = series_start_after(start_dt, since)
+    method = parse_downsample_method(downsample)
+    fmt = parse_response_format(format, accept)
 
     with get_db_connection() as conn:
         cursor = conn.cursor()
@@ -400,6 +762,24 @@ def get_series(minutes: int = 240, start: str | None = None, end: str | None = N
         )
         rows = cursor.fetchall()
 
+    source_points = len(rows)
+    bucket_seconds = INTERVAL_SECONDS
+    if maxPoints is not None:
+        epochs = [naive_epoch(row.IntervalEnd) for row in rows]
+        indices, bucket_seconds = downsample_indices(epochs, [float(row.kW) for row in rows], max(2, maxPoints), INTERVAL_SECONDS, method)
+        rows = [rows[index] for index in indices]
+
+    if fmt != "rows":
+        resolution = series_resolution(source_points, len(rows), bucket_seconds, maxPoints, method)
+        columns = [
+            ("t", "u32", [naive_epoch(row.IntervalEnd) for row in rows]),
+            ("kW", "f32", [float(row.kW) for row in rows]),
+            ("kWh", "f32", [float(row.kWh) for row in rows]),
+            ("r17Exclude", "bits", [row.R17Exclude for row in rows]),
+            ("kyzInvalidAlarm", "bits", [row.KyzInvalidAlarm for row in rows]),
+        ]
+        return columnar_response(fmt, columns, len(rows), {"resolution": resolution})
+
     points = [
         {
             "t": row.IntervalEnd.isoformat(),
@@ -412,34 +792,57 @@ def get_series(minutes: int = 240, start: str | None = None, end: str | None = N
         }
         for row in rows
     ]
-    return {"points": points}
+    return {"points": points, "resolution": series_resolution(source_points, len(points), bucket_seconds, maxPoints, method)}
 
 
 
 
-@app.get("/api/daily")
-def get_daily(days: int = 14) -> dict[str, Any]:
+@db_route("/api/daily", response_model=None)
+def get_daily(
+    days: int = 14,
+    format: str | None = None,
+    accept: Annotated[str | None, Header()] = None,
+) -> dict[str, Any] | Response:
     days = max(1, min(days, 90))
-    key = f"daily:{days}"
+    fmt = parse_response_format(format, accept)
+    use_rollups = get_use_rollups()
+    key = f"daily:{days}:{use_rollups}:{request_dataset_version('interval')}"
 
     def producer() -> dict[str, Any]:
         with get_db_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT
-                    CAST(IntervalEnd AS date) AS [date],
-                    SUM(CAST(kWh AS float)) AS kWh_sum,
-                    MAX(CAST(kW AS float)) AS kW_peak,
-                    COUNT(*) AS interval_count
-                FROM dbo.KYZ_Interval
-                WHERE IntervalEnd >= DATEADD(day, -?, CAST(GETDATE() AS date))
-                  AND ISNULL(KyzInvalidAlarm, 0) = 0
-                GROUP BY CAST(IntervalEnd AS date)
-                ORDER BY [date] ASC
-                """,
-                days,
-            )
+            if use_rollups:
+                cursor.execute(
+                    """
+                    SELECT
+                        BucketStart AS [date],
+                        SUM(Energy_kWh) AS kWh_sum,
+                        MAX(Peak_kW) AS kW_peak,
+                        SUM(ValidCount) AS interval_count
+                    FROM dbo.KYZ_RollupDaily
+                    WHERE BucketStart >= DATEADD(day, -?, CAST(GETDATE() AS date))
+                    GROUP BY BucketStart
+                    HAVING SUM(ValidCount) > 0
+                    ORDER BY [date] ASC
+                    """,
+                    days,
+                )
+            else:
+                cursor.execute(
+                    """
+                    SELECT
+                        CAST(IntervalEnd AS date) AS [date],
+                        SUM(CAST(kWh AS float)) AS kWh_sum,
+                        MAX(CAST(kW AS float)) AS kW_peak,
+                        COUNT(*) AS interval_count
+                    FROM dbo.KYZ_Interval
+                    WHERE IntervalEnd >= DATEADD(day, -?, CAST(GETDATE() AS date))
+                      AND ISNULL(KyzInvalidAlarm, 0) = 0
+                    GROUP BY CAST(IntervalEnd AS date)
+                    ORDER BY [date] ASC
+                    """,
+                    days,
+                )
             rows = cursor.fetchall()
         return {
             "days": [
@@ -453,10 +856,20 @@ def get_daily(days: int = 14) -> dict[str, Any]:
             ]
         }
 
-    return cache.get_or_set(key, ttl_seconds=30, producer=producer)
+    payload = cache.get_or_set(key, ttl_seconds=30, producer=producer, stale_seconds=CACHE_STALE_SECONDS)
+    if fmt == "rows":
+        return payload
+    day_rows = payload["days"]
+    columns = [
+        ("t", "u32", [naive_epoch(datetime.fromisoformat(day["date"])) for day in day_rows]),
+        ("kWh_sum", "f64", [day["kWh_sum"] for day in day_rows]),
+        ("kW_peak", "f32", [day["kW_peak"] for day in day_rows]),
+        ("interval_count", "u32", [day["interval_count"] for day in day_rows]),
+    ]
+    return columnar_response(fmt, columns, len(day_rows), {})
 
 
-@app.get("/api/monthly-demand")
+@db_route("/api/monthly-demand")
 def get_monthly_demand(months: int = 12, basis: str = "calendar") -> dict[str, Any]:
     # KYZ_MonthlyDemand SQL snapshots remain calendar-month based for backward compatibility.
     payload = get_billing(months=max(12, min(months, 24)), basis=basis)
@@ -474,7 +887,159 @@ def get_monthly_demand(months: int = 12, basis: str = "calendar") -> dict[str, A
             for m in payload["months"]
         ]
     }
-@app.get("/api/summary")
+SUMMARY_KPI_COLUMNS = (
+    "latest_kw",
+    "latest_live_kw",
+    "current_kw",
+    "prev_kw",
+    "live_kw_avg_5m",
+    "today_kwh",
+    "today_peak_kw",
+    "mtd_kwh",
+    "last_updated",
+    "yday_kwh_to_time",
+    "avg_daily_kwh_30d",
+    "max_kw_11mo",
+)
+KPI_PROC_RETRY_SECONDS = 600
+_kpi_proc_retry_at = 0.0
+
+
+def _optional_float(value: Any) -> float | None:
+    return float(value) if value is not None else None
+
+
+def fetch_summary_kpis_inline(cursor: Any) -> dict[str, Any]:
+    """Per-KPI queries; used when dbo.usp_KYZ_KpiContext (sql/008_kpi_context.sql) is not deployed."""
+    cursor.execute(
+        """
+        SELECT TOP 1 IntervalEnd, kW
+        FROM dbo.KYZ_Interval
+        ORDER BY IntervalEnd DESC
+        """
+    )
+    latest = cursor.fetchone()
+
+    cursor.execute(
+        """
+        SELECT TOP 1 SampleEnd, kW
+        FROM dbo.KYZ_Live15s
+        ORDER BY SampleEnd DESC
+        """
+    )
+    latest_live = cursor.fetchone()
+
+    cursor.execute(
+        """
+        SELECT
+            SUM(CASE WHEN CAST(IntervalEnd AS date)=CAST(GETDATE() AS date) THEN CAST(kWh AS float) ELSE 0 END) AS todayKwh,
+            MAX(CASE WHEN CAST(IntervalEnd AS date)=CAST(GETDATE() AS date) THEN CAST(kW AS float) END) AS todayPeakKw,
+            SUM(CASE WHEN IntervalEnd >= DATEFROMPARTS(YEAR(GETDATE()), MONTH(GETDATE()), 1) THEN CAST(kWh AS float) ELSE 0 END) AS mtdKwh,
+            MAX(CASE WHEN IntervalEnd >= DATEFROMPARTS(YEAR(GETDATE()), MONTH(GETDATE()), 1) THEN IntervalEnd END) AS lastUpdated
+        FROM dbo.KYZ_Interval
+        WHERE ISNULL(KyzInvalidAlarm,0)=0
+        """
+    )
+    totals = cursor.fetchone()
+
+    cursor.execute(
+        """
+        SELECT TOP 2 IntervalEnd, CAST(kW AS float) AS kW
+        FROM dbo.KYZ_Interval
+        WHERE kW IS NOT NULL AND ISNULL(KyzInvalidAlarm,0)=0
+        ORDER BY IntervalEnd DESC
+        """
+    )
+    latest_two = cursor.fetchall()
+
+    cursor.execute(
+        """
+        SELECT AVG(CAST(kW AS float)) AS avg_kw_5m
+        FROM dbo.KYZ_Live15s
+        WHERE SampleEnd >= DATEADD(minute, -5, GETDATE())
+        """
+    )
+    live_avg_5m_row = cursor.fetchone()
+
+    cursor.execute(
+        """
+        DECLARE @yesterday_start datetime = DATEADD(day, -1, CAST(GETDATE() AS date));
+        DECLARE @seconds_since_midnight int = DATEDIFF(second, CAST(GETDATE() AS date), GETDATE());
+        DECLARE @yesterday_end datetime = DATEADD(second, @seconds_since_midnight, @yesterday_start);
+
+        SELECT SUM(CAST(kWh AS float)) AS yday_kwh_to_time
+        FROM dbo.KYZ_Interval
+        WHERE IntervalEnd >= @yesterday_start
+          AND IntervalEnd < @yesterday_end
+          AND ISNULL(KyzInvalidAlarm,0)=0
+        """
+    )
+    yday_to_time_row = cursor.fetchone()
+
+    cursor.execute(
+        """
+        WITH daily AS (
+            SELECT
+                CAST(IntervalEnd AS date) AS d,
+                SUM(CAST(kWh AS float)) AS daily_kwh
+            FROM dbo.KYZ_Interval
+            WHERE IntervalEnd >= DATEADD(day, -30, CAST(GETDATE() AS date))
+              AND IntervalEnd < CAST(GETDATE() AS date)
+              AND ISNULL(KyzInvalidAlarm,0)=0
+            GROUP BY CAST(IntervalEnd AS date)
+        )
+        SELECT AVG(daily_kwh) AS avg_daily_kwh_30d
+        FROM daily
+        """
+    )
+    avg_daily_row = cursor.fetchone()
+
+    cursor.execute(
+        """
+        SELECT MAX(CAST(kW AS float)) AS max_kw
+        FROM dbo.KYZ_Interval
+        WHERE IntervalEnd >= DATEADD(month, -11, CAST(GETDATE() AS date))
+          AND ISNULL(KyzInvalidAlarm,0)=0
+          AND ISNULL(R17Exclude,0)=0
+        """
+    )
+    max_11mo_row = cursor.fetchone()
+
+    return {
+        "latest_kw": _optional_float(latest.kW) if latest else None,
+        "latest_live_kw": _optional_float(latest_live.kW) if latest_live else None,
+        "current_kw": _optional_float(latest_two[0].kW) if len(latest_two) > 0 else None,
+        "prev_kw": _optional_float(latest_two[1].kW) if len(latest_two) > 1 else None,
+        "live_kw_avg_5m": _optional_float(live_avg_5m_row.avg_kw_5m) if live_avg_5m_row else None,
+        "today_kwh": _optional_float(totals.todayKwh) if totals else None,
+        "today_peak_kw": _optional_float(totals.todayPeakKw) if totals else None,
+        "mtd_kwh": _optional_float(totals.mtdKwh) if totals else None,
+        "last_updated": totals.lastUpdated if totals else None,
+        "yday_kwh_to_time": _optional_float(yday_to_time_row.yday_kwh_to_time) if yday_to_time_row else None,
+        "avg_daily_kwh_30d": _optional_float(avg_daily_row.avg_daily_kwh_30d) if avg_daily_row else None,
+        "max_kw_11mo": _optional_float(max_11mo_row.max_kw) if max_11mo_row else None,
+    }
+
+
+def fetch_summary_kpis(cursor: Any) -> dict[str, Any]:
+    global _kpi_proc_retry_at
+    if time.monotonic() >= _kpi_proc_retry_at:
+        try:
+            cursor.execute("EXEC dbo.usp_KYZ_KpiContext @MeterId = ?", get_dashboard_meter_id())
+            row = cursor.fetchone()
+            if row is not None:
+                return {
+                    name: getattr(row, name) if name == "last_updated" else _optional_float(getattr(row, name))
+                    for name in SUMMARY_KPI_COLUMNS
+                }
+        except (pyodbc.Error, AttributeError):
+            # Missing or pre-single-pass procedure: serve the inline queries and retry later.
+            logger.warning("usp_KYZ_KpiContext unavailable; using inline summary queries", exc_info=True)
+            _kpi_proc_retry_at = time.monotonic() + KPI_PROC_RETRY_SECONDS
+    return fetch_summary_kpis_inline(cursor)
+
+
+@db_route("/api/summary")
 def get_summary() -> dict[str, Any]:
     def pct_change(current: float | None, baseline: float | None) -> float | None:
         if current is None or baseline is None or baseline == 0:
@@ -492,118 +1057,28 @@ def get_summary() -> dict[str, Any]:
     current_month = months[-1] if months else None
     last_month = months[-2] if len(months) > 1 else None
     billing_anchor = get_billing_anchor()
-    billing_period = get_billing(24, basis="billing")
-    billing_months = billing_period["months"]
-    current_billing_period = billing_months[-1] if billing_period["basis"] == "billing" and billing_months else None
+    current_billing_period = None
+    if billing_anchor is not None:
+        # Without an anchor the billing basis falls back to calendar months, which were just fetched.
+        billing_months = get_billing(24, basis="billing")["months"]
+        current_billing_period = billing_months[-1] if billing_months else None
 
     with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            SELECT TOP 1 IntervalEnd, kW
-            FROM dbo.KYZ_Interval
-            ORDER BY IntervalEnd DESC
-            """
-        )
-        latest = cursor.fetchone()
-
-        cursor.execute(
-            """
-            SELECT TOP 1 SampleEnd, kW
-            FROM dbo.KYZ_Live15s
-            ORDER BY SampleEnd DESC
-            """
-        )
-        latest_live = cursor.fetchone()
-
-        cursor.execute(
-            """
-            SELECT
-                SUM(CASE WHEN CAST(IntervalEnd AS date)=CAST(GETDATE() AS date) THEN CAST(kWh AS float) ELSE 0 END) AS todayKwh,
-                MAX(CASE WHEN CAST(IntervalEnd AS date)=CAST(GETDATE() AS date) THEN CAST(kW AS float) END) AS todayPeakKw,
-                SUM(CASE WHEN IntervalEnd >= DATEFROMPARTS(YEAR(GETDATE()), MONTH(GETDATE()), 1) THEN CAST(kWh AS float) ELSE 0 END) AS mtdKwh,
-                MAX(CASE WHEN IntervalEnd >= DATEFROMPARTS(YEAR(GETDATE()), MONTH(GETDATE()), 1) THEN IntervalEnd END) AS lastUpdated
-            FROM dbo.KYZ_Interval
-            WHERE ISNULL(KyzInvalidAlarm,0)=0
-            """
-        )
-        totals = cursor.fetchone()
-
-        cursor.execute(
-            """
-            SELECT TOP 2 IntervalEnd, CAST(kW AS float) AS kW
-            FROM dbo.KYZ_Interval
-            WHERE kW IS NOT NULL AND ISNULL(KyzInvalidAlarm,0)=0
-            ORDER BY IntervalEnd DESC
-            """
-        )
-        latest_two = cursor.fetchall()
-
-        cursor.execute(
-            """
-            SELECT AVG(CAST(kW AS float)) AS avg_kw_5m
-            FROM dbo.KYZ_Live15s
-            WHERE SampleEnd >= DATEADD(minute, -5, GETDATE())
-            """
-        )
-        live_avg_5m_row = cursor.fetchone()
-
-        cursor.execute(
-            """
-            DECLARE @yesterday_start datetime = DATEADD(day, -1, CAST(GETDATE() AS date));
-            DECLARE @seconds_since_midnight int = DATEDIFF(second, CAST(GETDATE() AS date), GETDATE());
-            DECLARE @yesterday_end datetime = DATEADD(second, @seconds_since_midnight, @yesterday_start);
-
-            SELECT SUM(CAST(kWh AS float)) AS yday_kwh_to_time
-            FROM dbo.KYZ_Interval
-            WHERE IntervalEnd >= @yesterday_start
-              AND IntervalEnd < @yesterday_end
-              AND ISNULL(KyzInvalidAlarm,0)=0
-            """
-        )
-        yday_to_time_row = cursor.fetchone()
-
-        cursor.execute(
-            """
-            WITH daily AS (
-                SELECT
-                    CAST(IntervalEnd AS date) AS d,
-                    SUM(CAST(kWh AS float)) AS daily_kwh
-                FROM dbo.KYZ_Interval
-                WHERE IntervalEnd >= DATEADD(day, -30, CAST(GETDATE() AS date))
-                  AND IntervalEnd < CAST(GETDATE() AS date)
-                  AND ISNULL(KyzInvalidAlarm,0)=0
-                GROUP BY CAST(IntervalEnd AS date)
-            )
-            SELECT AVG(daily_kwh) AS avg_daily_kwh_30d
-            FROM daily
-            """
-        )
-        avg_daily_row = cursor.fetchone()
-
-        cursor.execute(
-            """
-            SELECT MAX(CAST(kW AS float)) AS max_kw
-            FROM dbo.KYZ_Interval
-            WHERE IntervalEnd >= DATEADD(month, -11, CAST(GETDATE() AS date))
-              AND ISNULL(KyzInvalidAlarm,0)=0
-              AND ISNULL(R17Exclude,0)=0
-            """
-        )
-        max_11mo_row = cursor.fetchone()
-
-    latest_kw = float(latest.kW) if latest and latest.kW is not None else None
-    latest_live_kw = float(latest_live.kW) if latest_live and latest_live.kW is not None else None
-    today_kwh = float(totals.todayKwh or 0)
-    today_peak_kw = float(totals.todayPeakKw or 0)
-    mtd_kwh = float(totals.mtdKwh or 0)
-
-    current_kw_valid = float(latest_two[0].kW) if len(latest_two) > 0 and latest_two[0].kW is not None else None
-    prev_kw_valid = float(latest_two[1].kW) if len(latest_two) > 1 and latest_two[1].kW is not None else None
-    live_kw_avg_5m = float(live_avg_5m_row.avg_kw_5m) if live_avg_5m_row and live_avg_5m_row.avg_kw_5m is not None else None
-    yday_kwh_to_time = float(yday_to_time_row.yday_kwh_to_time) if yday_to_time_row and yday_to_time_row.yday_kwh_to_time is not None else None
-    avg_daily_kwh_30d = float(avg_daily_row.avg_daily_kwh_30d) if avg_daily_row and avg_daily_row.avg_daily_kwh_30d is not None else None
-    max_kw_11mo = float(max_11mo_row.max_kw) if max_11mo_row and max_11mo_row.max_kw is not None else None
+        kpis = fetch_summary_kpis(conn.cursor())
+
+    latest_kw = kpis["latest_kw"]
+    latest_live_kw = kpis["latest_live_kw"]
+    today_kwh = kpis["today_kwh"] or 0.0
+    today_peak_kw = kpis["today_peak_kw"] or 0.0
+    mtd_kwh = kpis["mtd_kwh"] or 0.0
+    last_updated = kpis["last_updated"]
+
+    current_kw_valid = kpis["current_kw"]
+    prev_kw_valid = kpis["prev_kw"]
+    live_kw_avg_5m = kpis["live_kw_avg_5m"]
+    yday_kwh_to_time = kpis["yday_kwh_to_time"]
+    avg_daily_kwh_30d = kpis["avg_daily_kwh_30d"]
+    max_kw_11mo = kpis["max_kw_11mo"]
 
     expected_mtd = avg_daily_kwh_30d * datetime.now().day if avg_daily_kwh_30d is not None else None
     last_month_top3 = float(last_month["top3AvgKW"]) if last_month and last_month.get("top3AvgKW") is not None else None
@@ -612,7 +1087,7 @@ def get_summary() -> dict[str, Any]:
 
     response = {
         "plantName": os.getenv("PLANT_NAME", "KYZ Plant"),
-        "lastUpdated": totals.lastUpdated.isoformat() if totals and totals.lastUpdated else None,
+        "lastUpdated": last_updated.isoformat() if last_updated else None,
         "currentKW": latest_kw,
         "currentKW_15s": latest_live_kw,
         "todayKWh": today_kwh,
@@ -670,7 +1145,135 @@ def get_summary() -> dict[str, Any]:
     return response
 
 
-@app.get("/api/billing")
+BILLING_FETCH_ROWS = 5000
+
+
+def fetch_billing_intervals_since(start: datetime) -> Iterator[tuple[Any, ...]]:
+    """Interval rows from ``start`` in clustered-key order, streamed in chunks for the billing engine."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT
+                IntervalEnd,
+                CAST(kW AS float) AS kW,
+                CAST(kWh AS float) AS kWh,
+                ISNULL(R17Exclude, 0) AS r17,
+                ISNULL(KyzInvalidAlarm, 0) AS invalid
+            FROM dbo.KYZ_Interval
+            WHERE IntervalEnd >= ?
+            ORDER BY IntervalEnd ASC
+            """,
+            start,
+        )
+        while True:
+            rows = cursor.fetchmany(BILLING_FETCH_ROWS)
+            if not rows:
+                break
+            yield from rows
+
+
+billing_engine = BillingEngine(
+    fetch_billing_intervals_since,
+    closed_ttl_seconds=max(0, int(os.getenv("DASHBOARD_BILLING_CLOSED_TTL_SECONDS", str(6 * 3600)))),
+)
+
+
+def fetch_interval_change_mark() -> tuple[int, datetime | None] | None:
+    """Writers' change watermark from sql/007 (bumped by CSV backfills and marked ingest batches)."""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT MarkVersion, DirtyFromMonth FROM dbo.KYZ_MonthlyDemandWatermark WHERE Id = 1")
+            row = cursor.fetchone()
+    except pyodbc.Error:
+        # sql/007 not applied: closed periods then only expire by DASHBOARD_BILLING_CLOSED_TTL_SECONDS.
+        logger.debug("Change watermark unavailable", exc_info=True)
+        return None
+    if row is None:
+        return None
+    dirty_from = row.DirtyFromMonth
+    return int(row.MarkVersion), datetime(dirty_from.year, dirty_from.month, dirty_from.day) if dirty_from else None
+
+
+def sync_billing_engine() -> None:
+    ttl = float(os.getenv("DASHBOARD_VERSION_TTL_SECONDS", "5"))
+    mark = cache.get_or_set("interval-change-mark", ttl_seconds=ttl, producer=fetch_interval_change_mark, stale_seconds=0)
+    if mark is not None:
+        billing_engine.observe_change_mark(*mark)
+
+
+def build_rollup_billing_query(basis: str, months: int, anchor: datetime | None) -> tuple[str, tuple[Any, ...]]:
+    """Billing months from sql/012_rollups.sql: top-3 kW from each bucket's Top1..Top3 candidates."""
+    if basis == "calendar":
+        return (
+            """
+            WITH buckets AS (
+                SELECT BucketStart AS month_start, Energy_kWh, Top1_kW, Top2_kW, Top3_kW
+                FROM dbo.KYZ_RollupMonthly
+                WHERE BucketStart >= DATEADD(month, -?, DATEFROMPARTS(YEAR(GETDATE()), MONTH(GETDATE()), 1))
+            ), ranked AS (
+                SELECT b.month_start, v.kW, ROW_NUMBER() OVER (PARTITION BY b.month_start ORDER BY v.kW DESC) AS rn
+                FROM buckets b
+                CROSS APPLY (VALUES (b.Top1_kW), (b.Top2_kW), (b.Top3_kW)) v(kW)
+                WHERE v.kW IS NOT NULL
+            ), top3 AS (
+                SELECT month_start, AVG(kW) AS top3_avg_kW
+                FROM ranked
+                WHERE rn <= 3
+                GROUP BY month_start
+            ), energy AS (
+                SELECT month_start, SUM(Energy_kWh) AS energy_kWh
+                FROM buckets
+                GROUP BY month_start
+            )
+            SELECT e.month_start, t.top3_avg_kW, e.energy_kWh
+            FROM energy e
+            LEFT JOIN top3 t ON t.month_start = e.month_start
+            ORDER BY e.month_start ASC
+            """,
+            (months,),
+        )
+    return (
+        """
+        WITH days AS (
+            SELECT CAST(BucketStart AS datetime) AS day_start, Energy_kWh, Top1_kW, Top2_kW, Top3_kW
+            FROM dbo.KYZ_RollupDaily
+            WHERE BucketStart >= CAST(DATEADD(month, -?, GETDATE()) AS date)
+        ), buckets AS (
+            SELECT
+                CASE
+                    WHEN day_start < DATEADD(month, DATEDIFF(month, ?, day_start), ?)
+                        THEN DATEADD(month, -1, DATEADD(month, DATEDIFF(month, ?, day_start), ?))
+                    ELSE DATEADD(month, DATEDIFF(month, ?, day_start), ?)
+                END AS period_start,
+                Energy_kWh, Top1_kW, Top2_kW, Top3_kW
+            FROM days
+        ), ranked AS (
+            SELECT b.period_start, v.kW, ROW_NUMBER() OVER (PARTITION BY b.period_start ORDER BY v.kW DESC) AS rn
+            FROM buckets b
+            CROSS APPLY (VALUES (b.Top1_kW), (b.Top2_kW), (b.Top3_kW)) v(kW)
+            WHERE v.kW IS NOT NULL
+        ), top3 AS (
+            SELECT period_start, AVG(kW) AS top3_avg_kW
+            FROM ranked
+            WHERE rn <= 3
+            GROUP BY period_start
+        ), energy AS (
+            SELECT period_start, SUM(Energy_kWh) AS energy_kWh
+            FROM buckets
+            GROUP BY period_start
+        )
+        SELECT e.period_start, t.top3_avg_kW, e.energy_kWh
+        FROM energy e
+        LEFT JOIN top3 t ON t.period_start = e.period_start
+        ORDER BY e.period_start ASC
+        """,
+        (months, anchor, anchor, anchor, anchor, anchor, anchor),
+    )
+
+
+@db_route("/api/billing")
 def get_billing(months: int = 24, basis: str = "calendar") -> dict[str, Any]:
     months = max(12, min(months, 24))
     requested_basis = basis.strip().lower()
@@ -681,103 +1284,28 @@ def get_billing(months: int = 24, basis: str = "calendar") -> dict[str, Any]:
     effective_basis = "billing" if requested_basis == "billing" and anchor is not None else "calendar"
     tariff = get_tariff_config()
     anchor_key = anchor.isoformat() if anchor else "none"
-    key = f"billing:{months}:{requested_basis}:{effective_basis}:{anchor_key}:{tariff}"
+    # Daily rollups can only be regrouped into billing periods that start at midnight.
+    use_rollups = get_use_rollups() and (effective_basis == "calendar" or (anchor is not None and anchor.time() == datetime.min.time()))
+    key = f"billing:{months}:{requested_basis}:{effective_basis}:{anchor_key}:{tariff}:{use_rollups}:{request_dataset_version('interval')}"
 
     def producer() -> dict[str, Any]:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            if effective_basis == "calendar":
-                cursor.execute(
-                    """
-                WITH base AS (
-                    SELECT
-                        DATEFROMPARTS(YEAR(IntervalEnd), MONTH(IntervalEnd), 1) AS month_start,
-                        CAST(kW AS float) AS kW,
-                        CAST(kWh AS float) AS kWh,
-                        ISNULL(R17Exclude,0) AS r17,
-                        ISNULL(KyzInvalidAlarm,0) AS invalid
-                    FROM dbo.KYZ_Interval
-                    WHERE IntervalEnd >= DATEADD(month, -?, DATEFROMPARTS(YEAR(GETDATE()), MONTH(GETDATE()), 1))
-                ), ranked AS (
-                    SELECT
-                        month_start,
-                        kW,
-                        ROW_NUMBER() OVER (PARTITION BY month_start ORDER BY kW DESC) AS rn
-                    FROM base
-                    WHERE invalid = 0 AND r17 = 0
-                ), top3 AS (
-                    SELECT month_start, AVG(kW) AS top3_avg_kW
-                    FROM ranked
-                    WHERE rn <= 3
-                    GROUP BY month_start
-                ), energy AS (
-                    SELECT month_start, SUM(CASE WHEN invalid = 0 THEN kWh ELSE 0 END) AS energy_kWh
-                    FROM base
-                    GROUP BY month_start
-                )
-                SELECT e.month_start, t.top3_avg_kW, e.energy_kWh
-                FROM energy e
-                LEFT JOIN top3 t ON t.month_start = e.month_start
-                ORDER BY e.month_start ASC
-                    """,
-                    months,
+        if use_rollups:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                sql, params = build_rollup_billing_query(effective_basis, months, anchor)
+                cursor.execute(sql, *params)
+                rows = cursor.fetchall()
+            source = [
+                BillingMonth(
+                    month_start=(row.month_start if hasattr(row, "month_start") else row.period_start.date()),
+                    top3_avg_kw=float(row.top3_avg_kW or 0),
+                    energy_kwh=float(row.energy_kWh or 0),
                 )
-            else:
-                cursor.execute(
-                    """
-                WITH base AS (
-                    SELECT
-                        CASE
-                            WHEN IntervalEnd < DATEADD(month, DATEDIFF(month, ?, IntervalEnd), ?)
-                                THEN DATEADD(month, -1, DATEADD(month, DATEDIFF(month, ?, IntervalEnd), ?))
-                            ELSE DATEADD(month, DATEDIFF(month, ?, IntervalEnd), ?)
-                        END AS period_start,
-                        CAST(kW AS float) AS kW,
-                        CAST(kWh AS float) AS kWh,
-                        ISNULL(R17Exclude,0) AS r17,
-                        ISNULL(KyzInvalidAlarm,0) AS invalid
-                    FROM dbo.KYZ_Interval
-                    WHERE IntervalEnd >= DATEADD(month, -?, GETDATE())
-                ), ranked AS (
-                    SELECT
-                        period_start,
-                        kW,
-                        ROW_NUMBER() OVER (PARTITION BY period_start ORDER BY kW DESC) AS rn
-                    FROM base
-                    WHERE invalid = 0 AND r17 = 0
-                ), top3 AS (
-                    SELECT period_start, AVG(kW) AS top3_avg_kW
-                    FROM ranked
-                    WHERE rn <= 3
-                    GROUP BY period_start
-                ), energy AS (
-                    SELECT period_start, SUM(CASE WHEN invalid = 0 THEN kWh ELSE 0 END) AS energy_kWh
-                    FROM base
-                    GROUP BY period_start
-                )
-                SELECT e.period_start, t.top3_avg_kW, e.energy_kWh
-                FROM energy e
-                LEFT JOIN top3 t ON t.period_start = e.period_start
-                ORDER BY e.period_start ASC
-                """,
-                    anchor,
-                    anchor,
-                    anchor,
-                    anchor,
-                    anchor,
-                    anchor,
-                    months,
-                )
-            rows = cursor.fetchall()
-
-        source = [
-            BillingMonth(
-                month_start=(row.month_start if hasattr(row, "month_start") else row.period_start.date()),
-                top3_avg_kw=float(row.top3_avg_kW or 0),
-                energy_kwh=float(row.energy_kWh or 0),
-            )
-            for row in rows
-        ]
+                for row in rows
+            ]
+        else:
+            sync_billing_engine()
+            source = [period.to_billing_month() for period in billing_engine.periods(effective_basis, months, anchor)]
         series = compute_billing_series(source, tariff)
 
         anchor_iso = anchor.date().isoformat() if anchor else None
@@ -814,7 +1342,7 @@ def get_billing(months: int = 24, basis: str = "calendar") -> dict[str, Any]:
             ],
         }
 
-    return cache.get_or_set(key, ttl_seconds=30, producer=producer)
+    return cache.get_or_set(key, ttl_seconds=30, producer=producer, stale_seconds=CACHE_STALE_SECONDS)
 
 
 def build_quality_query() -> str:
@@ -839,7 +1367,7 @@ def build_quality_query() -> str:
             """
 
 
-@app.get("/api/quality")
+@db_route("/api/quality")
 def get_quality() -> dict[str, Any]:
     with get_db_connection() as conn:
         cursor = conn.cursor()
@@ -868,40 +1396,52 @@ def get_quality() -> dict[str, Any]:
     }
 
 
-@app.get("/api/stream")
-def get_stream() -> StreamingResponse:
-    poll_seconds = max(1, int(os.getenv("DASHBOARD_SSE_POLL_SECONDS", "5")))
+def fetch_live_feed_snapshot() -> dict[str, dict[str, Any]]:
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT TOP 1 IntervalEnd, PulseCount, kWh, kW, Total_kWh, R17Exclude, KyzInvalidAlarm
+            FROM dbo.KYZ_Interval
+            ORDER BY IntervalEnd DESC
+            """
+        )
+        latest = cursor.fetchone()
+        cursor.execute(
+            """
+            SELECT TOP 1 SampleEnd, PulseCount, kWh, kW, Total_kWh
+            FROM dbo.KYZ_Live15s
+            ORDER BY SampleEnd DESC
+            """
+        )
+        live = cursor.fetchone()
+    return {"latest": row_to_latest(latest), "live": row_to_live_latest(live)}
 
-    def event_generator() -> Iterator[str]:
-        last_interval: str | None = None
-        while True:
-            try:
-                with get_db_connection() as conn:
-                    cursor = conn.cursor()
-                    cursor.execute(
-                        """
-                        SELECT TOP 1 IntervalEnd, PulseCount, kWh, kW, Total_kWh, R17Exclude, KyzInvalidAlarm
-                        FROM dbo.KYZ_Interval
-                        ORDER BY IntervalEnd DESC
-                        """
-                    )
-                    row = cursor.fetchone()
-                if row:
-                    current = row.IntervalEnd.isoformat()
-                    if current != last_interval:
-                        last_interval = current
-                        payload = row_to_latest(row)
-                        yield f"event: latest\ndata: {json.dumps(payload)}\n\n"
-                else:
-                    yield "event: heartbeat\ndata: {}\n\n"
-            except GeneratorExit:
-                logger.info("SSE client disconnected")
-                return
-            except Exception:
-                logger.exception("SSE polling failed")
-                yield 'event: error\ndata: {"message":"poll failure"}\n\n'
-
-            time.sleep(poll_seconds)
+
+live_feed = LiveFeed(
+    fetch_live_feed_snapshot,
+    poll_seconds=max(1, int(os.getenv("DASHBOARD_SSE_POLL_SECONDS", "5"))),
+    heartbeat_seconds=max(1, int(os.getenv("DASHBOARD_SSE_HEARTBEAT_SECONDS", "15"))),
+    max_subscribers=max(0, int(os.getenv("DASHBOARD_SSE_MAX_CLIENTS", "50"))),
+    executor=db_executor.executor,
+    logger=logger,
+)
+
+
+@app.get("/api/stream")
+async def get_stream() -> StreamingResponse:
+    if live_feed.full:
+        live_feed.rejected += 1
+        raise HTTPException(status_code=503, detail="Too many live stream clients", headers={"Retry-After": "30"})
+    queue = live_feed.subscribe()
+
+    async def event_generator() -> AsyncIterator[str]:
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            live_feed.unsubscribe(queue)
+            logger.info("SSE client disconnected")
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
@@ -912,7 +1452,7 @@ if static_dir.exists():
 
 
 @app.get("/")
-def serve_root() -> FileResponse:
+async def serve_root() -> FileResponse:
     index_file = static_dir / "index.html"
     if index_file.exists():
         return FileResponse(index_file)
@@ -920,7 +1460,7 @@ def serve_root() -> FileResponse:
 
 
 @app.get("/kiosk")
-def serve_kiosk() -> FileResponse:
+async def serve_kiosk() -> FileResponse:
     index_file = static_dir / "index.html"
     if index_file.exists():
         return FileResponse(index_file)
@@ -928,7 +1468,7 @@ def serve_kiosk() -> FileResponse:
 
 
 @app.get('/{full_path:path}')
-def serve_spa_or_static(full_path: str) -> FileResponse:
+async def serve_spa_or_static(full_path: str) -> FileResponse:
     requested = full_path.lstrip('/')
     if requested == 'api' or requested.startswith('api/'):
         raise HTTPException(status_code=404, detail='Not Found')
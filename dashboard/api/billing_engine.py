@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import heapq
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Any, Callable, Iterable, Iterator
+
+from dashboard.api.analytics import BillingMonth
+from dashboard.api.billing_periods import add_months_clamped, billing_period_end, billing_period_start
+
+# (IntervalEnd, kW, kWh, R17Exclude, KyzInvalidAlarm), in IntervalEnd order.
+IntervalRow = tuple[datetime, Any, Any, Any, Any]
+
+CALENDAR = "calendar"
+BILLING = "billing"
+
+
+def calendar_period_start(dt: datetime) -> datetime:
+    return datetime(dt.year, dt.month, 1)
+
+
+def calendar_period_end(dt: datetime) -> datetime:
+    return add_months_clamped(calendar_period_start(dt), 1)
+
+
+@dataclass
+class PeriodTotals:
+    """Billing inputs for one period: top-3 billable kW (a size-3 min-heap) and valid energy."""
+
+    start: datetime
+    end: datetime
+    top3: list[float] = field(default_factory=list)
+    energy_kwh: float = 0.0
+    intervals: int = 0
+
+    def add(self, kw: Any, kwh: Any, r17: Any, invalid: Any) -> None:
+        self.intervals += 1
+        if invalid:
+            return
+        if kwh is not None:
+            self.energy_kwh += float(kwh)
+        if kw is None or r17:
+            return
+        if len(self.top3) < 3:
+            heapq.heappush(self.top3, float(kw))
+        elif kw > self.top3[0]:
+            heapq.heapreplace(self.top3, float(kw))
+
+    @property
+    def top3_avg_kw(self) -> float | None:
+        return sum(self.top3) / len(self.top3) if self.top3 else None
+
+    def to_billing_month(self) -> BillingMonth:
+        return BillingMonth(month_start=self.start.date(), top3_avg_kw=self.top3_avg_kw or 0.0, energy_kwh=self.energy_kwh)
+
+
+class _Periodizer:
+    """Maps ordered timestamps to periods, recomputing bounds only when a row leaves the current one."""
+
+    def __init__(self, start_of: Callable[[datetime], datetime], end_of: Callable[[datetime], datetime]) -> None:
+        self.start_of = start_of
+        self.end_of = end_of
+        self.periods: dict[datetime, PeriodTotals] = {}
+        self._current: PeriodTotals | None = None
+
+    def period_for(self, dt: datetime) -> PeriodTotals:
+        current = self._current
+        if current is None or not current.start <= dt < current.end:
+            start = self.start_of(dt)
+            current = self.periods.get(start)
+            if current is None:
+                current = self.periods[start] = PeriodTotals(start, self.end_of(dt))
+            self._current = current
+        return current
+
+    def span(self, start: datetime, until: datetime) -> Iterator[datetime]:
+        """Starts of every period from the one containing ``start`` through the one containing ``until``."""
+        cursor = self.start_of(start)
+        while cursor <= until:
+            yield cursor
+            cursor = self.end_of(cursor)
+
+
+def _periodizers(anchor: datetime | None) -> dict[str, _Periodizer]:
+    periodizers = {CALENDAR: _Periodizer(calendar_period_start, calendar_period_end)}
+    if anchor is not None:
+        periodizers[BILLING] = _Periodizer(
+            lambda dt: billing_period_start(dt, anchor),
+            lambda dt: billing_period_end(dt, anchor),
+        )
+    return periodizers
+
+
+def _fill(periodizers: dict[str, _Periodizer], rows: Iterable[IntervalRow]) -> int:
+    targets = list(periodizers.values())
+    count = 0
+    for end, kw, kwh, r17, invalid in rows:
+        count += 1
+        for periodizer in targets:
+            periodizer.period_for(end).add(kw, kwh, r17, invalid)
+    return count
+
+
+def aggregate_periods(rows: Iterable[IntervalRow], anchor: datetime | None = None) -> dict[str, dict[datetime, PeriodTotals]]:
+    """One pass over ordered interval rows into calendar (and, with an anchor, billing) periods."""
+    periodizers = _periodizers(anchor)
+    _fill(periodizers, rows)
+    return {basis: periodizer.periods for basis, periodizer in periodizers.items()}
+
+
+def window_start(basis: str, months: int, now: datetime, anchor: datetime | None) -> datetime:
+    if basis == BILLING and anchor is not None:
+        return billing_period_start(add_months_clamped(now, -months), anchor)
+    return add_months_clamped(calendar_period_start(now), -months)
+
+
+class BillingEngine:
+    """Billing periods computed in Python from one ordered scan of ``dbo.KYZ_Interval``.
+
+    Calendar months and anchor-based billing periods are filled from the same pass. Periods
+    that ended more than ``closed_grace`` ago are kept (for ``closed_ttl_seconds`` at most);
+    later requests only scan from the first period that is still open or missing from the
+    cache. Backfills that rewrite closed periods reach the cache through ``invalidate`` or
+    ``observe_change_mark``. The scan runs outside the lock and is published only if no
+    invalidation happened meanwhile.
+    """
+
+    def __init__(
+        self,
+        fetch_since: Callable[[datetime], Iterable[IntervalRow]],
+        closed_ttl_seconds: float = 6 * 3600,
+        closed_grace: timedelta = timedelta(days=1),
+    ) -> None:
+        self._fetch_since = fetch_since
+        self.closed_ttl_seconds = closed_ttl_seconds
+        self.closed_grace = closed_grace
+        self._lock = Lock()
+        self._closed: dict[tuple[str, datetime | None, datetime], tuple[float, PeriodTotals]] = {}
+        self._generation = 0
+        self._mark_version: Any = None
+        self.scans = 0
+        self.rows_scanned = 0
+        self.closed_hits = 0
+        self.invalidations = 0
+
+    def _cached(self, basis: str, anchor: datetime | None, start: datetime, now_monotonic: float) -> PeriodTotals | None:
+        entry = self._closed.get((basis, anchor, start))
+        if entry is None or now_monotonic - entry[0] > self.closed_ttl_seconds:
+            return None
+        return entry[1]
+
+    def invalidate(self, since: datetime | None = None) -> None:
+        """Forget cached periods that end after ``since`` (all of them without it)."""
+        with self._lock:
+            self._invalidate_locked(since)
+
+    def observe_change_mark(self, version: Any, dirty_from: datetime | None) -> None:
+        """Feed the writers' change watermark (``dbo.KYZ_MonthlyDemandWatermark``, sql/007).
+
+        Each new mark version drops cached periods from ``dirty_from`` on, or every period once
+        a monthly-demand refresh has already cleared the dirty month.
+        """
+        with self._lock:
+            if version == self._mark_version:
+                return
+            self._mark_version = version
+            self._invalidate_locked(dirty_from)
+
+    def _invalidate_locked(self, since: datetime | None) -> None:
+        self._generation += 1
+        self.invalidations += 1
+        stale = [key for key, (_, period) in self._closed.items() if since is None or period.end > since]
+        for key in stale:
+            del self._closed[key]
+
+    def periods(self, basis: str, months: int, anchor: datetime | None = None, now: datetime | None = None) -> list[PeriodTotals]:
+        now = now or datetime.now()
+        if basis == BILLING and anchor is None:
+            basis = CALENDAR
+        periodizers = _periodizers(anchor)
+        windows: dict[str, dict[datetime, PeriodTotals | None]] = {}
+        with self._lock:
+            now_monotonic = time.monotonic()
+            generation = self._generation
+            for name, periodizer in periodizers.items():
+                key_anchor = anchor if name == BILLING else None
+                windows[name] = {
+                    start: self._cached(name, key_anchor, start, now_monotonic)
+                    for start in periodizer.span(window_start(name, months, now, anchor), now)
+                }
+            cached = windows[basis]
+            missing = [start for start in cached if cached[start] is None]
+            if not missing:
+                self.closed_hits += 1
+        if missing:
+            # Start early enough to refill the other basis' window too, so both come out of one scan.
+            scan_from = min(start for window in windows.values() for start, period in window.items() if period is None)
+            rows = _fill(periodizers, self._fetch_since(scan_from))
+            scanned = self._complete(periodizers, scan_from, now)
+            with self._lock:
+                self.scans += 1
+                self.rows_scanned += rows
+                if generation == self._generation:
+                    self._publish_locked(scanned, now, now_monotonic, anchor)
+            for start in missing:
+                cached[start] = scanned[basis].get(start)
+        return [period for period in cached.values() if period is not None and period.intervals]
+
+    def _complete(
+        self,
+        periodizers: dict[str, _Periodizer],
+        scan_from: datetime,
+        now: datetime,
+    ) -> dict[str, dict[datetime, PeriodTotals]]:
+        scanned: dict[str, dict[datetime, PeriodTotals]] = {}
+        for basis, periodizer in periodizers.items():
+            periods = periodizer.periods
+            for start in periodizer.span(scan_from, now):
+                # A period the scan started part-way into (the other basis) is incomplete.
+                if start < scan_from:
+                    periods.pop(start, None)
+                    continue
+                periods.setdefault(start, PeriodTotals(start, periodizer.end_of(start)))
+            scanned[basis] = periods
+        return scanned
+
+    def _publish_locked(
+        self,
+        scanned: dict[str, dict[datetime, PeriodTotals]],
+        now: datetime,
+        now_monotonic: float,
+        anchor: datetime | None,
+    ) -> None:
+        expired = [key for key, (stored, _) in self._closed.items() if now_monotonic - stored > self.closed_ttl_seconds]
+        for key in expired:
+            del self._closed[key]
+        for basis, periods in scanned.items():
+            for start, period in periods.items():
+                if period.end + self.closed_grace <= now:
+                    self._closed[(basis, anchor if basis == BILLING else None, start)] = (now_monotonic, period)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "closedPeriods": len(self._closed),
+                "scans": self.scans,
+                "rowsScanned": self.rows_scanned,
+                "closedHits": self.closed_hits,
+                "invalidations": self.invalidations,
+            }
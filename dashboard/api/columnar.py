@@ -0,0 +1,129 @@
+import json
+import struct
+import sys
+from array import array
+from typing import Any, Iterable, Sequence
+
+FORMATS = ("rows", "columns", "binary")
+COLUMNS_MEDIA_TYPE = "application/vnd.kyz.columns+json"
+BINARY_MEDIA_TYPE = "application/vnd.kyz.columnar"
+
+# Binary layout: b"KYZC" | u16 version | u16 reserved | u32 header length | header JSON, then one
+# block per column, each 8-byte aligned so the browser can view it as a typed array in place. The
+# header lists rows, response metadata and {name, type, offset, length} per column.
+MAGIC = b"KYZC"
+VERSION = 1
+_TYPECODES = {"u32": "I", "f32": "f", "f64": "d"}
+
+# (name, type, values); values are plain sequences or arrays, one entry per row.
+Column = tuple[str, str, Sequence[Any]]
+
+
+def negotiate_format(requested: str | None, accept: str | None) -> str:
+    """An explicit ``format`` query value wins; otherwise the Accept header picks, defaulting to rows."""
+    if requested:
+        value = requested.strip().lower()
+        if value not in FORMATS:
+            raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+        return value
+    accept = (accept or "").lower()
+    if BINARY_MEDIA_TYPE in accept:
+        return "binary"
+    if COLUMNS_MEDIA_TYPE in accept:
+        return "columns"
+    return "rows"
+
+
+def pack_bits(values: Iterable[Any]) -> bytes:
+    packed = bytearray()
+    byte = 0
+    bit = 0
+    for value in values:
+        if value:
+            byte |= 1 << bit
+        bit += 1
+        if bit == 8:
+            packed.append(byte)
+            byte = bit = 0
+    if bit:
+        packed.append(byte)
+    return bytes(packed)
+
+
+def _column_bytes(kind: str, values: Sequence[Any]) -> bytes:
+    if kind == "bits":
+        return pack_bits(values)
+    typecode = _TYPECODES[kind]
+    data = values if isinstance(values, array) and values.typecode == typecode else array(typecode, values)
+    if sys.byteorder != "little":
+        data = array(typecode, data)
+        data.byteswap()
+    return data.tobytes()
+
+
+def _pad(length: int) -> int:
+    return -length % 8
+
+
+def encode_binary(columns: Sequence[Column], rows: int, meta: dict[str, Any]) -> bytes:
+    blocks = [(name, kind, _column_bytes(kind, values)) for name, kind, values in columns]
+    directory: list[dict[str, Any]] = []
+    header: dict[str, Any] = {"rows": rows, **meta, "columns": directory}
+
+    # Offsets depend on the header length, which depends on the offsets; iterate until stable.
+    header_bytes = b""
+    while True:
+        offset = 12 + len(header_bytes) + _pad(12 + len(header_bytes))
+        directory.clear()
+        for name, kind, data in blocks:
+            directory.append({"name": name, "type": kind, "offset": offset, "length": len(data)})
+            offset += len(data) + _pad(len(data))
+        encoded = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        stable = len(encoded) == len(header_bytes)
+        header_bytes = encoded
+        if stable:
+            break
+
+    parts = [MAGIC, struct.pack("<HHI", VERSION, 0, len(header_bytes)), header_bytes, b"\0" * _pad(12 + len(header_bytes))]
+    for _, _, data in blocks:
+        parts.append(data)
+        parts.append(b"\0" * _pad(len(data)))
+    return b"".join(parts)
+
+
+def decode_binary(payload: bytes) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Header and ``{name: array | list[bool]}``; used by tests and tooling."""
+    if payload[:4] != MAGIC:
+        raise ValueError("not a KYZC payload")
+    _, _, header_length = struct.unpack_from("<HHI", payload, 4)
+    header = json.loads(payload[12 : 12 + header_length])
+    columns: dict[str, Any] = {}
+    for column in header["columns"]:
+        raw = payload[column["offset"] : column["offset"] + column["length"]]
+        if column["type"] == "bits":
+            columns[column["name"]] = [bool(raw[i // 8] >> (i % 8) & 1) for i in range(header["rows"])]
+        else:
+            values = array(_TYPECODES[column["type"]])
+            values.frombytes(raw)
+            if sys.byteorder != "little":
+                values.byteswap()
+            columns[column["name"]] = values
+    return header, columns
+
+
+def _json_values(kind: str, values: Sequence[Any]) -> list[Any]:
+    if kind == "bits":
+        return [1 if value else 0 for value in values]
+    if kind == "u32":
+        return values.tolist() if isinstance(values, array) else list(values)
+    # NaN (missing live samples) is not valid JSON.
+    return [None if value != value else value for value in values]
+
+
+def encode_columns_json(columns: Sequence[Column], rows: int, meta: dict[str, Any]) -> bytes:
+    payload = {
+        "rows": rows,
+        **meta,
+        "columns": {name: _json_values(kind, values) for name, kind, values in columns},
+    }
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
@@ -0,0 +1,59 @@
+import hashlib
+from datetime import datetime
+from typing import Any, Iterable, Mapping
+
+# Endpoint path -> datasets whose version token decides whether its response can have changed.
+CONDITIONAL_DATASETS: dict[str, tuple[str, ...]] = {
+    "/api/latest": ("interval",),
+    "/api/series": ("interval",),
+    "/api/daily": ("interval",),
+    "/api/billing": ("interval",),
+    "/api/monthly-demand": ("interval",),
+    "/api/summary": ("interval", "live"),
+    "/api/live/latest": ("live",),
+    "/api/live/series": ("live",),
+}
+
+# Relative windows ("last 24h", "today") move even when no row lands; one interval is the finest
+# step any of the covered responses depends on.
+TIME_BUCKET_SECONDS = 900
+
+# Query parameters that never change the payload.
+_IGNORED_PARAMS = {"token"}
+
+
+def dataset_version(last_end: Any, row_count: Any) -> str:
+    return f"{last_end.isoformat() if last_end is not None else '-'}/{int(row_count or 0)}"
+
+
+def version_end(version: str | None) -> datetime | None:
+    """Newest row timestamp in a ``dataset_version`` token."""
+    last_end = (version or "-").rsplit("/", 1)[0]
+    return None if last_end == "-" else datetime.fromisoformat(last_end)
+
+
+def build_etag(
+    path: str,
+    query: Iterable[tuple[str, str]],
+    accept: str | None,
+    versions: Mapping[str, str],
+    datasets: Iterable[str],
+    now_epoch: float,
+) -> str:
+    digest = hashlib.sha1()
+    parts = [
+        path,
+        "&".join(f"{key}={value}" for key, value in sorted(query) if key not in _IGNORED_PARAMS),
+        accept or "",
+        *(f"{name}:{versions.get(name, '')}" for name in datasets),
+        str(int(now_epoch // TIME_BUCKET_SECONDS)),
+    ]
+    digest.update("\n".join(parts).encode("utf-8"))
+    return f'"{digest.hexdigest()[:24]}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
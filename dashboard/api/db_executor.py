@@ -0,0 +1,118 @@
+import asyncio
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class EndpointBusyError(Exception):
+    """Raised when an endpoint already has ``max_queue`` requests waiting for a DB slot."""
+
+
+@dataclass
+class _EndpointStats:
+    calls: int = 0
+    running: int = 0
+    waiting: int = 0
+    rejected: int = 0
+    failures: int = 0
+    queue_seconds_total: float = 0.0
+    queue_seconds_max: float = 0.0
+    run_seconds_total: float = 0.0
+
+
+class DbExecutor:
+    """Dedicated thread pool for blocking pyodbc work, with a concurrency cap per endpoint.
+
+    Async handlers await ``run(name, fn, ...)``: at most ``max_concurrency`` calls per name
+    hold a worker at once, at most ``max_queue`` more wait (beyond that ``EndpointBusyError``),
+    and the pool is sized to the DB connection pool so workers never block on a lease. Queue
+    time is measured from the await to the moment a worker starts the call.
+    """
+
+    def __init__(self, max_workers: int = 8, max_concurrency: int = 4, max_queue: int = 64) -> None:
+        self.max_workers = max(1, max_workers)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self._executor: ThreadPoolExecutor | None = None
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._stats: dict[str, _EndpointStats] = {}
+        self._lock = Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="db")
+            return self._executor
+
+    def _endpoint(self, name: str) -> tuple[asyncio.Semaphore, _EndpointStats]:
+        semaphore = self._semaphores.get(name)
+        if semaphore is None:
+            semaphore = self._semaphores[name] = asyncio.Semaphore(self.max_concurrency)
+            self._stats[name] = _EndpointStats()
+        return semaphore, self._stats[name]
+
+    async def run(self, name: str, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        semaphore, stats = self._endpoint(name)
+        if semaphore.locked() and stats.waiting >= self.max_queue:
+            stats.rejected += 1
+            raise EndpointBusyError(name)
+        queued_at = time.perf_counter()
+        started_at = queued_at
+
+        def call() -> T:
+            nonlocal started_at
+            started_at = time.perf_counter()
+            return fn(*args, **kwargs)
+
+        stats.waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            stats.waiting -= 1
+        stats.running += 1
+        try:
+            # Carry the caller's context (e.g. the request's perf trace) onto the worker thread.
+            context = contextvars.copy_context()
+            return await asyncio.get_running_loop().run_in_executor(self.executor, context.run, call)
+        except Exception:
+            stats.failures += 1
+            raise
+        finally:
+            semaphore.release()
+            stats.running -= 1
+            stats.calls += 1
+            queue_seconds = started_at - queued_at
+            stats.queue_seconds_total += queue_seconds
+            stats.queue_seconds_max = max(stats.queue_seconds_max, queue_seconds)
+            stats.run_seconds_total += time.perf_counter() - started_at
+
+    def close(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "workers": self.max_workers,
+            "maxConcurrency": self.max_concurrency,
+            "endpoints": {
+                name: {
+                    "calls": stats.calls,
+                    "running": stats.running,
+                    "waiting": stats.waiting,
+                    "rejected": stats.rejected,
+                    "failures": stats.failures,
+                    "queueMsAvg": round(stats.queue_seconds_total * 1000 / stats.calls, 2) if stats.calls else 0.0,
+                    "queueMsMax": round(stats.queue_seconds_max * 1000, 2),
+                    "runMsAvg": round(stats.run_seconds_total * 1000 / stats.calls, 2) if stats.calls else 0.0,
+                }
+                for name, stats in sorted(self._stats.items())
+            },
+        }
@@ -0,0 +1,243 @@
+import logging
+import time
+from collections import deque
+from threading import Condition
+from typing import Any, Callable
+
+
+class PoolTimeoutError(RuntimeError):
+    pass
+
+
+class _PooledConnection:
+    __slots__ = ("conn", "created_at", "last_used_at")
+
+    def __init__(self, conn: Any) -> None:
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used_at = self.created_at
+
+
+class _LeasedConnection:
+    """The pooled connection as seen by one lease; remembers the cursors it hands out."""
+
+    def __init__(self, conn: Any) -> None:
+        self.raw = conn
+        self.cursors: list[Any] = []
+
+    def cursor(self) -> Any:
+        cursor = self.raw.cursor()
+        self.cursors.append(cursor)
+        return cursor
+
+    def execute(self, *args: Any) -> Any:
+        return self.cursor().execute(*args)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.raw, name)
+
+
+class ConnectionLease:
+    """Context manager handing out a pooled connection; ``with get_db_connection() as conn`` keeps working.
+
+    On exit every cursor opened through the lease is closed (and an open transaction rolled
+    back) before the connection goes back to the pool, so the next lease never inherits a
+    pending result set or lock. A connection that cannot be cleaned up is discarded.
+    """
+
+    def __init__(self, pool: "ConnectionPool") -> None:
+        self._pool = pool
+        self._pooled: _PooledConnection | None = None
+        self._conn: _LeasedConnection | None = None
+
+    def __enter__(self) -> Any:
+        self._pooled = self._pool.acquire()
+        self._conn = _LeasedConnection(self._pooled.conn)
+        return self._conn
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> bool:
+        if self._pooled is not None:
+            broken = exc is not None and isinstance(exc, self._pool.discard_on)
+            if not broken and self._conn is not None:
+                broken = not self._pool.reset(self._conn)
+            self._pool.release(self._pooled, discard=broken)
+            self._pooled = None
+            self._conn = None
+        return False
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float | None:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round((pct / 100.0) * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class ConnectionPool:
+    """Bounded, thread-safe LIFO pool of DB connections.
+
+    Idle connections are validated with ``SELECT 1`` before reuse once they have been
+    idle for ``validate_after_idle_seconds``, and recycled after ``max_lifetime_seconds``
+    so Azure SQL gateway/idle timeouts never surface as request errors.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        max_size: int = 8,
+        max_lifetime_seconds: float = 1800.0,
+        validate_after_idle_seconds: float = 30.0,
+        acquire_timeout_seconds: float = 15.0,
+        discard_on: tuple[type[BaseException], ...] = (Exception,),
+        logger: logging.Logger | None = None,
+    ) -> None:
+        self._connect = connect
+        self.max_size = max(1, max_size)
+        self.max_lifetime_seconds = max_lifetime_seconds
+        self.validate_after_idle_seconds = validate_after_idle_seconds
+        self.acquire_timeout_seconds = acquire_timeout_seconds
+        self.discard_on = discard_on
+        self.logger = logger or logging.getLogger(__name__)
+        self._cond = Condition()
+        self._idle: list[_PooledConnection] = []
+        self._open = 0
+        self._closed = False
+
+        self.acquires = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.created = 0
+        self.discarded = 0
+        self.recycled = 0
+        self.validation_failures = 0
+        self._wait_ms: deque[float] = deque(maxlen=1024)
+
+    def lease(self) -> ConnectionLease:
+        return ConnectionLease(self)
+
+    def acquire(self) -> _PooledConnection:
+        started = time.monotonic()
+        deadline = started + self.acquire_timeout_seconds
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeoutError("Connection pool is closed")
+                if self._idle:
+                    pooled: _PooledConnection | None = self._idle.pop()
+                    break
+                if self._open < self.max_size:
+                    self._open += 1
+                    pooled = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeoutError(f"Timed out after {self.acquire_timeout_seconds}s waiting for a DB connection")
+                waited = True
+                self._cond.wait(remaining)
+            self.acquires += 1
+            if waited:
+                self.waits += 1
+            self._wait_ms.append((time.monotonic() - started) * 1000.0)
+
+        now = time.monotonic()
+        if pooled is not None and now - pooled.created_at >= self.max_lifetime_seconds:
+            self._close_quietly(pooled)
+            pooled = None
+            with self._cond:
+                self.recycled += 1
+        if pooled is not None and now - pooled.last_used_at >= self.validate_after_idle_seconds and not self._validate(pooled):
+            self._close_quietly(pooled)
+            pooled = None
+            with self._cond:
+                self.validation_failures += 1
+
+        if pooled is None:
+            try:
+                pooled = _PooledConnection(self._connect())
+            except BaseException:
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self.created += 1
+        return pooled
+
+    def release(self, pooled: _PooledConnection, discard: bool = False) -> None:
+        pooled.last_used_at = time.monotonic()
+        expired = pooled.last_used_at - pooled.created_at >= self.max_lifetime_seconds
+        with self._cond:
+            close = discard or expired or self._closed
+            if close:
+                self._open -= 1
+                if discard:
+                    self.discarded += 1
+                elif expired:
+                    self.recycled += 1
+            else:
+                self._idle.append(pooled)
+            self._cond.notify()
+        if close:
+            self._close_quietly(pooled)
+
+    def reset(self, leased: _LeasedConnection) -> bool:
+        """Close a lease's cursors and roll back what it left open; False if the connection is unusable."""
+        try:
+            for cursor in leased.cursors:
+                cursor.close()
+            if not getattr(leased.raw, "autocommit", True):
+                leased.raw.rollback()
+            return True
+        except Exception:
+            self.logger.warning("Discarding pooled DB connection that failed to reset", exc_info=True)
+            return False
+        finally:
+            leased.cursors.clear()
+
+    def _validate(self, pooled: _PooledConnection) -> bool:
+        try:
+            cursor = pooled.conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception:
+            self.logger.warning("Discarding pooled DB connection that failed validation", exc_info=True)
+            return False
+
+    def _close_quietly(self, pooled: _PooledConnection) -> None:
+        try:
+            pooled.conn.close()
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for pooled in idle:
+            self._close_quietly(pooled)
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            wait_ms = sorted(self._wait_ms)
+            return {
+                "maxSize": self.max_size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "inUse": self._open - len(self._idle),
+                "acquires": self.acquires,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "created": self.created,
+                "discarded": self.discarded,
+                "recycled": self.recycled,
+                "validationFailures": self.validation_failures,
+                "waitMsP50": _percentile(wait_ms, 50),
+                "waitMsP99": _percentile(wait_ms, 99),
+                "waitMsMax": wait_ms[-1] if wait_ms else None,
+            }
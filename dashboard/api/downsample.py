@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import math
+from typing import Any, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # optional: the pure-Python loops below give the same indices
+    np = None
+
+METHODS = ("minmax", "lttb")
+
+
+def _bucket_seconds(epochs: Sequence[int], buckets: int, native_seconds: int) -> int:
+    span = epochs[-1] - epochs[0] + native_seconds
+    seconds = max(native_seconds, math.ceil(span / max(1, buckets)))
+    # Round up to whole source samples so buckets line up with interval/sample boundaries.
+    return math.ceil(seconds / native_seconds) * native_seconds
+
+
+def minmax_indices(epochs: Sequence[int], values: Sequence[float], max_points: int, native_seconds: int) -> tuple[list[int], int]:
+    """Keep the min and max sample of each fixed-width time bucket, in time order.
+
+    Every local peak and trough survives, so demand spikes are never averaged away; empty
+    buckets stay empty, so data gaps remain visible.
+    """
+    if len(epochs) <= max_points:
+        return list(range(len(epochs))), native_seconds
+    bucket_seconds = _bucket_seconds(epochs, max(1, max_points // 2), native_seconds)
+    keep = _minmax_numpy(epochs, values, bucket_seconds) if np is not None else None
+    if keep is None:  # NumPy missing, or gaps (NaN) the vectorized reductions cannot skip like the loop does
+        keep = _minmax_python(epochs, values, bucket_seconds)
+    return keep, bucket_seconds
+
+
+def _minmax_python(epochs: Sequence[int], values: Sequence[float], bucket_seconds: int) -> list[int]:
+    origin = epochs[0]
+    keep: list[int] = []
+    bucket = -1
+    lo = hi = 0
+    for index, epoch in enumerate(epochs):
+        current = (epoch - origin) // bucket_seconds
+        if current != bucket:
+            if bucket >= 0:
+                keep.extend(sorted({lo, hi}))
+            bucket = current
+            lo = hi = index
+            continue
+        value = values[index]
+        if value < values[lo]:
+            lo = index
+        if value > values[hi]:
+            hi = index
+    keep.extend(sorted({lo, hi}))
+    return keep
+
+
+def _minmax_numpy(epochs: Sequence[int], values: Sequence[float], bucket_seconds: int) -> list[int] | None:
+    times = np.asarray(epochs, dtype=np.int64)
+    kw = np.asarray(values, dtype=np.float64)
+    if np.isnan(kw).any():
+        return None
+    buckets = (times - times[0]) // bucket_seconds
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    owner = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(kw)]))
+    # The earliest sample equal to each bucket's min (max), matching the loop's strict comparisons.
+    lo = _first_per_bucket(np.flatnonzero(kw == np.minimum.reduceat(kw, starts)[owner]), owner)
+    hi = _first_per_bucket(np.flatnonzero(kw == np.maximum.reduceat(kw, starts)[owner]), owner)
+    keep = np.column_stack((np.minimum(lo, hi), np.maximum(lo, hi))).ravel()
+    return keep[np.r_[True, keep[1:] != keep[:-1]]].tolist()
+
+
+def _first_per_bucket(hits: Any, owner: Any) -> Any:
+    hit_owner = owner[hits]
+    return hits[np.r_[True, hit_owner[1:] != hit_owner[:-1]]]
+
+
+def lttb_indices(epochs: Sequence[int], values: Sequence[float], max_points: int, native_seconds: int) -> tuple[list[int], int]:
+    """Largest-Triangle-Three-Buckets, with the bucket holding the global maximum pinned to it."""
+    count = len(epochs)
+    if count <= max_points or max_points < 3:
+        return list(range(count)), native_seconds
+    if np is not None:
+        return _lttb_numpy(epochs, values, max_points), _bucket_seconds(epochs, max_points - 2, native_seconds)
+    peak = max(range(count), key=values.__getitem__)
+    every = (count - 2) / (max_points - 2)
+    keep = [0]
+    selected = 0
+    for bucket in range(max_points - 2):
+        start = int(bucket * every) + 1
+        end = int((bucket + 1) * every) + 1
+        if start <= peak < end:
+            selected = peak
+            keep.append(selected)
+            continue
+        next_start = end
+        next_end = min(int((bucket + 2) * every) + 1, count)
+        next_count = max(1, next_end - next_start)
+        avg_x = sum(epochs[next_start:next_end]) / next_count
+        avg_y = sum(values[next_start:next_end]) / next_count
+        ax, ay = epochs[selected], values[selected]
+        best_area = -1.0
+        for index in range(start, end):
+            area = abs((ax - avg_x) * (values[index] - ay) - (ax - epochs[index]) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                selected = index
+        keep.append(selected)
+    keep.append(count - 1)
+    return keep, _bucket_seconds(epochs, max_points - 2, native_seconds)
+
+
+def _lttb_numpy(epochs: Sequence[int], values: Sequence[float], max_points: int) -> list[int]:
+    # Buckets still go in sequence (each pick depends on the last); bounds, next-bucket averages
+    # and the triangle areas inside each bucket are computed with array operations.
+    times = np.asarray(epochs, dtype=np.int64)
+    kw = np.asarray(values, dtype=np.float64)
+    count = len(times)
+    peak = int(np.argmax(kw))
+    every = (count - 2) / (max_points - 2)
+    bounds = (np.arange(max_points) * every).astype(np.int64) + 1
+    bounds[-1] = min(int(bounds[-1]), count)
+    time_sums = np.r_[0, np.cumsum(times)]
+    value_sums = np.r_[0.0, np.cumsum(kw)]
+    next_counts = np.maximum(1, bounds[2:] - bounds[1:-1])
+    avg_xs = ((time_sums[bounds[2:]] - time_sums[bounds[1:-1]]) / next_counts).tolist()
+    avg_ys = ((value_sums[bounds[2:]] - value_sums[bounds[1:-1]]) / next_counts).tolist()
+    starts = bounds[:-2].tolist()
+    ends = bounds[1:-1].tolist()
+    keep = [0]
+    selected = 0
+    for start, end, avg_x, avg_y in zip(starts, ends, avg_xs, avg_ys):
+        if start <= peak < end:
+            selected = peak
+        else:
+            ax, ay = int(times[selected]), float(kw[selected])
+            areas = np.abs((ax - avg_x) * (kw[start:end] - ay) - (ax - times[start:end]) * (avg_y - ay))
+            selected = start + int(areas.argmax())
+        keep.append(selected)
+    keep.append(count - 1)
+    return keep
+
+
+def downsample_indices(
+    epochs: Sequence[int], values: Sequence[float], max_points: int, native_seconds: int, method: str = "minmax"
+) -> tuple[list[int], int]:
+    if method == "lttb":
+        return lttb_indices(epochs, values, max_points, native_seconds)
+    return minmax_indices(epochs, values, max_points, native_seconds)
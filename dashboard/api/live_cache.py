@@ -0,0 +1,179 @@
+import logging
+import math
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Any, Callable, Iterable, Sequence
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def naive_epoch(value: datetime) -> int:
+    """Seconds since 1970-01-01 on the naive local wall clock, matching SampleEnd storage."""
+    return (value - _EPOCH) // timedelta(seconds=1)
+
+
+def _value(raw: Any) -> float:
+    return math.nan if raw is None else float(raw)
+
+
+def _json_value(value: float) -> float | None:
+    return None if value != value else value
+
+
+def live_points(iso: Sequence[str], kw: Sequence[float], kwh: Sequence[float], indices: Iterable[int] | None = None) -> list[dict[str, Any]]:
+    if indices is None:
+        return [{"t": t, "kW": _json_value(k), "kWh": _json_value(e)} for t, k, e in zip(iso, kw, kwh)]
+    return [{"t": iso[i], "kW": _json_value(kw[i]), "kWh": _json_value(kwh[i])} for i in indices]
+
+
+class LiveSampleCache:
+    """Rolling in-memory copy of recent ``dbo.KYZ_Live15s`` samples.
+
+    Columns live in typed arrays (int64 epochs, float kW/kWh/Total_kWh) plus the pre-rendered
+    ISO timestamp, so series slices are two bisects and one list comprehension. Refreshes fetch
+    only rows newer than the last seen ``SampleEnd`` (with a small overlap for late writes);
+    evicted rows are compacted away in bulk once the dead prefix outgrows the live window.
+    One cache holds one meter. The dashboard's fetch relies on row-level security for that; rows
+    that do carry a different ``MeterId`` are ignored, so samples from several meters with the
+    same ``SampleEnd`` can never be mixed.
+    """
+
+    def __init__(
+        self,
+        fetch_since: Callable[[datetime], Sequence[Any]],
+        retention_seconds: int,
+        refresh_seconds: float = 5.0,
+        overlap_seconds: int = 120,
+        logger: logging.Logger | None = None,
+        meter_id: str = "main",
+    ) -> None:
+        self._fetch_since = fetch_since
+        self.meter_id = meter_id
+        self.retention_seconds = retention_seconds
+        self.refresh_seconds = refresh_seconds
+        self.overlap_seconds = overlap_seconds
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = Lock()
+        self._epochs = array("q")
+        self._kw = array("d")
+        self._kwh = array("d")
+        self._total_kwh = array("d")
+        self._pulses = array("q")
+        self._iso: list[str] = []
+        self._start = 0
+        self._loaded_from: int | None = None
+        self._refreshed_at = 0.0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.rows_fetched = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.retention_seconds > 0
+
+    def __len__(self) -> int:
+        return len(self._epochs) - self._start
+
+    def covers(self, start: datetime) -> bool:
+        return self._loaded_from is not None and naive_epoch(start) >= self._loaded_from
+
+    def has_through(self, end: datetime) -> bool:
+        """Whether the newest cached sample is at or after ``end``."""
+        with self._lock:
+            return len(self) > 0 and self._epochs[-1] >= naive_epoch(end)
+
+    def _insert(self, row: Any) -> None:
+        if getattr(row, "MeterId", self.meter_id) != self.meter_id:
+            return
+        epoch = naive_epoch(row.SampleEnd)
+        index = len(self._epochs)
+        if index > self._start and epoch <= self._epochs[-1]:
+            index = bisect_left(self._epochs, epoch, self._start)
+            if index < len(self._epochs) and self._epochs[index] == epoch:
+                return
+        pulses = -1 if row.PulseCount is None else int(row.PulseCount)
+        values = (epoch, _value(row.kW), _value(row.kWh), _value(row.Total_kWh), pulses)
+        if index == len(self._epochs):
+            for column, value in zip(self._columns(), values):
+                column.append(value)
+            self._iso.append(row.SampleEnd.isoformat())
+        else:
+            for column, value in zip(self._columns(), values):
+                column.insert(index, value)
+            self._iso.insert(index, row.SampleEnd.isoformat())
+
+    def _columns(self) -> tuple[array, ...]:
+        return (self._epochs, self._kw, self._kwh, self._total_kwh, self._pulses)
+
+    def _evict(self, now: datetime) -> None:
+        self._loaded_from = max(self._loaded_from or 0, naive_epoch(now) - self.retention_seconds)
+        self._start = bisect_left(self._epochs, self._loaded_from, self._start)
+        if self._start and self._start >= len(self):
+            for column in self._columns():
+                del column[: self._start]
+            del self._iso[: self._start]
+            self._start = 0
+
+    def refresh(self, now: datetime | None = None, force: bool = False) -> None:
+        now = now or datetime.now()
+        with self._lock:
+            if not force and time.monotonic() - self._refreshed_at < self.refresh_seconds:
+                return
+            if len(self):
+                since = datetime.fromisoformat(self._iso[-1]) - timedelta(seconds=self.overlap_seconds)
+            else:
+                since = now - timedelta(seconds=self.retention_seconds)
+            try:
+                rows = self._fetch_since(since)
+            except Exception:
+                self.refresh_failures += 1
+                self._refreshed_at = time.monotonic()
+                if self._loaded_from is None:
+                    raise
+                self.logger.exception("Live sample cache refresh failed; serving cached rows")
+                return
+            for row in rows:
+                self._insert(row)
+            self._evict(now)
+            self._refreshed_at = time.monotonic()
+            self.refreshes += 1
+            self.rows_fetched += len(rows)
+
+    def latest(self) -> dict[str, Any] | None:
+        with self._lock:
+            if not len(self):
+                return None
+            pulses = self._pulses[-1]
+            return {
+                "SampleEnd": self._iso[-1],
+                "kW": _json_value(self._kw[-1]),
+                "kWh": _json_value(self._kwh[-1]),
+                "PulseCount": None if pulses < 0 else pulses,
+                "Total_kWh": _json_value(self._total_kwh[-1]),
+            }
+
+    def window(self, start: datetime, end: datetime) -> tuple[array, list[str], array, array]:
+        """Epochs, ISO timestamps, kW and kWh for samples in ``[start, end]``, as copied slices."""
+        with self._lock:
+            lo = bisect_left(self._epochs, naive_epoch(start), self._start)
+            hi = bisect_right(self._epochs, naive_epoch(end), lo)
+            return self._epochs[lo:hi], self._iso[lo:hi], self._kw[lo:hi], self._kwh[lo:hi]
+
+    def series(self, start: datetime, end: datetime) -> list[dict[str, Any]]:
+        _, iso, kw, kwh = self.window(start, end)
+        return live_points(iso, kw, kwh)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "meterId": self.meter_id,
+                "rows": len(self),
+                "oldest": self._iso[self._start] if len(self) else None,
+                "newest": self._iso[-1] if len(self) else None,
+                "refreshes": self.refreshes,
+                "refreshFailures": self.refresh_failures,
+                "rowsFetched": self.rows_fetched,
+            }
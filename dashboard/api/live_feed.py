@@ -0,0 +1,111 @@
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable
+
+# Event name -> payload; a payload is broadcast whenever it differs from the last one sent.
+Snapshot = dict[str, dict[str, Any]]
+
+
+def format_sse(event: str, payload: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+class LiveFeed:
+    """One shared DB poller fanning SSE events out to every connected client.
+
+    Each subscriber is an ``asyncio.Queue`` of pre-formatted SSE frames, so per-client cost is a
+    queue slot; the database sees one poll per interval regardless of how many screens are
+    connected. The poller runs only while there are subscribers.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], Snapshot],
+        poll_seconds: float = 5.0,
+        heartbeat_seconds: float = 15.0,
+        queue_size: int = 16,
+        max_subscribers: int = 0,
+        executor: Executor | None = None,
+        logger: logging.Logger | None = None,
+    ) -> None:
+        self._fetch = fetch
+        self.poll_seconds = poll_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.queue_size = queue_size
+        # 0 means unlimited.
+        self.max_subscribers = max_subscribers
+        self.executor = executor
+        self.logger = logger or logging.getLogger(__name__)
+        self._subscribers: set[asyncio.Queue[str]] = set()
+        self._last: Snapshot = {}
+        self._task: asyncio.Task[None] | None = None
+        self.polls = 0
+        self.poll_failures = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    @property
+    def full(self) -> bool:
+        return 0 < self.max_subscribers <= len(self._subscribers)
+
+    def subscribe(self) -> "asyncio.Queue[str]":
+        queue: asyncio.Queue[str] = asyncio.Queue(maxsize=self.queue_size)
+        # Late joiners get the current state straight away instead of waiting for the next change.
+        for event, payload in self._last.items():
+            queue.put_nowait(format_sse(event, payload))
+        self._subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="live-feed")
+        return queue
+
+    def unsubscribe(self, queue: "asyncio.Queue[str]") -> None:
+        self._subscribers.discard(queue)
+
+    def publish(self, frame: str) -> None:
+        for queue in self._subscribers:
+            if queue.full():
+                # A stalled client only ever misses stale frames; it never blocks the others.
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(frame)
+
+    def apply(self, snapshot: Snapshot) -> int:
+        sent = 0
+        for event, payload in snapshot.items():
+            if payload and payload != self._last.get(event):
+                self._last[event] = payload
+                self.publish(format_sse(event, payload))
+                sent += 1
+        return sent
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        last_sent = time.monotonic()
+        while self._subscribers:
+            try:
+                snapshot = await loop.run_in_executor(self.executor, self._fetch)
+                self.polls += 1
+                if self.apply(snapshot):
+                    last_sent = time.monotonic()
+            except Exception:
+                self.poll_failures += 1
+                self.logger.exception("SSE polling failed")
+                self.publish(format_sse("error", {"message": "poll failure"}))
+            if time.monotonic() - last_sent >= self.heartbeat_seconds:
+                self.publish(format_sse("heartbeat", {}))
+                last_sent = time.monotonic()
+            await asyncio.sleep(self.poll_seconds)
+        # Nobody is listening; forget the snapshot so the next subscriber is not sent stale data.
+        self._last = {}
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "subscribers": len(self._subscribers),
+            "polls": self.polls,
+            "pollFailures": self.poll_failures,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,396 @@
+import logging
+import sys
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any, Iterable, Mapping
+
+# Upper bounds in milliseconds; the last bucket is +Inf.
+LATENCY_BUCKETS_MS = (5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0, 1000.0, 2500.0, 5000.0, 10000.0)
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    def __init__(self, buckets_ms: tuple[float, ...] = LATENCY_BUCKETS_MS) -> None:
+        self.buckets_ms = buckets_ms
+        self.counts = [0] * (len(buckets_ms) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        self.counts[bisect_left(self.buckets_ms, ms)] += 1
+        self.count += 1
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def quantile(self, q: float) -> float | None:
+        """Upper bound of the bucket holding the q-th observation, capped at the observed max."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets_ms, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def summary(self) -> dict[str, Any]:
+        def rounded(value: float | None) -> float | None:
+            return round(value, 2) if value is not None else None
+
+        return {
+            "count": self.count,
+            "avg": rounded(self.sum_ms / self.count) if self.count else None,
+            "p50": rounded(self.quantile(0.5)),
+            "p95": rounded(self.quantile(0.95)),
+            "p99": rounded(self.quantile(0.99)),
+            "max": rounded(self.max_ms) if self.count else None,
+        }
+
+
+@dataclass
+class RequestTrace:
+    """Per-request totals; shared by reference with the DB worker thread through a context copy."""
+
+    started: float = field(default_factory=time.perf_counter)
+    route: str = ""
+    sql_seconds: float = 0.0
+    sql_queries: int = 0
+    rows: int = 0
+    pool_wait_seconds: float = 0.0
+    handler_done: float | None = None
+
+
+_trace: ContextVar[RequestTrace | None] = ContextVar("kyz_request_trace", default=None)
+
+
+@dataclass
+class _RouteStats:
+    latency: Histogram = field(default_factory=Histogram)
+    statuses: dict[int, int] = field(default_factory=dict)
+    sql_seconds: float = 0.0
+    sql_queries: int = 0
+    rows: int = 0
+    pool_wait_seconds: float = 0.0
+    serialize_seconds: float = 0.0
+    serialized: int = 0
+
+
+@dataclass
+class _QueryStats:
+    latency: Histogram = field(default_factory=Histogram)
+    rows: int = 0
+    slow: int = 0
+    routes: set[str] = field(default_factory=set)
+
+
+def _caller_label(frame: Any) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name).replace(".<locals>", "")
+    return f"{name}:{frame.f_lineno}"
+
+
+class TimedCursor:
+    """Cursor proxy that times each statement (execute plus its fetches) under the caller's name and line."""
+
+    def __init__(self, cursor: Any, recorder: "PerfRecorder") -> None:
+        self._cursor = cursor
+        self._recorder = recorder
+        self._label: str | None = None
+        self._seconds = 0.0
+        self._rows = 0
+
+    def execute(self, sql: str, *params: Any) -> "TimedCursor":
+        self.finish()
+        self._label = _caller_label(sys._getframe(1))
+        started = time.perf_counter()
+        try:
+            self._cursor.execute(sql, *params)
+        finally:
+            self._seconds += time.perf_counter() - started
+        return self
+
+    def _timed(self, fn: Any, *args: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self._seconds += time.perf_counter() - started
+
+    def fetchone(self) -> Any:
+        row = self._timed(self._cursor.fetchone)
+        if row is not None:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, *size: int) -> list[Any]:
+        rows = self._timed(self._cursor.fetchmany, *size)
+        self._rows += len(rows)
+        return rows
+
+    def fetchall(self) -> list[Any]:
+        rows = self._timed(self._cursor.fetchall)
+        self._rows += len(rows)
+        return rows
+
+    def nextset(self) -> Any:
+        return self._timed(self._cursor.nextset)
+
+    def finish(self) -> None:
+        if self._label is not None:
+            self._recorder.observe_sql(self._label, self._seconds, self._rows)
+        self._label = None
+        self._seconds = 0.0
+        self._rows = 0
+
+    def close(self) -> None:
+        self.finish()
+        self._cursor.close()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+
+class TimedConnection:
+    def __init__(self, conn: Any, recorder: "PerfRecorder") -> None:
+        self._conn = conn
+        self._recorder = recorder
+        self._cursors: list[TimedCursor] = []
+
+    def cursor(self) -> TimedCursor:
+        cursor = TimedCursor(self._conn.cursor(), self._recorder)
+        self._cursors.append(cursor)
+        return cursor
+
+    def finish(self) -> None:
+        for cursor in self._cursors:
+            cursor.finish()
+        self._cursors.clear()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+
+class TimedLease:
+    """Wraps a pool lease: records how long the checkout took and flushes open statements on release."""
+
+    def __init__(self, lease: Any, recorder: "PerfRecorder") -> None:
+        self._lease = lease
+        self._recorder = recorder
+        self._conn: TimedConnection | None = None
+
+    def __enter__(self) -> TimedConnection:
+        started = time.perf_counter()
+        conn = self._lease.__enter__()
+        self._recorder.observe_pool_wait(time.perf_counter() - started)
+        self._conn = TimedConnection(conn, self._recorder)
+        return self._conn
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> bool:
+        if self._conn is not None:
+            self._conn.finish()
+            self._conn = None
+        return self._lease.__exit__(exc_type, exc, tb)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+def _seconds(ms: float) -> str:
+    return repr(round(ms / 1000.0, 6))
+
+
+class PerfRecorder:
+    """In-process request and SQL timings for ``/api/perf``.
+
+    The HTTP middleware opens a ``RequestTrace`` per request; SQL issued through ``lease()``
+    connections is attributed both to its query label (calling function and line) and to the
+    trace of the request that ran it. Statements at or above ``slow_query_ms`` are logged.
+    """
+
+    def __init__(self, slow_query_ms: float = 500.0, logger: logging.Logger | None = None) -> None:
+        self.slow_query_ms = slow_query_ms
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = Lock()
+        self._routes: dict[tuple[str, str], _RouteStats] = {}
+        self._queries: dict[str, _QueryStats] = {}
+        self._pool_wait = Histogram()
+        self.started_at = time.time()
+
+    def lease(self, lease: Any) -> TimedLease:
+        return TimedLease(lease, self)
+
+    def start_request(self) -> RequestTrace:
+        trace = RequestTrace()
+        _trace.set(trace)
+        return trace
+
+    def mark_handler_done(self) -> None:
+        trace = _trace.get()
+        if trace is not None:
+            trace.handler_done = time.perf_counter()
+
+    def observe_pool_wait(self, seconds: float) -> None:
+        trace = _trace.get()
+        if trace is not None:
+            trace.pool_wait_seconds += seconds
+        with self._lock:
+            self._pool_wait.observe(seconds * 1000.0)
+
+    def observe_sql(self, label: str, seconds: float, rows: int) -> None:
+        trace = _trace.get()
+        if trace is not None:
+            trace.sql_seconds += seconds
+            trace.sql_queries += 1
+            trace.rows += rows
+        ms = seconds * 1000.0
+        slow = ms >= self.slow_query_ms
+        with self._lock:
+            stats = self._queries.get(label)
+            if stats is None:
+                stats = self._queries[label] = _QueryStats()
+            stats.latency.observe(ms)
+            stats.rows += rows
+            if slow:
+                stats.slow += 1
+            if trace is not None and trace.route:
+                stats.routes.add(trace.route)
+        if slow:
+            self.logger.warning(
+                "Slow SQL %s took %.1f ms (%d rows, request %s)", label, ms, rows, trace.route if trace and trace.route else "-"
+            )
+
+    def observe_request(self, method: str, route: str, status: int, trace: RequestTrace, finished: float | None = None) -> None:
+        finished = finished or time.perf_counter()
+        with self._lock:
+            stats = self._routes.get((method, route))
+            if stats is None:
+                stats = self._routes[(method, route)] = _RouteStats()
+            stats.latency.observe((finished - trace.started) * 1000.0)
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.sql_seconds += trace.sql_seconds
+            stats.sql_queries += trace.sql_queries
+            stats.rows += trace.rows
+            stats.pool_wait_seconds += trace.pool_wait_seconds
+            if trace.handler_done is not None:
+                # Handler return to response start: jsonable_encoder plus JSON rendering.
+                stats.serialize_seconds += max(0.0, finished - trace.handler_done)
+                stats.serialized += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+            self._queries.clear()
+            self._pool_wait = Histogram()
+            self.started_at = time.time()
+
+    def stats(self) -> dict[str, Any]:
+        def avg_ms(total_seconds: float, count: int) -> float | None:
+            return round(total_seconds * 1000.0 / count, 2) if count else None
+
+        with self._lock:
+            routes = {}
+            for (method, route), stats in sorted(self._routes.items(), key=lambda item: -item[1].latency.sum_ms):
+                count = stats.latency.count
+                routes[f"{method} {route}"] = {
+                    "latencyMs": stats.latency.summary(),
+                    "statuses": {str(status): n for status, n in sorted(stats.statuses.items())},
+                    "sqlMsAvg": avg_ms(stats.sql_seconds, count),
+                    "sqlQueriesAvg": round(stats.sql_queries / count, 2) if count else None,
+                    "rowsAvg": round(stats.rows / count, 2) if count else None,
+                    "poolWaitMsAvg": avg_ms(stats.pool_wait_seconds, count),
+                    "serializeMsAvg": avg_ms(stats.serialize_seconds, stats.serialized),
+                }
+            queries = {
+                label: {
+                    "latencyMs": stats.latency.summary(),
+                    "totalMs": round(stats.latency.sum_ms, 2),
+                    "rows": stats.rows,
+                    "slow": stats.slow,
+                    "routes": sorted(stats.routes),
+                }
+                for label, stats in sorted(self._queries.items(), key=lambda item: -item[1].latency.sum_ms)
+            }
+            return {
+                "since": self.started_at,
+                "slowQueryMs": self.slow_query_ms,
+                "routes": routes,
+                "queries": queries,
+                "poolWaitMs": self._pool_wait.summary(),
+            }
+
+    def prometheus(self, gauges: Mapping[str, float | None] | None = None) -> str:
+        lines: list[str] = []
+
+        def histogram(name: str, help_text: str, series: Iterable[tuple[dict[str, str], Histogram]]) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, hist in series:
+                cumulative = 0
+                for bound, count in zip(hist.buckets_ms, hist.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(**labels, le=_seconds(bound))} {cumulative}")
+                lines.append(f'{name}_bucket{_labels(**labels, le="+Inf")} {hist.count}')
+                lines.append(f"{name}_sum{_labels(**labels)} {_seconds(hist.sum_ms)}")
+                lines.append(f"{name}_count{_labels(**labels)} {hist.count}")
+
+        def counter(name: str, help_text: str, series: Iterable[tuple[dict[str, str], float]]) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in series:
+                lines.append(f"{name}{_labels(**labels)} {round(value, 6)}")
+
+        with self._lock:
+            routes = sorted(self._routes.items())
+            queries = sorted(self._queries.items())
+            histogram(
+                "kyz_http_request_duration_seconds",
+                "API request latency by route template.",
+                (({"method": method, "route": route}, stats.latency) for (method, route), stats in routes),
+            )
+            counter(
+                "kyz_http_requests_total",
+                "API responses by route and status.",
+                (
+                    ({"method": method, "route": route, "status": str(status)}, n)
+                    for (method, route), stats in routes
+                    for status, n in sorted(stats.statuses.items())
+                ),
+            )
+            for name, attr, help_text in (
+                ("kyz_http_sql_seconds_total", "sql_seconds", "SQL time spent on behalf of each route."),
+                ("kyz_http_pool_wait_seconds_total", "pool_wait_seconds", "DB pool checkout time spent by each route."),
+                ("kyz_http_serialize_seconds_total", "serialize_seconds", "Response serialization time by route."),
+                ("kyz_http_sql_rows_total", "rows", "Rows fetched on behalf of each route."),
+            ):
+                counter(name, help_text, (({"method": method, "route": route}, getattr(stats, attr)) for (method, route), stats in routes))
+            histogram(
+                "kyz_sql_statement_duration_seconds",
+                "SQL statement time (execute plus fetch) by query label.",
+                (({"query": label}, stats.latency) for label, stats in queries),
+            )
+            counter("kyz_sql_rows_total", "Rows fetched by query label.", (({"query": label}, stats.rows) for label, stats in queries))
+            counter(
+                "kyz_sql_slow_statements_total",
+                "Statements at or above the slow-query threshold.",
+                (({"query": label}, stats.slow) for label, stats in queries),
+            )
+            histogram("kyz_db_pool_wait_seconds", "DB pool checkout time.", [({}, self._pool_wait)])
+
+        for name, value in (gauges or {}).items():
+            if value is None:
+                continue
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {round(float(value), 6)}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,146 @@
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Callable
+
+
+@dataclass
+class CacheEntry:
+    expires_at: float
+    stale_until: float
+    payload: Any
+
+
+class TTLCache:
+    """Response cache with per-key single-flight, stale-while-revalidate and an LRU bound.
+
+    A fresh entry is returned as is. Callers that can tolerate old data pass a stale window
+    (``stale_seconds``, off by default): an expired entry inside it is returned immediately
+    while one background refresh recomputes it. Anything older is a miss: the first caller
+    runs ``producer`` and concurrent callers for the same key wait for that result instead of
+    running the query again.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        stale_seconds: float = 0.0,
+        refresh_workers: int = 2,
+        logger: logging.Logger | None = None,
+    ) -> None:
+        self.max_entries = max(1, max_entries)
+        self.stale_seconds = stale_seconds
+        self.refresh_workers = max(1, refresh_workers)
+        self.logger = logger or logging.getLogger(__name__)
+        self._store: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._inflight: dict[str, Future] = {}
+        self._lock = Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.evictions = 0
+
+    def get_or_set(
+        self, key: str, ttl_seconds: float, producer: Callable[[], Any], stale_seconds: float | None = None
+    ) -> Any:
+        stale_seconds = self.stale_seconds if stale_seconds is None else stale_seconds
+        now = time.monotonic()
+        with self._lock:
+            cached = self._store.get(key)
+            if cached is not None and cached.stale_until <= now:
+                del self._store[key]
+                cached = None
+            if cached is not None:
+                self._store.move_to_end(key)
+                if cached.expires_at > now:
+                    self.hits += 1
+                    return cached.payload
+                self.stale_hits += 1
+                if key not in self._inflight:
+                    self._inflight[key] = Future()
+                    self._refresh_executor().submit(self._refresh, key, ttl_seconds, stale_seconds, producer)
+                return cached.payload
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                self.misses += 1
+                flight = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return flight.result()
+        return self._produce(key, ttl_seconds, stale_seconds, producer, flight)
+
+    def _produce(self, key: str, ttl_seconds: float, stale_seconds: float, producer: Callable[[], Any], flight: Future) -> Any:
+        try:
+            payload = producer()
+        except BaseException as exc:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.set_exception(exc)
+            raise
+        self._store_payload(key, ttl_seconds, stale_seconds, payload)
+        flight.set_result(payload)
+        return payload
+
+    def _refresh(self, key: str, ttl_seconds: float, stale_seconds: float, producer: Callable[[], Any]) -> None:
+        with self._lock:
+            flight = self._inflight[key]
+        try:
+            self._produce(key, ttl_seconds, stale_seconds, producer, flight)
+        except Exception:
+            with self._lock:
+                self.refresh_failures += 1
+            self.logger.exception("Background refresh failed for cache key %s; serving stale payload", key)
+            return
+        with self._lock:
+            self.refreshes += 1
+
+    def _store_payload(self, key: str, ttl_seconds: float, stale_seconds: float, payload: Any) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._store[key] = CacheEntry(expires_at=now + ttl_seconds, stale_until=now + ttl_seconds + stale_seconds, payload=payload)
+            self._store.move_to_end(key)
+            self._inflight.pop(key, None)
+            if len(self._store) > self.max_entries:
+                for dead in [k for k, entry in self._store.items() if entry.stale_until <= now]:
+                    del self._store[dead]
+            while len(self._store) > self.max_entries:
+                self._store.popitem(last=False)
+                self.evictions += 1
+
+    def _refresh_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.refresh_workers, thread_name_prefix="cache-refresh")
+        return self._executor
+
+    def clear(self) -> None:
+        with self._lock:
+            self._store.clear()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._store),
+                "maxEntries": self.max_entries,
+                "inflight": len(self._inflight),
+                "hits": self.hits,
+                "staleHits": self.stale_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "refreshes": self.refreshes,
+                "refreshFailures": self.refresh_failures,
+                "evictions": self.evictions,
+            }
@@ -1,5 +1,5 @@
 import ReactECharts from 'echarts-for-react'
-import { useEffect, useMemo, useState } from 'react'
+import { useEffect, useMemo, useRef, useState } from 'react'
 import { client } from './api'
 import { INNOV_LOGO_SRC, PRI_LOGO_SRC } from './brand'
 import { buildChartOption } from './chartTheme'
@@ -35,6 +35,7 @@ export function KioskPage() {
   const [latest, setLatest] = useState<LatestRow | null>(null)
   const [liveLatest, setLiveLatest] = useState<LiveLatestRow | null>(null)
   const [liveSeries30m, setLiveSeries30m] = useState<LiveSeriesPoint[]>([])
+  const liveSeriesRef = useRef<LiveSeriesPoint[]>([])
   const [weekSeries, setWeekSeries] = useState<IntervalSeriesPoint[]>([])
   const [summary, setSummary] = useState<Summary | null>(null)
 
@@ -58,14 +59,17 @@ export function KioskPage() {
         client.health(),
         client.latest(),
         client.liveLatest(),
-        client.liveSeries(30),
-        client.series(7 * 24 * 60, week.start.toISOString(), week.end.toISOString()),
+        // After the first load only samples newer than the last one held are fetched.
+        client.liveSeries(30, undefined, liveSeriesRef.current[liveSeriesRef.current.length - 1]?.t),
+        client.series(7 * 24 * 60, week.start.toISOString(), week.end.toISOString(), window.innerWidth),
         client.summary(),
       ])
       setHealth(h)
       setLatest(l)
       setLiveLatest(ll)
-      setLiveSeries30m(live.points)
+      const cutoff = now.getTime() - 30 * 60 * 1000
+      liveSeriesRef.current = [...liveSeriesRef.current, ...live.points].filter((p) => new Date(p.t).getTime() >= cutoff)
+      setLiveSeries30m(liveSeriesRef.current)
       setWeekSeries(weekData.points)
       setSummary(s)
     } catch {
@@ -81,6 +85,9 @@ export function KioskPage() {
     source.addEventListener('latest', () => {
       load()
     })
+    source.addEventListener('live', (event) => {
+      setLiveLatest(JSON.parse((event as MessageEvent).data) as LiveLatestRow)
+    })
     return () => {
       clearInterval(timer)
       source.close()
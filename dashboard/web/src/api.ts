@@ -1,4 +1,4 @@
-import type { BillingResponse, DailyPoint, Health, IntervalSeriesPoint, LatestRow, LiveLatestRow, LiveSeriesPoint, Metrics, Quality, Summary, UsageSummary } from './types'
+import type { BillingResponse, DailyPoint, Health, IntervalSeriesPoint, LatestRow, LiveLatestRow, LiveSeriesPoint, Metrics, Quality, SeriesResolution, Summary, UsageSummary } from './types'
 
 const token = new URLSearchParams(window.location.search).get('token')
 
@@ -14,6 +14,40 @@ async function apiGet<T>(path: string): Promise<T> {
   return res.json()
 }
 
+type ColumnarHeader = {
+  rows: number
+  resolution?: SeriesResolution
+  columns: { name: string; type: 'u32' | 'f32' | 'f64' | 'bits'; offset: number; length: number }[]
+}
+
+// Decodes the KYZC typed-array payload (dashboard/api/columnar.py) served for format=binary.
+function decodeColumnar(buffer: ArrayBuffer): { header: ColumnarHeader; columns: Record<string, ArrayLike<number>> } {
+  const view = new DataView(buffer)
+  const headerLength = view.getUint32(8, true)
+  const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 12, headerLength))) as ColumnarHeader
+  const columns: Record<string, ArrayLike<number>> = {}
+  for (const column of header.columns) {
+    if (column.type === 'u32') columns[column.name] = new Uint32Array(buffer, column.offset, header.rows)
+    else if (column.type === 'f32') columns[column.name] = new Float32Array(buffer, column.offset, header.rows)
+    else if (column.type === 'f64') columns[column.name] = new Float64Array(buffer, column.offset, header.rows)
+    else {
+      const bytes = new Uint8Array(buffer, column.offset, column.length)
+      columns[column.name] = Array.from({ length: header.rows }, (_, i) => (bytes[i >> 3] >> (i & 7)) & 1)
+    }
+  }
+  return { header, columns }
+}
+
+// Epoch seconds of the plant's naive local wall clock, rendered back to the API's ISO form.
+const naiveIso = (epochSeconds: number) => new Date(epochSeconds * 1000).toISOString().slice(0, 19)
+
+async function apiGetColumnar(path: string) {
+  const sep = path.includes('?') ? '&' : '?'
+  const res = await fetch(`${path}${sep}format=binary`, { headers: authHeaders() })
+  if (!res.ok) throw new Error(`${res.status} ${res.statusText}`)
+  return decodeColumnar(await res.arrayBuffer())
+}
+
 async function apiPost<T>(path: string, body: unknown): Promise<T> {
   const headers: HeadersInit = { ...authHeaders(), 'Content-Type': 'application/json' }
   const res = await fetch(path, { method: 'POST', headers, body: JSON.stringify(body) })
@@ -25,13 +59,34 @@ export const client = {
   health: () => apiGet<Health>('/api/health'),
   latest: () => apiGet<LatestRow>('/api/latest'),
   liveLatest: () => apiGet<LiveLatestRow>('/api/live/latest'),
-  series: (minutes: number, start?: string, end?: string) => {
+  series: (minutes: number, start?: string, end?: string, maxPoints?: number) => {
     const params = new URLSearchParams({ minutes: String(minutes) })
     if (start) params.set('start', start)
     if (end) params.set('end', end)
-    return apiGet<{ points: IntervalSeriesPoint[] }>(`/api/series?${params.toString()}`)
+    if (maxPoints) params.set('maxPoints', String(maxPoints))
+    return apiGetColumnar(`/api/series?${params.toString()}`).then(({ header, columns }) => {
+      const points: IntervalSeriesPoint[] = Array.from({ length: header.rows }, (_, i) => ({
+        t: naiveIso(columns.t[i]),
+        kW: columns.kW[i],
+        kWh: columns.kWh[i],
+        flags: { r17Exclude: columns.r17Exclude[i] === 1, kyzInvalidAlarm: columns.kyzInvalidAlarm[i] === 1 },
+      }))
+      return { points, resolution: header.resolution }
+    })
+  },
+  liveSeries: (minutes: number, maxPoints?: number, since?: string) => {
+    const params = new URLSearchParams({ minutes: String(minutes) })
+    if (maxPoints) params.set('maxPoints', String(maxPoints))
+    if (since) params.set('since', since)
+    return apiGetColumnar(`/api/live/series?${params.toString()}`).then(({ header, columns }) => {
+      const points: LiveSeriesPoint[] = Array.from({ length: header.rows }, (_, i) => ({
+        t: naiveIso(columns.t[i]),
+        kW: columns.kW[i],
+        kWh: columns.kWh[i],
+      }))
+      return { points, resolution: header.resolution }
+    })
   },
-  liveSeries: (minutes: number) => apiGet<{ points: LiveSeriesPoint[] }>('/api/live/series?minutes=' + minutes),
   summary: () => apiGet<Summary>('/api/summary'),
   billing: (months = 24, basis: 'calendar' | 'billing' = 'calendar') => apiGet<BillingResponse>(`/api/billing?months=${months}&basis=${basis}`),
   quality: () => apiGet<Quality>('/api/quality'),
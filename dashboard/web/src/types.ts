@@ -22,6 +22,14 @@ export type LiveSeriesPoint = {
   kWh: number
 }
 
+export type SeriesResolution = {
+  bucketSeconds: number
+  sourcePoints: number
+  points: number
+  downsampled: boolean
+  method: 'minmax' | 'lttb' | null
+}
+
 export type IntervalSeriesPoint = {
   t: string
   kW: number
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import signal
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any
+
+import paho.mqtt.client as mqtt
+
+from main import BucketWriter, IntervalIngestor, MqttSqlService, build_checkpoint_store, build_spool
+
+MQTT_MISC_INTERVAL_SECONDS = 1.0
+
+
+class AsyncBucketWriter(BucketWriter):
+    """BucketWriter drained by an asyncio task; pyodbc and spool I/O run on one executor thread."""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sql-writer")
+        self.wakeup: asyncio.Event | None = None
+        self.task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        if self.spool is not None and self.spool.pending():
+            self.logger.info("Spool %s has %s rows awaiting replay", self.spool.path, self.spool.pending())
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.get_running_loop().create_task(self._run_async(), name="sql-writer")
+
+    def submit(self, kind: str, payload: dict[str, Any]) -> bool:
+        accepted = super().submit(kind, payload)
+        if self.wakeup is not None:
+            self.wakeup.set()
+        return accepted
+
+    def _idle_timeout(self) -> float:
+        timeout = self.stats_log_seconds - (time.monotonic() - self.last_stats_log_monotonic)
+        if self.spool is not None and self.spool.pending():
+            timeout = min(timeout, self.sql_retry_at - time.monotonic())
+        return max(timeout, 0.0)
+
+    async def _run_async(self) -> None:
+        assert self.wakeup is not None
+        loop = asyncio.get_running_loop()
+        while True:
+            if time.monotonic() - self.last_stats_log_monotonic >= self.stats_log_seconds:
+                self._log_stats()
+            if self.queue.empty():
+                if self.stop_event.is_set():
+                    return
+                if self._replay_pending():
+                    await loop.run_in_executor(self.executor, self._replay_spool)
+                    continue
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), self._idle_timeout())
+                except TimeoutError:
+                    pass
+                continue
+
+            batch = []
+            while len(batch) < self.batch_max_rows and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            await loop.run_in_executor(self.executor, self._write_batch, batch)
+
+    async def stop_async(self, timeout: float = 30.0) -> None:
+        self.stop_event.set()
+        if self.wakeup is not None:
+            self.wakeup.set()
+        if self.task is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(self.task), timeout)
+            except TimeoutError:
+                self.logger.error("SQL writer did not drain within %ss", timeout)
+        await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+        # The writer thread never started, so the base class spools anything left and closes the spool.
+        self.stop(timeout=0)
+
+
+class AsyncMqttSqlService(MqttSqlService):
+    """Single event loop for MQTT I/O, bucket-closing timers and the SQL writer.
+
+    paho's socket callbacks register the client socket with the loop (``add_reader`` /
+    ``add_writer``), so there is no network thread and no polling: the loop wakes only for
+    socket traffic, the keepalive tick and the next bucket boundary.
+    """
+
+    writer_class = AsyncBucketWriter
+    writer: AsyncBucketWriter
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.stopping: asyncio.Event | None = None
+        self.timer: asyncio.TimerHandle | None = None
+
+    def _attach_socket_callbacks(self, loop: asyncio.AbstractEventLoop) -> None:
+        # Connects run on an executor thread, so every registration hops onto the loop.
+        def on_socket_open(client: mqtt.Client, userdata: Any, sock: Any) -> None:
+            loop.call_soon_threadsafe(loop.add_reader, sock, client.loop_read)
+
+        def on_socket_close(client: mqtt.Client, userdata: Any, sock: Any) -> None:
+            loop.call_soon_threadsafe(loop.remove_reader, sock)
+
+        def on_socket_register_write(client: mqtt.Client, userdata: Any, sock: Any) -> None:
+            loop.call_soon_threadsafe(loop.add_writer, sock, client.loop_write)
+
+        def on_socket_unregister_write(client: mqtt.Client, userdata: Any, sock: Any) -> None:
+            loop.call_soon_threadsafe(loop.remove_writer, sock)
+
+        self.client.on_socket_open = on_socket_open
+        self.client.on_socket_close = on_socket_close
+        self.client.on_socket_register_write = on_socket_register_write
+        self.client.on_socket_unregister_write = on_socket_unregister_write
+
+    async def _connect_mqtt_async(self) -> None:
+        assert self.loop is not None and self.stopping is not None
+        delay = 1
+        while not self.stopping.is_set():
+            try:
+                await self.loop.run_in_executor(
+                    None, self.client.connect, self.mqtt_host, self.mqtt_port, self.mqtt_keepalive
+                )
+                return
+            except Exception:
+                self.logger.exception("MQTT connect failed, retrying in %ss", delay)
+                try:
+                    await asyncio.wait_for(self.stopping.wait(), delay)
+                except TimeoutError:
+                    pass
+                delay = min(delay * 2, 60)
+
+    async def _mqtt_misc_loop(self) -> None:
+        assert self.stopping is not None
+        while not self.stopping.is_set():
+            if self.client.loop_misc() != mqtt.MQTT_ERR_SUCCESS:
+                await self._connect_mqtt_async()
+            try:
+                await asyncio.wait_for(self.stopping.wait(), MQTT_MISC_INTERVAL_SECONDS)
+            except TimeoutError:
+                pass
+
+    def _on_timer(self) -> None:
+        assert self.loop is not None
+        # process_due never sleeps past the next live boundary, so buckets opened by
+        # messages in the meantime are always covered by this single timer.
+        self.timer = self.loop.call_later(self.process_due(), self._on_timer)
+
+    def _install_signal_handlers(self) -> None:
+        assert self.loop is not None
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                self.loop.add_signal_handler(signum, self._handle_signal, signum)
+            except (NotImplementedError, RuntimeError):
+                # Windows event loops do not support add_signal_handler.
+                signal.signal(signum, lambda received, frame: self._handle_signal(received))
+
+    def _handle_signal(self, signum: int) -> None:
+        self.logger.info("Received signal %s, shutting down", signum)
+        self.stop()
+
+    def stop(self) -> None:
+        super().stop()
+        if self.loop is not None and self.stopping is not None:
+            self.loop.call_soon_threadsafe(self.stopping.set)
+
+    async def run_async(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.stopping = asyncio.Event()
+        self._install_signal_handlers()
+        self.logger.info("Starting MQTT SQL service (asyncio engine)")
+
+        self.start_processing()
+        self._attach_socket_callbacks(self.loop)
+        await self._connect_mqtt_async()
+        misc_task = self.loop.create_task(self._mqtt_misc_loop(), name="mqtt-misc")
+        self._on_timer()
+
+        await self.stopping.wait()
+
+        if self.timer is not None:
+            self.timer.cancel()
+        misc_task.cancel()
+        self.client.disconnect()
+        self._flush_closed_buckets(datetime.now())
+        self._save_checkpoint(force=True)
+        await self.writer.stop_async()
+        await self.loop.run_in_executor(None, self.ingestor.close)
+        self.logger.info("Service stopped")
+
+
+def run_asyncio(logger: logging.Logger) -> int:
+    spool = build_spool(logger)
+    ingestor = IntervalIngestor(logger, block_on_connect=spool is None)
+    service = AsyncMqttSqlService(logger, ingestor, spool=spool, checkpoint=build_checkpoint_store(logger))
+    # paho needs add_reader/add_writer, which the default Windows proactor loop lacks.
+    loop_factory = asyncio.SelectorEventLoop if sys.platform == "win32" else None
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        runner.run(service.run_async())
+    return 0
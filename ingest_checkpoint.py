@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import logging
+import math
+import os
+import struct
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+CHECKPOINT_MAGIC = b"KYZC"
+CHECKPOINT_VERSION = 1
+
+# magic, version, sequence, saved-at epoch, meter count
+HEADER = struct.Struct("<4sHQdI")
+# NUL-padded meter id, has-total flag, last total pulses, last total kWh, live count, interval count
+METER = struct.Struct("<32sBqdII")
+# bucket end epoch, pulse count, packed optional flags
+BUCKET = struct.Struct("<qqB")
+CRC = struct.Struct("<I")
+
+_FLAG_CODES = {None: 0, False: 1, True: 2}
+_FLAG_VALUES = {code: value for value, code in _FLAG_CODES.items()}
+
+
+@dataclass
+class MeterSnapshot:
+    last_total_pulses: int | None
+    last_total_kwh: float | None
+    live_buckets: dict[datetime, dict[str, Any]] = field(default_factory=dict)
+    interval_buckets: dict[datetime, dict[str, Any]] = field(default_factory=dict)
+
+
+@dataclass
+class AggregatorSnapshot:
+    seq: int
+    saved_at: float
+    meters: dict[str, MeterSnapshot] = field(default_factory=dict)
+
+
+def _encode_buckets(buckets: dict[datetime, dict[str, Any]]) -> bytes:
+    return b"".join(
+        BUCKET.pack(
+            int(end.timestamp()),
+            int(bucket["pulseCount"]),
+            _FLAG_CODES[bucket.get("r17Exclude")] | (_FLAG_CODES[bucket.get("kyzInvalidAlarm")] << 2),
+        )
+        for end, bucket in sorted(buckets.items())
+    )
+
+
+def _decode_buckets(raw: bytes, offset: int, count: int) -> tuple[dict[datetime, dict[str, Any]], int]:
+    buckets: dict[datetime, dict[str, Any]] = {}
+    for _ in range(count):
+        end_epoch, pulse_count, flags = BUCKET.unpack_from(raw, offset)
+        offset += BUCKET.size
+        buckets[datetime.fromtimestamp(end_epoch)] = {
+            "pulseCount": pulse_count,
+            "r17Exclude": _FLAG_VALUES[flags & 0x03],
+            "kyzInvalidAlarm": _FLAG_VALUES[(flags >> 2) & 0x03],
+        }
+    return buckets, offset
+
+
+def _encode_meter(meter_id: str, meter: MeterSnapshot) -> bytes:
+    return (
+        METER.pack(
+            meter_id.encode("utf-8"),
+            1 if meter.last_total_pulses is not None else 0,
+            meter.last_total_pulses or 0,
+            meter.last_total_kwh if meter.last_total_kwh is not None else math.nan,
+            len(meter.live_buckets),
+            len(meter.interval_buckets),
+        )
+        + _encode_buckets(meter.live_buckets)
+        + _encode_buckets(meter.interval_buckets)
+    )
+
+
+def encode_snapshot(snapshot: AggregatorSnapshot) -> bytes:
+    body = HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, snapshot.seq, snapshot.saved_at, len(snapshot.meters)) + b"".join(
+        _encode_meter(meter_id, meter) for meter_id, meter in sorted(snapshot.meters.items())
+    )
+    return body + CRC.pack(zlib.crc32(body))
+
+
+def decode_snapshot(raw: bytes) -> AggregatorSnapshot:
+    if len(raw) < HEADER.size + CRC.size:
+        raise ValueError("Checkpoint is truncated")
+    body, (crc,) = raw[: -CRC.size], CRC.unpack(raw[-CRC.size :])
+    if zlib.crc32(body) != crc:
+        raise ValueError("Checkpoint CRC mismatch")
+
+    magic, version = struct.unpack_from("<4sH", body)
+    if magic != CHECKPOINT_MAGIC or version != CHECKPOINT_VERSION:
+        raise ValueError("Unsupported checkpoint format")
+
+    _, _, seq, saved_at, meter_count = HEADER.unpack_from(body)
+    offset = HEADER.size
+    meters: dict[str, MeterSnapshot] = {}
+    for _ in range(meter_count):
+        meter_id, has_total, last_total, last_total_kwh, live_count, interval_count = METER.unpack_from(body, offset)
+        live_buckets, offset = _decode_buckets(body, offset + METER.size, live_count)
+        interval_buckets, offset = _decode_buckets(body, offset, interval_count)
+        meters[meter_id.rstrip(b"\0").decode("utf-8")] = MeterSnapshot(
+            last_total_pulses=last_total if has_total else None,
+            last_total_kwh=None if math.isnan(last_total_kwh) else last_total_kwh,
+            live_buckets=live_buckets,
+            interval_buckets=interval_buckets,
+        )
+    if offset != len(body):
+        raise ValueError("Checkpoint bucket count does not match payload size")
+    return AggregatorSnapshot(seq=seq, saved_at=saved_at, meters=meters)
+
+
+class CheckpointStore:
+    """Atomically persisted snapshot of the in-flight bucket aggregation state."""
+
+    def __init__(self, path: str | Path, logger: logging.Logger) -> None:
+        self.path = Path(path)
+        self.logger = logger
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def save(self, snapshot: AggregatorSnapshot) -> None:
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "wb") as handle:
+            handle.write(encode_snapshot(snapshot))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, self.path)
+
+    def load(self) -> AggregatorSnapshot | None:
+        try:
+            raw = self.path.read_bytes()
+        except FileNotFoundError:
+            return None
+        try:
+            return decode_snapshot(raw)
+        except (ValueError, struct.error, KeyError, UnicodeDecodeError):
+            self.logger.exception("Ignoring unreadable checkpoint %s", self.path)
+            return None
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import queue
+import signal
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from dotenv import load_dotenv
+
+from ingest_spool import HEADER as SPOOL_HEADER
+
+from main import (
+    ConfigError,
+    IntervalIngestor,
+    MqttService,
+    MqttSqlService,
+    build_checkpoint_store,
+    build_spool,
+    configure_logging,
+    get_env_int,
+    get_pulses_per_kwh_config,
+    get_spool_path,
+)
+
+# Per-shard counters shared with the supervisor: messages handled by the worker plus
+# the worker's SQL writer totals.
+SHARD_COUNTERS = ("processed", "committed", "spooled", "failed")
+WORKER_STATS_PUBLISH_SECONDS = 1.0
+
+
+def _ring_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash of meter ids onto shard indexes.
+
+    Uses a stable digest (not ``hash()``), so a meter maps to the same worker across
+    restarts and only about 1/N of meters move when the worker count changes.
+    """
+
+    def __init__(self, shard_count: int, virtual_nodes: int = 64):
+        if shard_count < 1:
+            raise ConfigError("INGEST_WORKERS must be at least 1")
+        points = sorted(
+            (_ring_hash(f"shard-{shard}-{replica}"), shard)
+            for shard in range(shard_count)
+            for replica in range(virtual_nodes)
+        )
+        self.hashes = [point for point, _ in points]
+        self.shards = [shard for _, shard in points]
+
+    def shard_for(self, key: str) -> int:
+        index = bisect.bisect(self.hashes, _ring_hash(key))
+        return self.shards[index % len(self.shards)]
+
+
+def run_shard_worker(shard: int, inbox: Any, counters: Any) -> None:
+    """Worker process: owns the aggregation state and SQL connection for its meters."""
+    load_dotenv()
+    logger = configure_logging(f"kyz_ingestor_shard{shard}")
+    # The supervisor coordinates shutdown with a sentinel so queued messages are not lost.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    base = shard * len(SHARD_COUNTERS)
+
+    spool = build_spool(logger, shard=shard)
+    ingestor = IntervalIngestor(logger, block_on_connect=spool is None)
+    service = MqttSqlService(logger, ingestor, spool=spool, checkpoint=build_checkpoint_store(logger, shard=shard))
+    service.start_processing()
+    logger.info("Ingest shard %s started", shard)
+
+    # Counters carry over a restart so the supervisor's rates stay monotonic.
+    processed, committed, spooled, failed = (counters[base + offset] for offset in range(len(SHARD_COUNTERS)))
+    last_publish_monotonic = 0.0
+    try:
+        while True:
+            timeout = service.process_due()
+            try:
+                item = inbox.get(timeout=timeout)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            if item:
+                topic, payload, receive_epoch = item
+                service.handle_message(topic, payload, datetime.fromtimestamp(receive_epoch))
+                processed += 1
+
+            if time.monotonic() - last_publish_monotonic >= WORKER_STATS_PUBLISH_SECONDS:
+                stats = service.writer.stats()
+                counters[base] = processed
+                counters[base + 1] = committed + stats["committed"]
+                counters[base + 2] = spooled + stats["spooled"]
+                counters[base + 3] = failed + stats["failed"]
+                last_publish_monotonic = time.monotonic()
+    finally:
+        service.stop_processing()
+        counters[base] = processed
+        logger.info("Ingest shard %s stopped after %s messages", shard, processed)
+
+
+class ShardedMqttService(MqttService):
+    """Single MQTT connection that fans messages out to worker processes by meter id.
+
+    Only the workers build aggregators, bucket writers and SQL connections.
+    """
+
+    def __init__(self, logger: logging.Logger, worker_count: int):
+        super().__init__(logger)
+        # Workers read the same settings; fail here rather than in a worker restart loop.
+        get_pulses_per_kwh_config(logger)
+        self.worker_count = worker_count
+        self.ring = HashRing(worker_count)
+        self.meter_shards: dict[str, int] = {}
+        self.inbox_max_depth = get_env_int("INGEST_WORKER_QUEUE_MAX_DEPTH", default=10000)
+        self.stats_log_seconds = get_env_int("INGEST_QUEUE_STATS_LOG_SECONDS", default=60)
+        self.context = multiprocessing.get_context("spawn")
+        self.counters = self.context.Array("q", worker_count * len(SHARD_COUNTERS), lock=False)
+        self.inboxes = [self.context.Queue(maxsize=self.inbox_max_depth) for _ in range(worker_count)]
+        self.workers: list[Any] = [None] * worker_count
+        self.restarts = [0] * worker_count
+        self.dispatched = [0] * worker_count
+        self.dropped = [0] * worker_count
+        self.last_dispatch_full_log_monotonic = 0.0
+
+    def _start_worker(self, shard: int) -> None:
+        process = self.context.Process(
+            target=run_shard_worker,
+            args=(shard, self.inboxes[shard], self.counters),
+            name=f"kyz-ingest-shard{shard}",
+            daemon=False,
+        )
+        process.start()
+        self.workers[shard] = process
+
+    def shard_for_meter(self, meter_id: str) -> int:
+        shard = self.meter_shards.get(meter_id)
+        if shard is None:
+            shard = self.meter_shards[meter_id] = self.ring.shard_for(meter_id)
+            self.logger.info("Meter %s assigned to shard %s", meter_id, shard)
+        return shard
+
+    def handle_message(self, topic: str, payload_bytes: bytes, receive_time: datetime) -> None:
+        meter_id = self._meter_id_for_topic(topic)
+        if meter_id is None:
+            return
+        shard = self.shard_for_meter(meter_id)
+        try:
+            self.inboxes[shard].put_nowait((topic, payload_bytes, receive_time.timestamp()))
+        except queue.Full:
+            self.dropped[shard] += 1
+            self._rate_limited_warning(
+                "dispatch_full",
+                "Shard %s inbox full (max_depth=%s); dropping message on topic %s",
+                shard,
+                self.inbox_max_depth,
+                topic,
+            )
+            return
+        self.dispatched[shard] += 1
+
+    def _supervise_workers(self) -> None:
+        for shard, process in enumerate(self.workers):
+            if process is None or process.is_alive():
+                continue
+            self.restarts[shard] += 1
+            self.logger.error(
+                "Ingest shard %s exited with code %s; restarting (restart #%s)",
+                shard,
+                process.exitcode,
+                self.restarts[shard],
+            )
+            # Back off so a worker that crashes on startup does not spin.
+            if not self.stop_event.wait(min(2 ** min(self.restarts[shard], 5), 30)):
+                self._start_worker(shard)
+
+    def shard_stats(self) -> list[dict[str, Any]]:
+        stats = []
+        for shard in range(self.worker_count):
+            base = shard * len(SHARD_COUNTERS)
+            entry: dict[str, Any] = {name: self.counters[base + offset] for offset, name in enumerate(SHARD_COUNTERS)}
+            try:
+                inbox_depth: int | None = self.inboxes[shard].qsize()
+            except NotImplementedError:
+                inbox_depth = None
+            entry.update(
+                shard=shard,
+                dispatched=self.dispatched[shard],
+                dropped=self.dropped[shard],
+                restarts=self.restarts[shard],
+                inboxDepth=inbox_depth,
+                meters=sum(1 for assigned in self.meter_shards.values() if assigned == shard),
+            )
+            stats.append(entry)
+        return stats
+
+    def _log_shard_stats(self, previous: list[dict[str, Any]], elapsed_seconds: float) -> list[dict[str, Any]]:
+        current = self.shard_stats()
+        for before, after in zip(previous, current):
+            rate = (after["processed"] - before["processed"]) / elapsed_seconds if elapsed_seconds > 0 else 0.0
+            self.logger.info(
+                "Shard %s stats meters=%s dispatched=%s processed=%s rate=%.1f msg/s committed=%s spooled=%s failed=%s dropped=%s inbox=%s restarts=%s",
+                after["shard"],
+                after["meters"],
+                after["dispatched"],
+                after["processed"],
+                rate,
+                after["committed"],
+                after["spooled"],
+                after["failed"],
+                after["dropped"],
+                after["inboxDepth"],
+                after["restarts"],
+            )
+        return current
+
+    def _warn_orphaned_spools(self) -> None:
+        spool_path = Path(get_spool_path())
+        for candidate in spool_path.parent.glob(f"{spool_path.stem}.shard*{spool_path.suffix}"):
+            shard_suffix = candidate.stem.rsplit(".shard", 1)[-1]
+            if shard_suffix.isdigit() and int(shard_suffix) >= self.worker_count and candidate.stat().st_size > SPOOL_HEADER.size:
+                self.logger.error(
+                    "Spool %s belongs to a shard beyond INGEST_WORKERS=%s and will not be replayed; "
+                    "run with the previous worker count until it drains",
+                    candidate,
+                    self.worker_count,
+                )
+
+    def run(self) -> None:
+        self.logger.info("Starting sharded MQTT SQL service with %s workers", self.worker_count)
+        self._warn_orphaned_spools()
+        for shard in range(self.worker_count):
+            self._start_worker(shard)
+        self._connect_mqtt_with_backoff()
+        self.client.loop_start()
+
+        previous = self.shard_stats()
+        last_stats_monotonic = time.monotonic()
+        while not self.stop_event.wait(1.0):
+            self._supervise_workers()
+            elapsed = time.monotonic() - last_stats_monotonic
+            if elapsed >= self.stats_log_seconds:
+                previous = self._log_shard_stats(previous, elapsed)
+                last_stats_monotonic = time.monotonic()
+
+        self.client.loop_stop()
+        self.client.disconnect()
+        for shard, inbox in enumerate(self.inboxes):
+            try:
+                inbox.put(None, timeout=5)
+            except queue.Full:
+                self.logger.error("Could not signal ingest shard %s to stop; inbox is full", shard)
+        for shard, process in enumerate(self.workers):
+            if process is None:
+                continue
+            process.join(timeout=60)
+            if process.is_alive():
+                self.logger.error("Ingest shard %s did not stop in time; terminating", shard)
+                process.terminate()
+                process.join(timeout=5)
+        self.logger.info("Sharded service stopped")
+
+
+def run_sharded(logger: logging.Logger, worker_count: int) -> int:
+    service = ShardedMqttService(logger, worker_count)
+
+    def _shutdown_handler(signum: int, frame: Any) -> None:
+        logger.info("Received signal %s, shutting down", signum)
+        service.stop()
+
+    signal.signal(signal.SIGINT, _shutdown_handler)
+    signal.signal(signal.SIGTERM, _shutdown_handler)
+    service.run()
+    return 0
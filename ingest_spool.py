@@ -0,0 +1,310 @@
+from __future__ import annotations
+
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+SPOOL_MAGIC = b"KYZS"
+SPOOL_VERSION = 1
+HEADER = struct.Struct("<4sHH")
+
+# kind, flags, NUL-padded meter id, end epoch seconds, pulse count, kWh, kW, total kWh, crc32 of the preceding fields
+RECORD_BODY = struct.Struct("<BB32sqqddd")
+RECORD = struct.Struct("<BB32sqqdddI")
+
+DEFAULT_METER_ID = "main"
+METER_ID_MAX_BYTES = 32
+
+KIND_CODES = {"live": 0, "interval": 1}
+KIND_NAMES = {code: name for name, code in KIND_CODES.items()}
+KEY_FIELDS = {"live": "sampleEnd", "interval": "intervalEnd"}
+
+FLAG_R17_EXCLUDE = 0x01
+FLAG_KYZ_INVALID_ALARM = 0x02
+FLAG_HAS_TOTAL = 0x04
+
+COMPACT_MIN_BYTES = 1024 * 1024
+
+
+def encode_record(kind: str, payload: dict[str, Any]) -> bytes:
+    flags = 0
+    if payload.get("r17Exclude"):
+        flags |= FLAG_R17_EXCLUDE
+    if payload.get("kyzInvalidAlarm"):
+        flags |= FLAG_KYZ_INVALID_ALARM
+    total_kwh = payload.get("total_kWh")
+    if total_kwh is not None:
+        flags |= FLAG_HAS_TOTAL
+    body = RECORD_BODY.pack(
+        KIND_CODES[kind],
+        flags,
+        payload.get("meterId", DEFAULT_METER_ID).encode("utf-8"),
+        int(payload[KEY_FIELDS[kind]].timestamp()),
+        int(payload["pulseCount"]),
+        float(payload["kWh"]),
+        float(payload["kW"]),
+        float(total_kwh) if total_kwh is not None else 0.0,
+    )
+    return body + struct.pack("<I", zlib.crc32(body))
+
+
+def _decoded_payload(
+    kind_code: int,
+    flags: int,
+    meter_id: str,
+    end_epoch: int,
+    pulse_count: int,
+    kwh: float,
+    kw: float,
+    total_kwh: float,
+) -> tuple[str, dict[str, Any]]:
+    kind = KIND_NAMES[kind_code]
+    payload: dict[str, Any] = {
+        "meterId": meter_id,
+        KEY_FIELDS[kind]: datetime.fromtimestamp(end_epoch),
+        "pulseCount": pulse_count,
+        "kWh": kwh,
+        "kW": kw,
+        "total_kWh": total_kwh if flags & FLAG_HAS_TOTAL else None,
+    }
+    if kind == "interval":
+        payload["r17Exclude"] = bool(flags & FLAG_R17_EXCLUDE)
+        payload["kyzInvalidAlarm"] = bool(flags & FLAG_KYZ_INVALID_ALARM)
+    return kind, payload
+
+
+def decode_record(raw: bytes) -> tuple[str, dict[str, Any]] | None:
+    kind_code, flags, meter_id, end_epoch, pulse_count, kwh, kw, total_kwh, crc = RECORD.unpack(raw)
+    if zlib.crc32(raw[: RECORD_BODY.size]) != crc or kind_code not in KIND_NAMES:
+        return None
+    return _decoded_payload(
+        kind_code, flags, meter_id.rstrip(b"\0").decode("utf-8"), end_epoch, pulse_count, kwh, kw, total_kwh
+    )
+
+
+class BucketSpool:
+    """Append-only on-disk spool of finalized buckets awaiting a SQL commit.
+
+    Records are fixed-size and CRC-protected, so a torn tail from a crash is
+    detected and truncated on open. The committed replay position lives in a
+    sidecar ``.offset`` file; replaying a record twice is harmless because the
+    SQL inserts are idempotent.
+
+    Offsets handed out by ``read_batch`` are logical: compaction may rewrite the
+    file (from another thread, while a batch is being written to SQL), so
+    ``_discarded`` counts the bytes dropped from the front since open and
+    ``commit`` maps a logical offset back onto the current file.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        logger: logging.Logger,
+        max_bytes: int = 64 * 1024 * 1024,
+        fsync_every_rows: int = 64,
+        fsync_interval_seconds: float = 1.0,
+    ) -> None:
+        self.path = Path(path)
+        self.offset_path = self.path.with_name(self.path.name + ".offset")
+        self.logger = logger
+        self.max_bytes = max(max_bytes, HEADER.size + RECORD.size)
+        self.fsync_every_rows = max(1, fsync_every_rows)
+        self.fsync_interval_seconds = fsync_interval_seconds
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._last_sync_monotonic = time.monotonic()
+        self.dropped = 0
+        self.corrupt = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._handle = self._open()
+        self._size = self._handle.seek(0, os.SEEK_END)
+        self._read_offset = self._load_offset()
+        self._discarded = 0
+
+    def _open(self):
+        handle = open(self.path, "a+b")
+        size = handle.seek(0, os.SEEK_END)
+        if size < HEADER.size:
+            handle.truncate(0)
+            handle.write(HEADER.pack(SPOOL_MAGIC, SPOOL_VERSION, 0))
+            handle.flush()
+            os.fsync(handle.fileno())
+            return handle
+
+        handle.seek(0)
+        magic, version, _ = HEADER.unpack(handle.read(HEADER.size))
+        if magic != SPOOL_MAGIC or version != SPOOL_VERSION:
+            handle.close()
+            raise ValueError(f"Unsupported spool file format: {self.path}")
+
+        torn = (size - HEADER.size) % RECORD.size
+        if torn:
+            self.logger.warning("Truncating %s torn bytes from spool tail %s", torn, self.path)
+            handle.truncate(size - torn)
+            handle.flush()
+            os.fsync(handle.fileno())
+        return handle
+
+    def _load_offset(self) -> int:
+        try:
+            offset = int(self.offset_path.read_text(encoding="ascii").strip())
+        except (FileNotFoundError, ValueError):
+            return HEADER.size
+        if offset < HEADER.size or offset > self._size or (offset - HEADER.size) % RECORD.size:
+            self.logger.warning("Ignoring invalid spool offset %s; replaying %s from the start", offset, self.path)
+            return HEADER.size
+        return offset
+
+    def _store_offset(self, offset: int) -> None:
+        tmp_path = self.offset_path.with_name(self.offset_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="ascii") as handle:
+            handle.write(str(offset))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, self.offset_path)
+
+    def pending(self) -> int:
+        with self._lock:
+            return (self._size - self._read_offset) // RECORD.size
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            return self._size
+
+    def append_many(self, kind: str, payloads: list[dict[str, Any]]) -> int:
+        """Append rows and return how many were accepted within the disk budget."""
+        with self._lock:
+            accepted: list[bytes] = []
+            for payload in payloads:
+                projected = self._size + (len(accepted) + 1) * RECORD.size
+                # Live samples only get half the budget so interval rows keep headroom.
+                limit = self.max_bytes if kind == "interval" else self.max_bytes // 2
+                if projected > limit:
+                    self._compact_locked()
+                    projected = self._size + (len(accepted) + 1) * RECORD.size
+                if projected > limit:
+                    self.dropped += 1
+                    continue
+                accepted.append(encode_record(kind, payload))
+
+            if len(accepted) < len(payloads):
+                self.logger.error(
+                    "Spool %s over budget (%s bytes); dropped %s %s rows",
+                    self.path,
+                    self.max_bytes,
+                    len(payloads) - len(accepted),
+                    kind,
+                )
+            if not accepted:
+                return 0
+
+            self._handle.seek(0, os.SEEK_END)
+            self._handle.write(b"".join(accepted))
+            self._handle.flush()
+            self._size += len(accepted) * RECORD.size
+            self._unsynced += len(accepted)
+            if (
+                self._unsynced >= self.fsync_every_rows
+                or time.monotonic() - self._last_sync_monotonic >= self.fsync_interval_seconds
+            ):
+                self._sync_locked()
+            return len(accepted)
+
+    def append(self, kind: str, payload: dict[str, Any]) -> bool:
+        return self.append_many(kind, [payload]) == 1
+
+    def read_batch(self, max_rows: int) -> tuple[list[tuple[str, dict[str, Any]]], int]:
+        """Return up to ``max_rows`` pending records and the offset to commit once they are written."""
+        with self._lock:
+            if self._read_offset >= self._size:
+                return [], self._read_offset + self._discarded
+            self._sync_locked()
+            end = min(self._size, self._read_offset + max_rows * RECORD.size)
+            records: list[tuple[str, dict[str, Any]]] = []
+            with mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                for position in range(self._read_offset, end, RECORD.size):
+                    decoded = decode_record(view[position : position + RECORD.size])
+                    if decoded is None:
+                        self.corrupt += 1
+                        self.logger.error("Skipping corrupt spool record at offset %s in %s", position, self.path)
+                        continue
+                    records.append(decoded)
+            return records, end + self._discarded
+
+    def commit(self, offset: int) -> None:
+        with self._lock:
+            offset -= self._discarded
+            if offset <= self._read_offset:
+                return
+            self._read_offset = min(offset, self._size)
+            if self._read_offset >= self._size:
+                self._reset_locked()
+            else:
+                self._store_offset(self._read_offset)
+                if self._read_offset - HEADER.size >= max(COMPACT_MIN_BYTES, self._size // 2):
+                    self._compact_locked()
+
+    def _reset_locked(self) -> None:
+        self._discarded += self._size - HEADER.size
+        self._handle.truncate(HEADER.size)
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+        self._size = HEADER.size
+        self._read_offset = HEADER.size
+        self._unsynced = 0
+        self._store_offset(self._read_offset)
+
+    def _compact_locked(self) -> None:
+        if self._read_offset <= HEADER.size:
+            return
+        if self._read_offset >= self._size:
+            self._reset_locked()
+            return
+
+        self._sync_locked()
+        tmp_path = self.path.with_name(self.path.name + ".compact")
+        with open(tmp_path, "wb") as out:
+            out.write(HEADER.pack(SPOOL_MAGIC, SPOOL_VERSION, 0))
+            self._handle.seek(self._read_offset)
+            remaining = self._size - self._read_offset
+            while remaining > 0:
+                chunk = self._handle.read(min(remaining, 1024 * 1024))
+                if not chunk:
+                    break
+                out.write(chunk)
+                remaining -= len(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+
+        reclaimed = self._read_offset - HEADER.size
+        self._handle.close()
+        os.replace(tmp_path, self.path)
+        self._handle = open(self.path, "a+b")
+        self._size = self._handle.seek(0, os.SEEK_END)
+        self._read_offset = HEADER.size
+        self._discarded += reclaimed
+        self._store_offset(self._read_offset)
+        self.logger.info("Compacted spool %s (reclaimed %s bytes)", self.path, reclaimed)
+
+    def _sync_locked(self) -> None:
+        if self._unsynced:
+            os.fsync(self._handle.fileno())
+            self._unsynced = 0
+        self._last_sync_monotonic = time.monotonic()
+
+    def sync(self) -> None:
+        with self._lock:
+            self._sync_locked()
+
+    def close(self) -> None:
+        with self._lock:
+            self._sync_locked()
+            self._handle.close()
@@ -1,26 +1,33 @@
 import argparse
+import heapq
 import json
 import logging
 from logging.handlers import TimedRotatingFileHandler
 import os
+import queue
+import re
 import signal
 import sys
 import threading
 import time
+from collections import deque
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, NamedTuple
 
 import paho.mqtt.client as mqtt
 import pyodbc
 from dotenv import load_dotenv
 
+from ingest_checkpoint import AggregatorSnapshot, CheckpointStore, MeterSnapshot
+from ingest_spool import DEFAULT_METER_ID, METER_ID_MAX_BYTES, BucketSpool
+
 
 class ConfigError(Exception):
     """Raised when required configuration is missing."""
 
 
-def configure_logging() -> logging.Logger:
+def configure_logging(log_name: str = "kyz_ingestor") -> logging.Logger:
     logs_dir = Path("logs")
     logs_dir.mkdir(parents=True, exist_ok=True)
 
@@ -32,7 +39,7 @@ def configure_logging() -> logging.Logger:
     )
 
     file_handler = TimedRotatingFileHandler(
-        logs_dir / "kyz_ingestor.log",
+        logs_dir / f"{log_name}.log",
         when="midnight",
         interval=1,
         backupCount=30,
@@ -82,6 +89,13 @@ def get_env_int(name: str, default: int | None = None) -> int:
         raise ConfigError(f"Invalid integer for {name}: {raw}") from exc
 
 
+def get_env_bool(name: str, default: bool = False) -> bool:
+    raw = os.getenv(name)
+    if raw in (None, ""):
+        return default
+    return raw.strip().lower() in {"1", "true", "yes", "on"}
+
+
 def get_env_float(name: str, default: float | None = None) -> float:
     raw = os.getenv(name)
     if raw in (None, ""):
@@ -94,6 +108,56 @@ def get_env_float(name: str, default: float | None = None) -> float:
         raise ConfigError(f"Invalid float for {name}: {raw}") from exc
 
 
+DEFAULT_TOPIC_PULSE = "pri/energy/kyz/pulseCount"
+DEFAULT_TOPIC_INTERVAL = "pri/energy/kyz/interval"
+METER_ID_PATTERN = re.compile(r"[A-Za-z0-9_.\-]{1,%d}" % METER_ID_MAX_BYTES)
+
+
+def meter_wildcard_configured() -> bool:
+    return any(
+        "+" in os.getenv(name, default)
+        for name, default in (("MQTT_TOPIC_PULSE", DEFAULT_TOPIC_PULSE), ("MQTT_TOPIC_INTERVAL", DEFAULT_TOPIC_INTERVAL))
+    )
+
+
+def meter_id_from_topic(pattern: str, topic: str) -> str | None:
+    """Return the topic segment under the pattern's first ``+`` wildcard, or None when it does not apply."""
+    if "+" not in pattern:
+        return None
+    pattern_parts = pattern.split("/")
+    topic_parts = topic.split("/")
+    if len(pattern_parts) != len(topic_parts):
+        return None
+    meter_id = None
+    for pattern_part, topic_part in zip(pattern_parts, topic_parts):
+        if pattern_part == "+":
+            if meter_id is None:
+                meter_id = topic_part
+        elif pattern_part != topic_part:
+            return None
+    return meter_id
+
+
+def parse_meter_pulses_per_kwh(raw: str) -> dict[str, float]:
+    """Parse per-meter scaling overrides such as ``press1=0.5,press2=1``."""
+    overrides: dict[str, float] = {}
+    for token in raw.split(","):
+        if not token.strip():
+            continue
+        meter_id, separator, value = token.partition("=")
+        meter_id = meter_id.strip()
+        if not separator or not METER_ID_PATTERN.fullmatch(meter_id):
+            raise ConfigError(f"Invalid KYZ_METER_PULSES_PER_KWH entry: {token.strip()}")
+        try:
+            pulses_per_kwh = float(value)
+        except ValueError as exc:
+            raise ConfigError(f"Invalid KYZ_METER_PULSES_PER_KWH value for {meter_id}: {value.strip()}") from exc
+        if pulses_per_kwh <= 0:
+            raise ConfigError(f"KYZ_METER_PULSES_PER_KWH for {meter_id} must be greater than zero")
+        overrides[meter_id] = pulses_per_kwh
+    return overrides
+
+
 def parse_interval_end(value: Any) -> datetime:
     if not isinstance(value, str):
         raise ValueError("intervalEnd must be a string in format YYYY-MM-DD HH:MM:SS")
@@ -188,7 +252,27 @@ def _or_optional_bool(existing: bool | None, incoming: bool | None) -> bool | No
     return existing or incoming
 
 
+# Canonical PLC form; anything else (spaces, aliases, other orderings, yes/no flags) takes the general parser.
+_PACKED_FAST_RE = re.compile(
+    r"\s*d=(-?[0-9]+),c=(-?[0-9]+)(?:,r17Exclude=([01]))?(?:,kyzInvalidAlarm=([01]))?\s*"
+)
+_PACKED_FLAG_VALUES = {None: None, "0": False, "1": True}
+
+
+def payload_looks_like_json(raw_payload: str) -> bool:
+    """Sniff the payload format so packed PLC messages never pay for a failed ``json.loads``."""
+    for char in raw_payload:
+        if not char.isspace():
+            return char in "{["
+    return False
+
+
 def parse_packed_pulse_payload(raw_payload: str) -> tuple[int | None, int | None, bool | None, bool | None]:
+    match = _PACKED_FAST_RE.fullmatch(raw_payload)
+    if match is not None:
+        delta, total, r17_exclude, kyz_invalid_alarm = match.groups()
+        return int(delta), int(total), _PACKED_FLAG_VALUES[r17_exclude], _PACKED_FLAG_VALUES[kyz_invalid_alarm]
+
     tokens = [part.strip() for part in raw_payload.split(",") if part.strip()]
     if not tokens:
         raise ValueError("Empty key/value payload")
@@ -228,13 +312,155 @@ def compute_effective_pulse_delta(
     return 0, last_total_pulses
 
 
+def bucket_index(epoch_seconds: int, bucket_seconds: int) -> int:
+    """Index of the bucket ending at or after ``epoch_seconds`` (end = index * bucket_seconds)."""
+    return -(-epoch_seconds // bucket_seconds)
+
+
 def bucket_end(timestamp: datetime, bucket_seconds: int) -> datetime:
-    epoch_seconds = int(timestamp.timestamp())
-    if epoch_seconds % bucket_seconds == 0:
-        aligned = epoch_seconds
-    else:
-        aligned = ((epoch_seconds // bucket_seconds) + 1) * bucket_seconds
-    return datetime.fromtimestamp(aligned)
+    return datetime.fromtimestamp(bucket_index(int(timestamp.timestamp()), bucket_seconds) * bucket_seconds)
+
+
+class OpenBucket:
+    __slots__ = ("pulse_count", "r17_exclude", "kyz_invalid_alarm")
+
+    def __init__(self, pulse_count: int = 0, r17_exclude: bool | None = None, kyz_invalid_alarm: bool | None = None):
+        self.pulse_count = pulse_count
+        self.r17_exclude = r17_exclude
+        self.kyz_invalid_alarm = kyz_invalid_alarm
+
+
+class BucketStore:
+    """Open buckets keyed by epoch bucket index, with a min-heap of indexes for closing.
+
+    Checking for due buckets is a heap peek, so the common "nothing closed yet"
+    case costs O(1) instead of sorting the open buckets on every message.
+    """
+
+    def __init__(self, bucket_seconds: int):
+        self.bucket_seconds = bucket_seconds
+        self.buckets: dict[int, OpenBucket] = {}
+        self.heap: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self.buckets)
+
+    def add(
+        self,
+        epoch_seconds: int,
+        pulse_delta: int,
+        r17_exclude: bool | None,
+        kyz_invalid_alarm: bool | None,
+    ) -> None:
+        index = bucket_index(epoch_seconds, self.bucket_seconds)
+        bucket = self.buckets.get(index)
+        if bucket is None:
+            bucket = self.buckets[index] = OpenBucket()
+            heapq.heappush(self.heap, index)
+        bucket.pulse_count += pulse_delta
+        bucket.r17_exclude = _or_optional_bool(bucket.r17_exclude, r17_exclude)
+        bucket.kyz_invalid_alarm = _or_optional_bool(bucket.kyz_invalid_alarm, kyz_invalid_alarm)
+
+    def next_end_epoch(self) -> int | None:
+        return self.heap[0] * self.bucket_seconds if self.heap else None
+
+    def pop_closed(self, now_epoch: float) -> list[tuple[datetime, OpenBucket]]:
+        closed: list[tuple[datetime, OpenBucket]] = []
+        while self.heap and self.heap[0] * self.bucket_seconds <= now_epoch:
+            index = heapq.heappop(self.heap)
+            closed.append((datetime.fromtimestamp(index * self.bucket_seconds), self.buckets.pop(index)))
+        return closed
+
+    def to_snapshot(self) -> dict[datetime, dict[str, Any]]:
+        return {
+            datetime.fromtimestamp(index * self.bucket_seconds): {
+                "pulseCount": bucket.pulse_count,
+                "r17Exclude": bucket.r17_exclude,
+                "kyzInvalidAlarm": bucket.kyz_invalid_alarm,
+            }
+            for index, bucket in self.buckets.items()
+        }
+
+    def load_snapshot(self, buckets: dict[datetime, dict[str, Any]]) -> None:
+        self.buckets = {
+            bucket_index(int(end.timestamp()), self.bucket_seconds): OpenBucket(
+                bucket["pulseCount"], bucket.get("r17Exclude"), bucket.get("kyzInvalidAlarm")
+            )
+            for end, bucket in buckets.items()
+        }
+        self.heap = list(self.buckets)
+        heapq.heapify(self.heap)
+
+
+class MeterAggregator:
+    """Open buckets and pulse counter state for one meter."""
+
+    def __init__(self, meter_id: str, pulses_per_kwh: float, live_window_seconds: int, interval_seconds: int):
+        self.meter_id = meter_id
+        self.pulses_per_kwh = pulses_per_kwh
+        self.live_window_seconds = live_window_seconds
+        self.interval_seconds = interval_seconds
+        self.live_store = BucketStore(live_window_seconds)
+        self.interval_store = BucketStore(interval_seconds)
+        self.last_total_pulses: int | None = None
+        self.last_total_kwh: float | None = None
+
+    def add(
+        self,
+        epoch_seconds: int,
+        pulse_delta: int,
+        pulse_total: int | None,
+        r17_exclude: bool | None,
+        kyz_invalid_alarm: bool | None,
+    ) -> None:
+        self.live_store.add(epoch_seconds, pulse_delta, r17_exclude, kyz_invalid_alarm)
+        self.interval_store.add(epoch_seconds, pulse_delta, r17_exclude, kyz_invalid_alarm)
+        if pulse_total is not None:
+            self.last_total_kwh = pulse_total / self.pulses_per_kwh
+
+    def next_end_epoch(self) -> int | None:
+        ends = [end for end in (self.live_store.next_end_epoch(), self.interval_store.next_end_epoch()) if end is not None]
+        return min(ends) if ends else None
+
+    def pop_closed_rows(self, now_epoch: float) -> list[tuple[str, dict[str, Any]]]:
+        rows: list[tuple[str, dict[str, Any]]] = []
+        for sample_end, bucket in self.live_store.pop_closed(now_epoch):
+            metrics = compute_energy_metrics(bucket.pulse_count, self.pulses_per_kwh, self.live_window_seconds, None)
+            rows.append(("live", {"meterId": self.meter_id, "sampleEnd": sample_end, **metrics, "total_kWh": self.last_total_kwh}))
+
+        for interval_end, bucket in self.interval_store.pop_closed(now_epoch):
+            metrics = compute_energy_metrics(bucket.pulse_count, self.pulses_per_kwh, self.interval_seconds, None)
+            rows.append(
+                (
+                    "interval",
+                    {
+                        "meterId": self.meter_id,
+                        "intervalEnd": interval_end,
+                        "pulseCount": metrics["pulseCount"],
+                        "kWh": metrics["kWh"],
+                        "kW": metrics["kW"],
+                        "total_kWh": self.last_total_kwh,
+                        "r17Exclude": bucket.r17_exclude,
+                        "kyzInvalidAlarm": bucket.kyz_invalid_alarm,
+                    },
+                )
+            )
+        return rows
+
+    def to_snapshot(self) -> MeterSnapshot:
+        return MeterSnapshot(
+            last_total_pulses=self.last_total_pulses,
+            last_total_kwh=self.last_total_kwh,
+            live_buckets=self.live_store.to_snapshot(),
+            interval_buckets=self.interval_store.to_snapshot(),
+        )
+
+    def load_snapshot(self, snapshot: MeterSnapshot, restore_total: bool) -> None:
+        self.live_store.load_snapshot(snapshot.live_buckets)
+        self.interval_store.load_snapshot(snapshot.interval_buckets)
+        if restore_total:
+            self.last_total_pulses = snapshot.last_total_pulses
+            self.last_total_kwh = snapshot.last_total_kwh
 
 
 def compute_energy_metrics(pulse_count: int, pulses_per_kwh: float, bucket_seconds: int, pulse_total: int | None) -> dict[str, Any]:
@@ -256,13 +482,91 @@ def is_transient_sql_error(exc: pyodbc.Error) -> bool:
     return sql_state.startswith(transient_prefixes)
 
 
+def is_sql_outage(exc: BaseException) -> bool:
+    """Whether a failed write means SQL is unreachable (retry later) rather than the rows being rejected."""
+    if isinstance(exc, (pyodbc.OperationalError, pyodbc.InterfaceError)):
+        return True
+    return isinstance(exc, pyodbc.Error) and is_transient_sql_error(exc)
+
+
+INTERVAL_COLUMNS = ("IntervalEnd", "PulseCount", "kWh", "kW", "Total_kWh", "R17Exclude", "KyzInvalidAlarm")
+LIVE_COLUMNS = ("SampleEnd", "PulseCount", "kWh", "kW", "Total_kWh")
+
+# SQL Server caps a statement at 2100 parameters; 200 interval rows use 1400 (1600 with MeterId).
+BATCH_CHUNK_ROWS = 200
+ROLLUP_APPLY_SQL = "EXEC dbo.usp_KYZ_ApplyRollups @FromEnd = ?, @ToEnd = ?"
+MONTHLY_DEMAND_MARK_SQL = "EXEC dbo.usp_KYZ_MarkMonthlyDemandDirty @FromEnd = ?"
+
+
+class BatchWriteResult(NamedTuple):
+    inserted: int
+    deduplicated: int
+
+
+def _interval_params(data: dict[str, Any], include_meter_id: bool = False) -> tuple[Any, ...]:
+    params = (
+        data["intervalEnd"],
+        data["pulseCount"],
+        data["kWh"],
+        data["kW"],
+        data["total_kWh"],
+        1 if data.get("r17Exclude") else 0,
+        1 if data.get("kyzInvalidAlarm") else 0,
+    )
+    return params + (data.get("meterId", DEFAULT_METER_ID),) if include_meter_id else params
+
+
+def _live_params(data: dict[str, Any], include_meter_id: bool = False) -> tuple[Any, ...]:
+    params = (
+        data["sampleEnd"],
+        data["pulseCount"],
+        data["kWh"],
+        data["kW"],
+        data["total_kWh"],
+    )
+    return params + (data.get("meterId", DEFAULT_METER_ID),) if include_meter_id else params
+
+
+def build_batch_insert_sql(table: str, columns: tuple[str, ...], key_columns: tuple[str, ...], row_count: int) -> str:
+    placeholders = "(" + ", ".join("?" for _ in columns) + ")"
+    column_list = ", ".join(columns)
+    return f"""
+            INSERT INTO {table} ({column_list})
+            SELECT {", ".join(f"v.{column}" for column in columns)}
+            FROM (VALUES {", ".join(placeholders for _ in range(row_count))}) AS v ({column_list})
+            WHERE NOT EXISTS (
+                SELECT 1
+                FROM {table} t WITH (UPDLOCK, HOLDLOCK)
+                WHERE {" AND ".join(f"t.{column} = v.{column}" for column in key_columns)}
+            )
+        """
+
+
 class IntervalIngestor:
-    def __init__(self, logger: logging.Logger):
+    def __init__(self, logger: logging.Logger, block_on_connect: bool = True, include_meter_id: bool | None = None):
         self.logger = logger
+        # MeterId needs sql/011_multi_meter.sql; wildcard meter topics turn it on by default.
+        self.include_meter_id = (
+            get_env_bool("SQL_WRITE_METER_ID", default=meter_wildcard_configured())
+            if include_meter_id is None
+            else include_meter_id
+        )
+        # Rollup tables come from sql/012_rollups.sql.
+        self.update_rollups = get_env_bool("SQL_UPDATE_ROLLUPS", default=False)
+        # Change watermark for incremental monthly demand refreshes (sql/007_monthly_demand_billed.sql).
+        self.mark_monthly_demand = get_env_bool("SQL_MARK_MONTHLY_DEMAND", default=False)
         self.conn_str = get_sql_connection_string()
         self.conn: pyodbc.Connection | None = None
         self.lock = threading.Lock()
-        self._connect_with_backoff()
+        self.probe_idle_seconds = get_env_int("SQL_LIVENESS_PROBE_SECONDS", default=60)
+        self.last_success_monotonic = 0.0
+        # With a spool configured, callers fail fast and buffer to disk instead of
+        # sleeping through the reconnect backoff.
+        self.max_connect_attempts: int | None = None if block_on_connect else 1
+        try:
+            self._connect_with_backoff()
+        except pyodbc.Error:
+            self.logger.warning("SQL unavailable at startup; finalized buckets will be spooled until it returns")
 
     def _connect_with_backoff(self) -> None:
         attempt = 0
@@ -271,8 +575,12 @@ class IntervalIngestor:
             attempt += 1
             try:
                 self.conn = pyodbc.connect(self.conn_str, autocommit=False)
+                self.last_success_monotonic = time.monotonic()
                 self.logger.info("SQL connection established")
             except pyodbc.Error:
+                if self.max_connect_attempts is not None and attempt >= self.max_connect_attempts:
+                    self.logger.exception("SQL connection failed (attempt %s)", attempt)
+                    raise
                 delay = min(2 ** min(attempt, 6), max_delay)
                 self.logger.exception("SQL connection failed (attempt %s). Retrying in %ss", attempt, delay)
                 time.sleep(delay)
@@ -281,11 +589,16 @@ class IntervalIngestor:
         if self.conn is None:
             self._connect_with_backoff()
         assert self.conn is not None
+        # Only probe connections that have been idle; a dead connection on a busy
+        # writer surfaces as a transient error and is handled by the retry loop.
+        if time.monotonic() - self.last_success_monotonic < self.probe_idle_seconds:
+            return self.conn
         try:
             cursor = self.conn.cursor()
             cursor.execute("SELECT 1")
             cursor.fetchone()
             cursor.close()
+            self.last_success_monotonic = time.monotonic()
             return self.conn
         except pyodbc.Error:
             self.logger.exception("SQL connection lost; reconnecting")
@@ -303,16 +616,20 @@ class IntervalIngestor:
             self.conn.close()
             self.conn = None
 
-    def _execute_with_retry(self, sql: str, params: tuple[Any, ...], dedupe_key: datetime, label: str) -> bool:
+    def _execute_with_retry(self, statements: list[tuple[str, tuple[Any, ...]]], dedupe_key: Any, label: str) -> int:
+        """Run all statements in one transaction and return the total rows inserted."""
         with self.lock:
             for attempt in range(1, 4):
                 conn = self._ensure_connection()
                 cursor = conn.cursor()
                 try:
-                    cursor.execute(sql, params)
-                    inserted = cursor.rowcount
+                    inserted = 0
+                    for sql, params in statements:
+                        cursor.execute(sql, params)
+                        inserted += max(cursor.rowcount, 0)
                     conn.commit()
-                    return inserted > 0
+                    self.last_success_monotonic = time.monotonic()
+                    return inserted
                 except pyodbc.Error as exc:
                     conn.rollback()
                     if is_transient_sql_error(exc) and attempt < 3:
@@ -332,68 +649,447 @@ class IntervalIngestor:
                     raise
                 finally:
                     cursor.close()
+        return 0
+
+    def _insert_many(
+        self,
+        rows: list[dict[str, Any]],
+        table: str,
+        columns: tuple[str, ...],
+        key_field: str,
+        to_params: Callable[[dict[str, Any], bool], tuple[Any, ...]],
+        follow_up: list[tuple[str, tuple[Any, ...]]] | None = None,
+    ) -> BatchWriteResult:
+        unique: dict[Any, tuple[Any, ...]] = {}
+        for row in rows:
+            key = (row[key_field], row.get("meterId", DEFAULT_METER_ID)) if self.include_meter_id else row[key_field]
+            unique.setdefault(key, to_params(row, self.include_meter_id))
+        if not unique:
+            return BatchWriteResult(inserted=0, deduplicated=len(rows))
+
+        key_columns = (columns[0],)
+        if self.include_meter_id:
+            columns += ("MeterId",)
+            key_columns += ("MeterId",)
+        ordered = [unique[key] for key in sorted(unique)]
+        statements = []
+        for offset in range(0, len(ordered), BATCH_CHUNK_ROWS):
+            chunk = ordered[offset : offset + BATCH_CHUNK_ROWS]
+            sql = build_batch_insert_sql(table, columns, key_columns, len(chunk))
+            statements.append((sql, tuple(value for params in chunk for value in params)))
+
+        inserted = self._execute_with_retry(statements + (follow_up or []), ordered[0][0], key_field)
+        return BatchWriteResult(inserted=inserted, deduplicated=len(rows) - inserted)
+
+    def insert_interval_many(self, rows: list[dict[str, Any]]) -> BatchWriteResult:
+        follow_up = []
+        ends = [row["intervalEnd"] for row in rows]
+        if self.update_rollups and ends:
+            # Same transaction as the insert, so rollups never disagree with committed intervals.
+            follow_up.append((ROLLUP_APPLY_SQL, (min(ends), max(ends))))
+        if self.mark_monthly_demand and ends:
+            follow_up.append((MONTHLY_DEMAND_MARK_SQL, (min(ends),)))
+        return self._insert_many(rows, "dbo.KYZ_Interval", INTERVAL_COLUMNS, "intervalEnd", _interval_params, follow_up)
+
+    def insert_live_many(self, rows: list[dict[str, Any]]) -> BatchWriteResult:
+        return self._insert_many(rows, "dbo.KYZ_Live15s", LIVE_COLUMNS, "sampleEnd", _live_params)
 
     def insert_interval(self, data: dict[str, Any]) -> bool:
-        sql = """
-            INSERT INTO dbo.KYZ_Interval (
-                IntervalEnd,
-                PulseCount,
-                kWh,
-                kW,
-                Total_kWh,
-                R17Exclude,
-                KyzInvalidAlarm
-            )
-            SELECT ?, ?, ?, ?, ?, ?, ?
-            WHERE NOT EXISTS (
-                SELECT 1
-                FROM dbo.KYZ_Interval WITH (UPDLOCK, HOLDLOCK)
-                WHERE IntervalEnd = ?
+        return self.insert_interval_many([data]).inserted > 0
+
+    def insert_live(self, data: dict[str, Any]) -> bool:
+        return self.insert_live_many([data]).inserted > 0
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float | None:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round((pct / 100.0) * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class BucketWriter:
+    """Write-behind SQL writer so MQTT callbacks never wait on a SQL round-trip.
+
+    Only outages (``is_sql_outage``) send rows to the spool and back off. Any other failure
+    means SQL rejected something in the batch: the batch is bisected down to the rows that
+    fail on their own, which are logged and appended to ``rejected_path`` (by default next to
+    the spool) so one bad record never blocks the rows behind it.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        ingestor: IntervalIngestor,
+        max_depth: int,
+        stats_log_seconds: int = 60,
+        batch_max_rows: int = 500,
+        spool: BucketSpool | None = None,
+        rejected_path: str | Path | None = None,
+    ):
+        self.logger = logger
+        self.ingestor = ingestor
+        self.spool = spool
+        if rejected_path is None and spool is not None:
+            rejected_path = spool.path.with_name(spool.path.name + ".rejected.jsonl")
+        self.rejected_path = Path(rejected_path) if rejected_path is not None else None
+        self.batch_max_rows = max(1, batch_max_rows)
+        self.queue: queue.Queue[tuple[str, dict[str, Any], float]] = queue.Queue(maxsize=max_depth)
+        self.max_depth = max_depth
+        self.stats_log_seconds = stats_log_seconds
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="sql-writer", daemon=True)
+
+        self.stats_lock = threading.Lock()
+        self.high_water = 0
+        self.enqueued = 0
+        self.committed = 0
+        self.deduplicated = 0
+        self.dropped = 0
+        self.failed = 0
+        self.rejected = 0
+        self.spooled = 0
+        self.replayed = 0
+        self.latency_ms: deque[float] = deque(maxlen=2048)
+        self.last_stats_log_monotonic = time.monotonic()
+        self.last_finalize_log: dict[str, float] = {"live": 0.0, "interval": 0.0}
+        self.sql_backoff_seconds = 0.0
+        self.sql_retry_at = 0.0
+
+    def start(self) -> None:
+        if self.spool is not None and self.spool.pending():
+            self.logger.info("Spool %s has %s rows awaiting replay", self.spool.path, self.spool.pending())
+        self.thread.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        self.stop_event.set()
+        if self.thread.is_alive():
+            self.thread.join(timeout)
+        if not self.queue.empty():
+            if self.spool is not None and not self.thread.is_alive():
+                leftover: list[tuple[str, dict[str, Any], float]] = []
+                while not self.queue.empty():
+                    leftover.append(self.queue.get_nowait())
+                self._spool_items(leftover)
+            else:
+                self.logger.error("SQL writer stopped with %s rows still queued", self.queue.qsize())
+        self._log_stats()
+        if self.spool is not None and not self.thread.is_alive():
+            self.spool.close()
+
+    def submit(self, kind: str, payload: dict[str, Any]) -> bool:
+        try:
+            self.queue.put_nowait((kind, payload, time.monotonic()))
+        except queue.Full:
+            if self.spool is not None and self.spool.append(kind, payload):
+                with self.stats_lock:
+                    self.spooled += 1
+                return True
+            with self.stats_lock:
+                self.dropped += 1
+            self.logger.error(
+                "SQL write queue full (max_depth=%s); dropping %s row %s",
+                self.max_depth,
+                kind,
+                payload.get("sampleEnd") or payload.get("intervalEnd"),
             )
-        """
-        params = (
-            data["intervalEnd"],
-            data["pulseCount"],
-            data["kWh"],
-            data["kW"],
-            data["total_kWh"],
-            1 if data.get("r17Exclude") else 0,
-            1 if data.get("kyzInvalidAlarm") else 0,
-            data["intervalEnd"],
+            return False
+        depth = self.queue.qsize()
+        with self.stats_lock:
+            self.enqueued += 1
+            if depth > self.high_water:
+                self.high_water = depth
+        return True
+
+    def stats(self) -> dict[str, Any]:
+        with self.stats_lock:
+            latencies = sorted(self.latency_ms)
+            return {
+                "depth": self.queue.qsize(),
+                "maxDepth": self.max_depth,
+                "highWater": self.high_water,
+                "enqueued": self.enqueued,
+                "committed": self.committed,
+                "deduplicated": self.deduplicated,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "spooled": self.spooled,
+                "replayed": self.replayed,
+                "spoolPending": self.spool.pending() if self.spool is not None else 0,
+                "latencyMsP50": _percentile(latencies, 50),
+                "latencyMsP99": _percentile(latencies, 99),
+                "latencyMsMax": latencies[-1] if latencies else None,
+            }
+
+    def _log_stats(self) -> None:
+        stats = self.stats()
+        self.logger.info(
+            "SQL writer depth=%s high_water=%s enqueued=%s committed=%s deduplicated=%s dropped=%s failed=%s "
+            "rejected=%s spooled=%s replayed=%s spool_pending=%s latency_ms p50=%s p99=%s max=%s",
+            stats["depth"],
+            stats["highWater"],
+            stats["enqueued"],
+            stats["committed"],
+            stats["deduplicated"],
+            stats["dropped"],
+            stats["failed"],
+            stats["rejected"],
+            stats["spooled"],
+            stats["replayed"],
+            stats["spoolPending"],
+            _format_ms(stats["latencyMsP50"]),
+            _format_ms(stats["latencyMsP99"]),
+            _format_ms(stats["latencyMsMax"]),
         )
-        return self._execute_with_retry(sql, params, data["intervalEnd"], "intervalEnd")
+        self.last_stats_log_monotonic = time.monotonic()
 
-    def insert_live(self, data: dict[str, Any]) -> bool:
-        sql = """
-            INSERT INTO dbo.KYZ_Live15s (
-                SampleEnd,
-                PulseCount,
-                kWh,
-                kW,
-                Total_kWh
+    def _sql_available(self) -> bool:
+        return time.monotonic() >= self.sql_retry_at
+
+    def _mark_sql_failure(self) -> None:
+        self.sql_backoff_seconds = min(max(self.sql_backoff_seconds * 2, 2.0), 60.0)
+        self.sql_retry_at = time.monotonic() + self.sql_backoff_seconds
+
+    def _mark_sql_success(self) -> None:
+        self.sql_backoff_seconds = 0.0
+        self.sql_retry_at = 0.0
+
+    def _replay_pending(self) -> bool:
+        return self.spool is not None and self._sql_available() and self.spool.pending() > 0
+
+    def _run(self) -> None:
+        while True:
+            if time.monotonic() - self.last_stats_log_monotonic >= self.stats_log_seconds:
+                self._log_stats()
+            try:
+                first = self.queue.get(timeout=0.0 if self._replay_pending() else 0.5)
+            except queue.Empty:
+                if self.stop_event.is_set():
+                    return
+                self._replay_spool()
+                continue
+            batch = [first]
+            while len(batch) < self.batch_max_rows:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write_batch(batch)
+            self._replay_spool()
+
+    def _spool_items(self, items: list[tuple[str, dict[str, Any], float]]) -> None:
+        assert self.spool is not None
+        for kind in ("live", "interval"):
+            payloads = [payload for item_kind, payload, _ in items if item_kind == kind]
+            if not payloads:
+                continue
+            accepted = self.spool.append_many(kind, payloads)
+            with self.stats_lock:
+                self.spooled += accepted
+                self.dropped += len(payloads) - accepted
+
+    def _write_batch(self, batch: list[tuple[str, dict[str, Any], float]]) -> None:
+        if self.spool is not None and (not self._sql_available() or self.spool.pending() > 0):
+            # Keep commit order: while older rows are still spooled, new rows queue behind them on disk.
+            self._spool_items(batch)
+            return
+        for kind in ("live", "interval"):
+            items = [item for item in batch if item[0] == kind]
+            if not items:
+                continue
+            if self.spool is not None and not self._sql_available():
+                self._spool_items(items)
+                continue
+            written = self._write_kind(kind, [payload for _, payload, _ in items], [enqueued_at for _, _, enqueued_at in items])
+            if not written and self.spool is not None:
+                self._spool_items(items)
+
+    def _insert_rows(self, kind: str, rows: list[dict[str, Any]]) -> BatchWriteResult:
+        if kind == "live":
+            return self.ingestor.insert_live_many(rows)
+        return self.ingestor.insert_interval_many(rows)
+
+    def _insert_isolating(self, kind: str, rows: list[dict[str, Any]]) -> BatchWriteResult:
+        """Insert ``rows``, bisecting around rows SQL rejects; only outages propagate."""
+        try:
+            return self._insert_rows(kind, rows)
+        except Exception as exc:
+            if is_sql_outage(exc):
+                raise
+            if len(rows) == 1:
+                self._reject(kind, rows[0], exc)
+                return BatchWriteResult(inserted=0, deduplicated=0)
+        middle = len(rows) // 2
+        first = self._insert_isolating(kind, rows[:middle])
+        second = self._insert_isolating(kind, rows[middle:])
+        return BatchWriteResult(first.inserted + second.inserted, first.deduplicated + second.deduplicated)
+
+    def _reject(self, kind: str, row: dict[str, Any], exc: Exception) -> None:
+        with self.stats_lock:
+            self.rejected += 1
+            self.failed += 1
+        self.logger.error(
+            "SQL rejected %s row %s (%s: %s)%s",
+            kind,
+            row.get("sampleEnd") or row.get("intervalEnd"),
+            type(exc).__name__,
+            exc,
+            f"; moved to {self.rejected_path}" if self.rejected_path is not None else "",
+        )
+        if self.rejected_path is None:
+            return
+        record = {"kind": kind, "error": f"{type(exc).__name__}: {exc}", "rejectedAt": datetime.now().isoformat(), "row": row}
+        try:
+            self.rejected_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.rejected_path.open("a", encoding="utf-8") as handle:
+                handle.write(json.dumps(record, default=str) + "\n")
+        except OSError:
+            self.logger.exception("Could not write rejected row to %s", self.rejected_path)
+
+    def _write_kind(self, kind: str, rows: list[dict[str, Any]], enqueued_at: list[float]) -> bool:
+        try:
+            result = self._insert_isolating(kind, rows)
+        except Exception:
+            self._mark_sql_failure()
+            if self.spool is None:
+                with self.stats_lock:
+                    self.failed += len(rows)
+            self.logger.exception(
+                "SQL batch write failed for %s %s rows%s",
+                len(rows),
+                kind,
+                "; spooling to disk" if self.spool is not None else "",
             )
-            SELECT ?, ?, ?, ?, ?
-            WHERE NOT EXISTS (
-                SELECT 1
-                FROM dbo.KYZ_Live15s WITH (UPDLOCK, HOLDLOCK)
-                WHERE SampleEnd = ?
+            return False
+
+        self._mark_sql_success()
+        committed_at = time.monotonic()
+        with self.stats_lock:
+            self.latency_ms.extend((committed_at - started) * 1000.0 for started in enqueued_at)
+            self.committed += result.inserted
+            self.deduplicated += result.deduplicated
+
+        if len(rows) > 1:
+            self.logger.info(
+                "SQL batch kind=%s rows=%s inserted=%s deduplicated=%s",
+                kind,
+                len(rows),
+                result.inserted,
+                result.deduplicated,
             )
-        """
-        params = (
-            data["sampleEnd"],
-            data["pulseCount"],
-            data["kWh"],
-            data["kW"],
-            data["total_kWh"],
-            data["sampleEnd"],
+        elif result.inserted:
+            self._rate_limited_finalize_log(kind, rows[0])
+        return True
+
+    def _replay_spool(self) -> None:
+        if not self._replay_pending():
+            return
+        assert self.spool is not None
+        records, next_offset = self.spool.read_batch(self.batch_max_rows)
+        try:
+            for kind in ("live", "interval"):
+                rows = [payload for record_kind, payload in records if record_kind == kind]
+                if not rows:
+                    continue
+                result = self._insert_isolating(kind, rows)
+                with self.stats_lock:
+                    self.committed += result.inserted
+                    self.deduplicated += result.deduplicated
+        except Exception:
+            self._mark_sql_failure()
+            self.logger.exception(
+                "Spool replay failed (%s rows pending); retrying in %.0fs",
+                self.spool.pending(),
+                self.sql_backoff_seconds,
+            )
+            return
+
+        self._mark_sql_success()
+        self.spool.commit(next_offset)
+        with self.stats_lock:
+            self.replayed += len(records)
+        self.logger.info("Replayed %s spooled rows (%s pending)", len(records), self.spool.pending())
+
+    def _rate_limited_finalize_log(self, kind: str, payload: dict[str, Any]) -> None:
+        now_monotonic = time.monotonic()
+        if now_monotonic - self.last_finalize_log[kind] < 5:
+            return
+        self.last_finalize_log[kind] = now_monotonic
+        if kind == "live":
+            self.logger.info(
+                "Finalized live bucket sampleEnd=%s pulseCount=%s kW=%.3f",
+                payload["sampleEnd"],
+                payload["pulseCount"],
+                payload["kW"],
+            )
+        else:
+            self.logger.info(
+                "Finalized interval bucket intervalEnd=%s pulseCount=%s kW=%.3f",
+                payload["intervalEnd"],
+                payload["pulseCount"],
+                payload["kW"],
+            )
+
+
+def _format_ms(value: float | None) -> str:
+    return f"{value:.1f}" if value is not None else "-"
+
+
+def shard_path(path: str, shard: int | None) -> str:
+    """Give each ingest worker process its own copy of a state file."""
+    if shard is None:
+        return path
+    candidate = Path(path)
+    return str(candidate.with_name(f"{candidate.stem}.shard{shard}{candidate.suffix}"))
+
+
+def get_spool_path() -> str:
+    return os.getenv("INGEST_SPOOL_PATH") or str(Path("spool") / "kyz_ingestor.spool")
+
+
+def build_spool(logger: logging.Logger, shard: int | None = None) -> BucketSpool | None:
+    if not get_env_bool("INGEST_SPOOL_ENABLED", default=True):
+        return None
+    return BucketSpool(
+        shard_path(get_spool_path(), shard),
+        logger,
+        max_bytes=get_env_int("INGEST_SPOOL_MAX_MB", default=64) * 1024 * 1024,
+        fsync_every_rows=get_env_int("INGEST_SPOOL_FSYNC_ROWS", default=64),
+        fsync_interval_seconds=get_env_float("INGEST_SPOOL_FSYNC_SECONDS", default=1.0),
+    )
+
+
+def build_checkpoint_store(logger: logging.Logger, shard: int | None = None) -> CheckpointStore | None:
+    if not get_env_bool("INGEST_CHECKPOINT_ENABLED", default=True):
+        return None
+    return CheckpointStore(
+        shard_path(os.getenv("INGEST_CHECKPOINT_PATH") or str(Path("spool") / "kyz_ingestor.checkpoint"), shard),
+        logger,
+    )
+
+
+def get_pulses_per_kwh_config(logger: logging.Logger) -> tuple[float, dict[str, float]]:
+    """Read KYZ_PULSES_PER_KWH and the per-meter overrides, raising ConfigError on bad values."""
+    pulses_per_kwh = get_env_float("KYZ_PULSES_PER_KWH")
+    if pulses_per_kwh <= 0:
+        raise ConfigError("KYZ_PULSES_PER_KWH must be greater than zero")
+    if pulses_per_kwh >= 100 and float(pulses_per_kwh).is_integer():
+        logger.info(
+            "KYZ_PULSES_PER_KWH=%s looks unusually high. This value must be pulses per kWh (kWh = pulseCount / KYZ_PULSES_PER_KWH), not kWh per pulse.",
+            int(pulses_per_kwh),
         )
-        return self._execute_with_retry(sql, params, data["sampleEnd"], "sampleEnd")
+    return pulses_per_kwh, parse_meter_pulses_per_kwh(os.getenv("KYZ_METER_PULSES_PER_KWH", ""))
+
 
+class MqttService:
+    """MQTT connection, topic subscriptions and topic-to-meter routing.
 
-class MqttSqlService:
-    def __init__(self, logger: logging.Logger, ingestor: IntervalIngestor):
+    Holds no SQL-side state; ``MqttSqlService`` adds aggregation and the bucket writer.
+    """
+
+    def __init__(self, logger: logging.Logger):
         self.logger = logger
-        self.ingestor = ingestor
         self.stop_event = threading.Event()
 
         self.mqtt_host = get_required_env("MQTT_HOST")
@@ -403,26 +1099,13 @@ class MqttSqlService:
         self.mqtt_client_id = os.getenv("MQTT_CLIENT_ID", "kyz-sql-ingestor")
         self.mqtt_keepalive = int(os.getenv("MQTT_KEEPALIVE", "60"))
 
-        self.topic_pulse = os.getenv("MQTT_TOPIC_PULSE", "pri/energy/kyz/pulseCount")
-        self.topic_interval = os.getenv("MQTT_TOPIC_INTERVAL", "pri/energy/kyz/interval")
-        self.live_window_seconds = get_env_int("LIVE_WINDOW_SECONDS", default=15)
-        self.interval_seconds = get_env_int("INTERVAL_SECONDS", default=900)
-        self.pulses_per_kwh = get_env_float("KYZ_PULSES_PER_KWH")
-        if self.pulses_per_kwh <= 0:
-            raise ConfigError("KYZ_PULSES_PER_KWH must be greater than zero")
-        if self.pulses_per_kwh >= 100 and float(self.pulses_per_kwh).is_integer():
-            self.logger.info(
-                "KYZ_PULSES_PER_KWH=%s looks unusually high. This value must be pulses per kWh (kWh = pulseCount / KYZ_PULSES_PER_KWH), not kWh per pulse.",
-                int(self.pulses_per_kwh),
-            )
-
-        self.live_buckets: dict[datetime, dict[str, Any]] = {}
-        self.interval_buckets: dict[datetime, dict[str, Any]] = {}
-        self.last_total_pulses: int | None = None
-        self.last_total_kwh: float | None = None
-        self.last_finalize_log: dict[str, float] = {"live": 0.0, "interval": 0.0}
-        self.last_delta_mismatch_log_monotonic = 0.0
-        self.last_missing_counter_log_monotonic = 0.0
+        self.topic_pulse = os.getenv("MQTT_TOPIC_PULSE", DEFAULT_TOPIC_PULSE)
+        self.topic_interval = os.getenv("MQTT_TOPIC_INTERVAL", DEFAULT_TOPIC_INTERVAL)
+        self.default_meter_id = os.getenv("KYZ_METER_ID", DEFAULT_METER_ID)
+        if not METER_ID_PATTERN.fullmatch(self.default_meter_id):
+            raise ConfigError(f"Invalid KYZ_METER_ID: {self.default_meter_id}")
+        self.topic_meter_ids: dict[str, str] = {}
+        self.last_invalid_meter_log_monotonic = 0.0
 
         self.client = mqtt.Client(
             mqtt.CallbackAPIVersion.VERSION2,
@@ -451,41 +1134,20 @@ class MqttSqlService:
     def on_disconnect(self, client: mqtt.Client, userdata: Any, disconnect_flags: Any, reason_code: Any, properties: Any = None) -> None:
         self.logger.warning("MQTT disconnected (reason=%s)", reason_code)
 
-    def _rate_limited_bucket_log(self, key: str, message: str, *args: Any) -> None:
-        now_monotonic = time.monotonic()
-        if now_monotonic - self.last_finalize_log[key] >= 5:
-            self.logger.info(message, *args)
-            self.last_finalize_log[key] = now_monotonic
-
-    def _queue_bucket(
-        self,
-        receive_time: datetime,
-        pulse_delta: int,
-        pulse_total: int | None,
-        r17_exclude: bool | None,
-        kyz_invalid_alarm: bool | None,
-    ) -> None:
-        live_end = bucket_end(receive_time, self.live_window_seconds)
-        interval_end = bucket_end(receive_time, self.interval_seconds)
-
-        live_bucket = self.live_buckets.setdefault(
-            live_end,
-            {"pulseCount": 0, "r17Exclude": None, "kyzInvalidAlarm": None},
+    def _meter_id_for_topic(self, topic: str) -> str | None:
+        meter_id = self.topic_meter_ids.get(topic)
+        if meter_id is not None:
+            return meter_id
+        meter_id = (
+            meter_id_from_topic(self.topic_pulse, topic)
+            or meter_id_from_topic(self.topic_interval, topic)
+            or self.default_meter_id
         )
-        interval_bucket = self.interval_buckets.setdefault(
-            interval_end,
-            {"pulseCount": 0, "r17Exclude": None, "kyzInvalidAlarm": None},
-        )
-
-        live_bucket["pulseCount"] += pulse_delta
-        interval_bucket["pulseCount"] += pulse_delta
-        live_bucket["r17Exclude"] = _or_optional_bool(live_bucket["r17Exclude"], r17_exclude)
-        interval_bucket["r17Exclude"] = _or_optional_bool(interval_bucket["r17Exclude"], r17_exclude)
-        live_bucket["kyzInvalidAlarm"] = _or_optional_bool(live_bucket["kyzInvalidAlarm"], kyz_invalid_alarm)
-        interval_bucket["kyzInvalidAlarm"] = _or_optional_bool(interval_bucket["kyzInvalidAlarm"], kyz_invalid_alarm)
-
-        if pulse_total is not None:
-            self.last_total_kwh = pulse_total / self.pulses_per_kwh
+        if not METER_ID_PATTERN.fullmatch(meter_id):
+            self._rate_limited_warning("invalid_meter", "Ignoring topic %s: invalid meter id %r", topic, meter_id)
+            return None
+        self.topic_meter_ids[topic] = meter_id
+        return meter_id
 
     def _rate_limited_warning(self, key: str, message: str, *args: Any) -> None:
         now_monotonic = time.monotonic()
@@ -495,6 +1157,83 @@ class MqttSqlService:
             self.logger.warning(message, *args)
             setattr(self, attr_name, now_monotonic)
 
+    def on_message(self, client: mqtt.Client, userdata: Any, msg: mqtt.MQTTMessage) -> None:
+        self.handle_message(msg.topic, msg.payload, datetime.now())
+
+    def handle_message(self, topic: str, payload_bytes: bytes, receive_time: datetime) -> None:
+        raise NotImplementedError
+
+    def _connect_mqtt_with_backoff(self) -> None:
+        delay = 1
+        while not self.stop_event.is_set():
+            try:
+                self.client.connect(self.mqtt_host, self.mqtt_port, self.mqtt_keepalive)
+                return
+            except Exception:
+                self.logger.exception("MQTT connect failed, retrying in %ss", delay)
+                time.sleep(delay)
+                delay = min(delay * 2, 60)
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+
+class MqttSqlService(MqttService):
+    writer_class: type[BucketWriter] = BucketWriter
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        ingestor: IntervalIngestor,
+        spool: BucketSpool | None = None,
+        checkpoint: CheckpointStore | None = None,
+    ):
+        super().__init__(logger)
+        self.ingestor = ingestor
+        self.checkpoint = checkpoint
+        self.checkpoint_seconds = get_env_int("INGEST_CHECKPOINT_SECONDS", default=5)
+        self.checkpoint_max_age_seconds = get_env_int("INGEST_CHECKPOINT_MAX_AGE_SECONDS", default=300)
+        self.writer = self.writer_class(
+            logger,
+            ingestor,
+            max_depth=get_env_int("INGEST_QUEUE_MAX_DEPTH", default=10000),
+            stats_log_seconds=get_env_int("INGEST_QUEUE_STATS_LOG_SECONDS", default=60),
+            batch_max_rows=get_env_int("INGEST_BATCH_MAX_ROWS", default=500),
+            spool=spool,
+        )
+
+        self.live_window_seconds = get_env_int("LIVE_WINDOW_SECONDS", default=15)
+        self.interval_seconds = get_env_int("INTERVAL_SECONDS", default=900)
+        self.pulses_per_kwh, self.meter_pulses_per_kwh = get_pulses_per_kwh_config(logger)
+        self.max_meters = get_env_int("KYZ_MAX_METERS", default=64)
+        self.meters: dict[str, MeterAggregator] = {}
+        self.last_delta_mismatch_log_monotonic = 0.0
+        self.last_missing_counter_log_monotonic = 0.0
+        self.state_lock = threading.RLock()
+        self.seq = 0
+        self.saved_seq = 0
+        self.last_checkpoint_monotonic = time.monotonic()
+
+    def _meter(self, meter_id: str) -> MeterAggregator | None:
+        meter = self.meters.get(meter_id)
+        if meter is None:
+            if len(self.meters) >= self.max_meters:
+                self._rate_limited_warning(
+                    "invalid_meter",
+                    "Ignoring meter %s: KYZ_MAX_METERS=%s meters are already tracked",
+                    meter_id,
+                    self.max_meters,
+                )
+                return None
+            meter = self.meters[meter_id] = MeterAggregator(
+                meter_id,
+                self.meter_pulses_per_kwh.get(meter_id, self.pulses_per_kwh),
+                self.live_window_seconds,
+                self.interval_seconds,
+            )
+            self.logger.info("Tracking meter %s (pulses per kWh=%s)", meter_id, meter.pulses_per_kwh)
+        return meter
+
     def _process_pulse_update(
         self,
         pulse_delta: int | None,
@@ -503,95 +1242,127 @@ class MqttSqlService:
         kyz_invalid_alarm: bool | None,
         topic: str,
         receive_time: datetime,
+        meter_id: str | None = None,
     ) -> None:
-        if pulse_delta is None and pulse_total is None:
-            self._rate_limited_warning(
-                "missing_counter",
-                "Dropping payload on topic %s because both pulse delta and total are missing",
-                topic,
-            )
-            return
+        with self.state_lock:
+            if pulse_delta is None and pulse_total is None:
+                self._rate_limited_warning(
+                    "missing_counter",
+                    "Dropping payload on topic %s because both pulse delta and total are missing",
+                    topic,
+                )
+                return
 
-        prior_total = self.last_total_pulses
-        effective_delta, new_last_total = compute_effective_pulse_delta(pulse_delta, pulse_total, prior_total)
+            meter = self._meter(meter_id or self.default_meter_id)
+            if meter is None:
+                return
 
-        if pulse_total is not None and prior_total is not None and pulse_delta is not None:
-            total_delta = pulse_total - prior_total
-            expected_delta = max(total_delta, 0)
-            if pulse_delta != expected_delta:
-                self._rate_limited_warning(
-                    "delta_mismatch",
-                    "Pulse delta mismatch on topic %s: d=%s while Δc=%s (prev_total=%s new_total=%s)",
+            prior_total = meter.last_total_pulses
+            effective_delta, new_last_total = compute_effective_pulse_delta(pulse_delta, pulse_total, prior_total)
+
+            if pulse_total is not None and prior_total is not None and pulse_delta is not None:
+                total_delta = pulse_total - prior_total
+                expected_delta = max(total_delta, 0)
+                if pulse_delta != expected_delta:
+                    self._rate_limited_warning(
+                        "delta_mismatch",
+                        "Pulse delta mismatch on topic %s: d=%s while Δc=%s (prev_total=%s new_total=%s)",
+                        topic,
+                        pulse_delta,
+                        expected_delta,
+                        prior_total,
+                        pulse_total,
+                    )
+
+            if pulse_total is not None and prior_total is not None and pulse_total < prior_total:
+                self.logger.warning(
+                    "Pulse total decreased on topic %s (prev=%s new=%s). Treating as PLC reset.",
                     topic,
-                    pulse_delta,
-                    expected_delta,
                     prior_total,
                     pulse_total,
                 )
 
-        if pulse_total is not None and prior_total is not None and pulse_total < prior_total:
-            self.logger.warning(
-                "Pulse total decreased on topic %s (prev=%s new=%s). Treating as PLC reset.",
-                topic,
-                prior_total,
-                pulse_total,
-            )
-
-        if new_last_total is not None:
-            self.last_total_pulses = new_last_total
+            if new_last_total is not None:
+                meter.last_total_pulses = new_last_total
 
-        if pulse_total is None and pulse_delta is not None:
-            self._rate_limited_warning(
-                "missing_counter",
-                "Pulse total missing on topic %s; falling back to pulse delta",
-                topic,
-            )
+            if pulse_total is None and pulse_delta is not None:
+                self._rate_limited_warning(
+                    "missing_counter",
+                    "Pulse total missing on topic %s; falling back to pulse delta",
+                    topic,
+                )
 
-        self._queue_bucket(receive_time, effective_delta, pulse_total, r17_exclude, kyz_invalid_alarm)
-        self._flush_closed_buckets(receive_time)
+            self.seq += 1
+            meter.add(int(receive_time.timestamp()), effective_delta, pulse_total, r17_exclude, kyz_invalid_alarm)
+            self._flush_closed_buckets(receive_time)
 
     def _flush_closed_buckets(self, now: datetime) -> None:
-        closed_live = sorted(end for end in self.live_buckets if end <= now)
-        for sample_end in closed_live:
-            bucket = self.live_buckets.pop(sample_end)
-            pulse_count = bucket["pulseCount"]
-            metrics = compute_energy_metrics(pulse_count, self.pulses_per_kwh, self.live_window_seconds, None)
-            payload = {"sampleEnd": sample_end, **metrics, "total_kWh": self.last_total_kwh}
-            inserted = self.ingestor.insert_live(payload)
-            if inserted:
-                self._rate_limited_bucket_log(
-                    "live",
-                    "Finalized live bucket sampleEnd=%s pulseCount=%s kW=%.3f",
-                    sample_end,
-                    pulse_count,
-                    payload["kW"],
-                )
+        now_epoch = now.timestamp()
+        with self.state_lock:
+            closed = [row for meter in self.meters.values() for row in meter.pop_closed_rows(now_epoch)]
+            if closed:
+                self.seq += 1
+            for kind, payload in closed:
+                self.writer.submit(kind, payload)
+
+    def next_wakeup_epoch(self, now_epoch: float) -> float:
+        """Earliest moment the run loop has work: a bucket closing or a checkpoint falling due."""
+        # New buckets always end at or after the next live boundary, so never sleep past it.
+        candidates = [float(bucket_index(int(now_epoch) + 1, self.live_window_seconds) * self.live_window_seconds)]
+        with self.state_lock:
+            for meter in self.meters.values():
+                next_end = meter.next_end_epoch()
+                if next_end is not None:
+                    candidates.append(float(next_end))
+        if self.checkpoint is not None:
+            candidates.append(now_epoch + max(self.checkpoint_seconds - (time.monotonic() - self.last_checkpoint_monotonic), 0.0))
+        return min(candidates)
+
+    def snapshot_state(self) -> AggregatorSnapshot:
+        with self.state_lock:
+            return AggregatorSnapshot(
+                seq=self.seq,
+                saved_at=time.time(),
+                meters={meter_id: meter.to_snapshot() for meter_id, meter in self.meters.items()},
+            )
 
-        closed_interval = sorted(end for end in self.interval_buckets if end <= now)
-        for interval_end in closed_interval:
-            bucket = self.interval_buckets.pop(interval_end)
-            pulse_count = bucket["pulseCount"]
-            metrics = compute_energy_metrics(pulse_count, self.pulses_per_kwh, self.interval_seconds, None)
-            payload = {
-                "intervalEnd": interval_end,
-                "pulseCount": metrics["pulseCount"],
-                "kWh": metrics["kWh"],
-                "kW": metrics["kW"],
-                "total_kWh": self.last_total_kwh,
-                "r17Exclude": bucket["r17Exclude"],
-                "kyzInvalidAlarm": bucket["kyzInvalidAlarm"],
-            }
-            inserted = self.ingestor.insert_interval(payload)
-            if inserted:
-                self._rate_limited_bucket_log(
-                    "interval",
-                    "Finalized interval bucket intervalEnd=%s pulseCount=%s kW=%.3f",
-                    interval_end,
-                    pulse_count,
-                    payload["kW"],
-                )
+    def restore_state(self, snapshot: AggregatorSnapshot) -> None:
+        age_seconds = time.time() - snapshot.saved_at
+        # A stale total would dump every pulse counted while we were down into one
+        # bucket, so only trust it across a short restart.
+        restore_total = 0 <= age_seconds <= self.checkpoint_max_age_seconds
+        with self.state_lock:
+            self.seq = self.saved_seq = snapshot.seq
+            for meter_id, meter_snapshot in snapshot.meters.items():
+                meter = self.meters.get(meter_id) or self._meter(meter_id)
+                if meter is not None:
+                    meter.load_snapshot(meter_snapshot, restore_total)
+        self.logger.info(
+            "Restored checkpoint seq=%s age=%.0fs meters=%s live_buckets=%s interval_buckets=%s pulse_totals_restored=%s",
+            snapshot.seq,
+            age_seconds,
+            len(snapshot.meters),
+            sum(len(meter.live_buckets) for meter in snapshot.meters.values()),
+            sum(len(meter.interval_buckets) for meter in snapshot.meters.values()),
+            restore_total,
+        )
 
-    def _process_packed_payload(self, raw_payload: str, topic: str, receive_time: datetime) -> None:
+    def _save_checkpoint(self, force: bool = False) -> None:
+        if self.checkpoint is None:
+            return
+        if not force and time.monotonic() - self.last_checkpoint_monotonic < self.checkpoint_seconds:
+            return
+        self.last_checkpoint_monotonic = time.monotonic()
+        snapshot = self.snapshot_state()
+        if snapshot.seq == self.saved_seq and not force:
+            return
+        try:
+            self.checkpoint.save(snapshot)
+            self.saved_seq = snapshot.seq
+        except OSError:
+            self.logger.exception("Failed to write checkpoint %s", self.checkpoint.path)
+
+    def _process_packed_payload(self, raw_payload: str, topic: str, receive_time: datetime, meter_id: str | None = None) -> None:
         pulse_delta, pulse_total, r17_exclude, kyz_invalid_alarm = parse_packed_pulse_payload(raw_payload)
         self._process_pulse_update(
             pulse_delta=pulse_delta,
@@ -600,12 +1371,22 @@ class MqttSqlService:
             kyz_invalid_alarm=kyz_invalid_alarm,
             topic=topic,
             receive_time=receive_time,
+            meter_id=meter_id,
         )
 
-    def on_message(self, client: mqtt.Client, userdata: Any, msg: mqtt.MQTTMessage) -> None:
-        raw_payload = msg.payload.decode("utf-8", errors="replace")
+    def handle_message(self, topic: str, payload_bytes: bytes, receive_time: datetime) -> None:
+        raw_payload = payload_bytes.decode("utf-8", errors="replace")
         payload_preview = raw_payload[:300]
-        receive_time = datetime.now()
+        meter_id = self._meter_id_for_topic(topic)
+        if meter_id is None:
+            return
+
+        if not payload_looks_like_json(raw_payload):
+            try:
+                self._process_packed_payload(raw_payload, topic, receive_time, meter_id)
+            except Exception:
+                self.logger.warning("Invalid packed payload on topic %s raw=%r", topic, payload_preview)
+            return
 
         try:
             payload = json.loads(raw_payload)
@@ -614,9 +1395,8 @@ class MqttSqlService:
 
             if all(field in payload for field in ["intervalEnd", "pulseCount", "kWh", "kW"]):
                 data = validate_payload(payload)
-                inserted = self.ingestor.insert_interval(data)
-                if inserted:
-                    self._rate_limited_bucket_log("interval", "Inserted JSON interval intervalEnd=%s", data["intervalEnd"])
+                data["meterId"] = meter_id
+                self.writer.submit("interval", data)
                 return
 
             if any(field in payload for field in ["d", "pulseDelta", "c", "pulseTotal", "t"]):
@@ -631,49 +1411,53 @@ class MqttSqlService:
                     pulse_total=pulse_total,
                     r17_exclude=r17_exclude,
                     kyz_invalid_alarm=kyz_invalid_alarm,
-                    topic=msg.topic,
+                    topic=topic,
                     receive_time=receive_time,
+                    meter_id=meter_id,
                 )
                 return
 
             raise ValueError("Unsupported JSON payload shape")
 
-        except json.JSONDecodeError:
-            try:
-                self._process_packed_payload(raw_payload, msg.topic, receive_time)
-            except Exception:
-                self.logger.warning("Invalid packed payload on topic %s raw=%r", msg.topic, payload_preview)
+        except json.JSONDecodeError as exc:
+            self.logger.warning("Invalid JSON payload on topic %s: %s raw=%r", topic, exc, payload_preview)
         except Exception as exc:
-            self.logger.warning("Failed to process MQTT payload on topic %s: %s raw=%r", msg.topic, exc, payload_preview)
-
-    def _connect_mqtt_with_backoff(self) -> None:
-        delay = 1
-        while not self.stop_event.is_set():
-            try:
-                self.client.connect(self.mqtt_host, self.mqtt_port, self.mqtt_keepalive)
-                return
-            except Exception:
-                self.logger.exception("MQTT connect failed, retrying in %ss", delay)
-                time.sleep(delay)
-                delay = min(delay * 2, 60)
+            self.logger.warning("Failed to process MQTT payload on topic %s: %s raw=%r", topic, exc, payload_preview)
+
+    def start_processing(self) -> None:
+        if self.checkpoint is not None:
+            snapshot = self.checkpoint.load()
+            if snapshot is not None:
+                self.restore_state(snapshot)
+        self.writer.start()
+
+    def process_due(self) -> float:
+        """Finalize closed buckets, checkpoint if due, and return seconds until the next wakeup."""
+        self._flush_closed_buckets(datetime.now())
+        self._save_checkpoint()
+        # Wake just after the next bucket boundary instead of polling.
+        return max(self.next_wakeup_epoch(time.time()) - time.time() + 0.01, 0.01)
+
+    def stop_processing(self) -> None:
+        self._flush_closed_buckets(datetime.now())
+        self._save_checkpoint(force=True)
+        self.writer.stop()
+        self.ingestor.close()
 
     def run(self) -> None:
         self.logger.info("Starting MQTT SQL service")
+        self.start_processing()
         self._connect_mqtt_with_backoff()
         self.client.loop_start()
 
         while not self.stop_event.is_set():
-            self._flush_closed_buckets(datetime.now())
-            time.sleep(0.2)
+            self.stop_event.wait(self.process_due())
 
         self.client.loop_stop()
         self.client.disconnect()
-        self.ingestor.close()
+        self.stop_processing()
         self.logger.info("Service stopped")
 
-    def stop(self) -> None:
-        self.stop_event.set()
-
 
 class MqttConnectivityProbe:
     def __init__(self, logger: logging.Logger):
@@ -753,14 +1537,42 @@ def main() -> int:
 
     parser = argparse.ArgumentParser(description="Subscribe to KYZ interval MQTT and ingest into Azure SQL")
     parser.add_argument("--test-conn", action="store_true", help="Test MQTT and SQL connectivity then exit")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of ingest worker processes; meters are sharded across them (default INGEST_WORKERS or 1)",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=("thread", "asyncio"),
+        default=None,
+        help="Event engine: paho background thread (default) or a single asyncio event loop (INGEST_ENGINE)",
+    )
     args = parser.parse_args()
 
     try:
         if args.test_conn:
             return test_connectivity(logger)
 
-        ingestor = IntervalIngestor(logger)
-        service = MqttSqlService(logger, ingestor)
+        engine = args.engine or os.getenv("INGEST_ENGINE") or "thread"
+        if engine not in ("thread", "asyncio"):
+            raise ConfigError(f"Invalid INGEST_ENGINE: {engine}")
+        workers = args.workers if args.workers is not None else get_env_int("INGEST_WORKERS", default=1)
+        if workers > 1:
+            if engine == "asyncio":
+                raise ConfigError("--engine asyncio runs a single process; it cannot be combined with --workers")
+            from ingest_shards import run_sharded
+
+            return run_sharded(logger, workers)
+        if engine == "asyncio":
+            from ingest_async import run_asyncio
+
+            return run_asyncio(logger)
+
+        spool = build_spool(logger)
+        ingestor = IntervalIngestor(logger, block_on_connect=spool is None)
+        service = MqttSqlService(logger, ingestor, spool=spool, checkpoint=build_checkpoint_store(logger))
 
         def _shutdown_handler(signum: int, frame: Any) -> None:
             logger.info("Received signal %s, shutting down", signum)
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 import csv
-import re
-from datetime import datetime
+from array import array
+from datetime import datetime, timedelta
 from pathlib import Path
+from typing import Any, Iterator
 
 
 REQUIRED_COLUMNS = {
@@ -17,46 +18,151 @@ REQUIRED_COLUMNS = {
     "KYZ_InvalidAlarm",
 }
 
+_EPOCH = datetime(1970, 1, 1)
 
-def _parse_datetime(date_value: str, time_value: str) -> datetime:
-    date_part = date_value.strip()
-    time_part = time_value.strip().split(".", 1)[0]
-    return datetime.strptime(f"{date_part} {time_part}", "%m/%d/%Y %H:%M:%S")
+# (midnight of the row's date, seconds since midnight, PulseCount, kWh, kW, Total_kWh, R17Exclude, KyzInvalidAlarm)
+Record = tuple[datetime, int, int, float, float, float, int, int]
 
+COLUMN_TYPECODES = {
+    "IntervalEnd": "q",  # naive epoch seconds
+    "PulseCount": "q",
+    "kWh": "d",
+    "kW": "d",
+    "Total_kWh": "d",
+    "R17Exclude": "b",
+    "KyzInvalidAlarm": "b",
+}
 
-def _parse_flag(value: str) -> int:
-    match = re.search(r"([01])\s*$", (value or "").strip())
-    if not match:
-        return 0
-    return int(match.group(1))
 
+def _parse_date(date_value: str) -> datetime:
+    month, day, year = date_value.strip().split("/")
+    return datetime(int(year), int(month), int(day))
+
+
+def _parse_seconds(time_value: str) -> int:
+    time_part = time_value.strip()
+    if len(time_part) >= 8 and time_part[2] == ":" and time_part[5] == ":" and (len(time_part) == 8 or time_part[8] == "."):
+        hour, minute, second = int(time_part[0:2]), int(time_part[3:5]), int(time_part[6:8])
+    else:
+        hour, minute, second = (int(part) for part in time_part.split(".", 1)[0].split(":"))
+    if not (0 <= hour < 24 and 0 <= minute < 60 and 0 <= second < 60):
+        raise ValueError(f"time data {time_value!r} does not match format '%H:%M:%S'")
+    return hour * 3600 + minute * 60 + second
 
-def parse_plc_csv(path: Path, interval_minutes: int = 15) -> list[dict]:
-    del interval_minutes  # reserved for future validation against counter cadence
 
+def _parse_flag(value: str | None) -> int:
+    # PLC flags look like "ON - 1" / "OFF - 0": only a trailing 0/1 counts.
+    return 1 if (value or "").rstrip().endswith("1") else 0
+
+
+def _records(path: Path) -> Iterator[Record]:
+    """Rows in file order, one at a time; header positions are resolved once and dates parsed once per day."""
     with path.open("r", encoding="utf-8-sig", newline="") as handle:
-        reader = csv.DictReader(handle)
-        if reader.fieldnames is None:
+        reader = csv.reader(handle, skipinitialspace=True)
+        header = next(reader, None)
+        if header is None:
             raise ValueError(f"CSV has no header row: {path}")
 
-        normalized_headers = [header.strip() for header in reader.fieldnames]
-        missing_columns = REQUIRED_COLUMNS - set(normalized_headers)
+        positions = {name.strip(): index for index, name in enumerate(header)}
+        missing_columns = REQUIRED_COLUMNS - set(positions)
         if missing_columns:
             missing = ", ".join(sorted(missing_columns))
             raise ValueError(f"CSV missing required columns: {missing}")
 
-        deduped: dict[datetime, dict] = {}
-        for raw_row in reader:
-            row = {str(key).strip(): value for key, value in raw_row.items() if key is not None}
-            interval_end = _parse_datetime(row["Date"], row["Time"])
-            deduped[interval_end] = {
-                "IntervalEnd": interval_end,
-                "PulseCount": int(float(row["counter15min"].strip())),
-                "kWh": float(row["LastEnergyUsage"].strip()),
-                "kW": float(row["LastDemand"].strip()),
-                "Total_kWh": float(row["TotalEnergyUsed"].strip()),
-                "R17Exclude": _parse_flag(row.get("R17_Last_ExcludeDemand", "")),
-                "KyzInvalidAlarm": _parse_flag(row.get("KYZ_InvalidAlarm", "")),
-            }
+        date_i = positions["Date"]
+        time_i = positions["Time"]
+        pulse_i = positions["counter15min"]
+        kwh_i = positions["LastEnergyUsage"]
+        kw_i = positions["LastDemand"]
+        total_i = positions["TotalEnergyUsed"]
+        r17_i = positions["R17_Last_ExcludeDemand"]
+        invalid_i = positions["KYZ_InvalidAlarm"]
+        days: dict[str, datetime] = {}
+
+        for fields in reader:
+            if not fields:
+                continue
+            date_value = fields[date_i]
+            day = days.get(date_value)
+            if day is None:
+                day = days[date_value] = _parse_date(date_value)
+            yield (
+                day,
+                _parse_seconds(fields[time_i]),
+                int(float(fields[pulse_i])),
+                float(fields[kwh_i]),
+                float(fields[kw_i]),
+                float(fields[total_i]),
+                _parse_flag(fields[r17_i]),
+                _parse_flag(fields[invalid_i]),
+            )
+
+
+def iter_plc_csv(path: Path) -> Iterator[dict]:
+    """Rows as dicts in file order without de-duplication; memory stays flat for any file size."""
+    offsets: dict[int, timedelta] = {}
+    for day, seconds, pulse, kwh, kw, total, r17, invalid in _records(path):
+        offset = offsets.get(seconds)
+        if offset is None:
+            offset = offsets[seconds] = timedelta(seconds=seconds)
+        yield {
+            "IntervalEnd": day + offset,
+            "PulseCount": pulse,
+            "kWh": kwh,
+            "kW": kw,
+            "Total_kWh": total,
+            "R17Exclude": r17,
+            "KyzInvalidAlarm": invalid,
+        }
+
+
+def iter_plc_csv_columns(path: Path, chunk_rows: int = 65536, as_numpy: bool = False) -> Iterator[dict[str, Any]]:
+    """Chunks of typed column arrays (see ``COLUMN_TYPECODES``), in file order without de-duplication.
+
+    With ``as_numpy`` each chunk is wrapped as NumPy arrays without copying (``IntervalEnd`` as
+    ``datetime64[s]``); NumPy is only imported then and is not a dependency otherwise.
+    """
+    np = None
+    if as_numpy:
+        import numpy as np  # noqa: PLC0415
+
+    def new_chunk() -> dict[str, array]:
+        return {name: array(typecode) for name, typecode in COLUMN_TYPECODES.items()}
+
+    def emit(chunk: dict[str, array]) -> dict[str, Any]:
+        if np is None:
+            return chunk
+        columns = {name: np.frombuffer(values, dtype=values.typecode) for name, values in chunk.items()}
+        columns["IntervalEnd"] = columns["IntervalEnd"].view("datetime64[s]")
+        return columns
+
+    day_epochs: dict[datetime, int] = {}
+    chunk = new_chunk()
+    ends, pulses, kwhs, kws, totals, r17s, invalids = chunk.values()
+    for day, seconds, pulse, kwh, kw, total, r17, invalid in _records(path):
+        day_epoch = day_epochs.get(day)
+        if day_epoch is None:
+            day_epoch = day_epochs[day] = (day - _EPOCH).days * 86400
+        ends.append(day_epoch + seconds)
+        pulses.append(pulse)
+        kwhs.append(kwh)
+        kws.append(kw)
+        totals.append(total)
+        r17s.append(r17)
+        invalids.append(invalid)
+        if len(ends) >= chunk_rows:
+            yield emit(chunk)
+            chunk = new_chunk()
+            ends, pulses, kwhs, kws, totals, r17s, invalids = chunk.values()
+    if len(ends):
+        yield emit(chunk)
+
+
+def parse_plc_csv(path: Path, interval_minutes: int = 15) -> list[dict]:
+    """All rows, de-duplicated on IntervalEnd (last row in the file wins) and sorted."""
+    del interval_minutes  # reserved for future validation against counter cadence
 
+    deduped: dict[datetime, dict] = {}
+    for row in iter_plc_csv(path):
+        deduped[row["IntervalEnd"]] = row
     return [deduped[key] for key in sorted(deduped)]
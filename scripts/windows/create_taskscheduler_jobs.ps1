@@ -67,7 +67,8 @@ $dashboardExe = Join-Path $RepoRoot "dashboard\api\.venv\Scripts\python.exe"
 Register-OrReplaceTask -Name "KYZ-Ingestor" -Exe $ingestorExe -Arguments "main.py" -Trigger (New-ScheduledTaskTrigger -AtStartup)
 Register-OrReplaceTask -Name "KYZ-Dashboard-API" -Exe $dashboardExe -Arguments "-m dashboard.api.run_server" -Trigger (New-ScheduledTaskTrigger -AtStartup)
 Register-OrReplaceTask -Name "KYZ-Live15s-Retention" -Exe $ingestorExe -Arguments "scripts\windows\purge_live15s.py --retention-days 60" -Trigger (New-ScheduledTaskTrigger -Daily -At 2:05AM)
-Register-OrReplaceTask -Name "KYZ-MonthlyDemand-Refresh" -Exe $ingestorExe -Arguments "scripts\windows\refresh_monthly_demand.py" -Trigger (New-ScheduledTaskTrigger -Daily -At 2:10AM)
+Register-OrReplaceTask -Name "KYZ-MonthlyDemand-Refresh" -Exe $ingestorExe -Arguments "scripts\windows\refresh_monthly_demand.py --incremental" -Trigger (New-ScheduledTaskTrigger -Once -At (Get-Date) -RepetitionInterval (New-TimeSpan -Minutes 15))
+Register-OrReplaceTask -Name "KYZ-Rollup-CatchUp" -Exe $ingestorExe -Arguments "scripts\windows\rollup_catchup.py --days 3" -Trigger (New-ScheduledTaskTrigger -Daily -At 2:15AM)
 Register-OrReplaceTask -Name "KYZ-PLC-CSV-Sync" -Exe $ingestorExe -Arguments "scripts\windows\plc_csv_sync.py" -Trigger (New-ScheduledTaskTrigger -Once -At (Get-Date) -RepetitionInterval (New-TimeSpan -Hours 1))
 
 if ($RunNow) {
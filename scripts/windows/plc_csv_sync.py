@@ -3,8 +3,11 @@ import logging
 import os
 import shutil
 import sys
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
+from itertools import islice
 from pathlib import Path
+from typing import Iterable
 
 import pyodbc
 from dotenv import load_dotenv
@@ -16,7 +19,7 @@ REPO_ROOT = Path(__file__).resolve().parents[2]
 if str(REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(REPO_ROOT))
 
-from plc_csv import parse_plc_csv  # noqa: E402
+from plc_csv import iter_plc_csv  # noqa: E402
 
 
 class ConfigError(Exception):
@@ -105,49 +108,148 @@ def get_log_row(cursor: pyodbc.Cursor, file_path: str) -> tuple | None:
     return cursor.fetchone()
 
 
-def upsert_intervals(cursor: pyodbc.Cursor, rows: list[dict]) -> None:
-    if not rows:
-        return
-
-    sql = """
-    MERGE dbo.KYZ_Interval WITH (HOLDLOCK) AS target
-    USING (
-        SELECT
-            ? AS IntervalEnd,
-            ? AS PulseCount,
-            ? AS kWh,
-            ? AS kW,
-            ? AS Total_kWh,
-            ? AS R17Exclude,
-            ? AS KyzInvalidAlarm
-    ) AS source
-    ON target.IntervalEnd = source.IntervalEnd
-    WHEN MATCHED THEN
-        UPDATE SET
-            PulseCount = source.PulseCount,
-            kWh = source.kWh,
-            kW = source.kW,
-            Total_kWh = source.Total_kWh,
-            R17Exclude = source.R17Exclude,
-            KyzInvalidAlarm = source.KyzInvalidAlarm
-    WHEN NOT MATCHED THEN
-        INSERT (IntervalEnd, PulseCount, kWh, kW, Total_kWh, R17Exclude, KyzInvalidAlarm)
-        VALUES (source.IntervalEnd, source.PulseCount, source.kWh, source.kW, source.Total_kWh, source.R17Exclude, source.KyzInvalidAlarm);
+# Session temp table the parsed CSV is streamed into, in file order, before one set-based MERGE.
+# Created with a parameterless execute so it lives at session scope (not inside sp_prepexec); a
+# rollback drops it, hence the existence check on every file.
+STAGE_PREPARE_SQL = """
+IF OBJECT_ID('tempdb..#KYZ_PlcCsvStage') IS NULL
+    CREATE TABLE #KYZ_PlcCsvStage (
+        Seq              INT          IDENTITY(1,1) NOT NULL PRIMARY KEY,
+        IntervalEnd      DATETIME2(0) NOT NULL,
+        PulseCount       INT          NOT NULL,
+        kWh              FLOAT        NOT NULL,
+        kW               FLOAT        NOT NULL,
+        Total_kWh        FLOAT        NULL,
+        R17Exclude       BIT          NOT NULL,
+        KyzInvalidAlarm  BIT          NOT NULL
+    );
+TRUNCATE TABLE #KYZ_PlcCsvStage;
+"""
+
+STAGE_INSERT_SQL = """
+INSERT INTO #KYZ_PlcCsvStage (IntervalEnd, PulseCount, kWh, kW, Total_kWh, R17Exclude, KyzInvalidAlarm)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Explicit parameter types so fast_executemany never has to describe the temp table.
+STAGE_INPUT_SIZES = [
+    (pyodbc.SQL_TYPE_TIMESTAMP, 19, 0),
+    (pyodbc.SQL_INTEGER, 0, 0),
+    (pyodbc.SQL_DOUBLE, 0, 0),
+    (pyodbc.SQL_DOUBLE, 0, 0),
+    (pyodbc.SQL_DOUBLE, 0, 0),
+    (pyodbc.SQL_BIT, 0, 0),
+    (pyodbc.SQL_BIT, 0, 0),
+]
+
+# Duplicate IntervalEnds resolve to the last row in the file, as parse_plc_csv does. Rows identical to
+# what is already stored are left alone, so re-importing history rewrites nothing and only genuinely
+# changed intervals reach rollups and the monthly-demand watermark.
+STAGE_MERGE_SQL = """
+SET NOCOUNT ON;
+DECLARE @changes TABLE (Action NVARCHAR(10) NOT NULL, IntervalEnd DATETIME2(0) NOT NULL);
+
+MERGE dbo.KYZ_Interval WITH (HOLDLOCK) AS target
+USING (
+    SELECT
+        IntervalEnd,
+        PulseCount,
+        CAST(kWh AS DECIMAL(18,6)) AS kWh,
+        CAST(kW AS DECIMAL(18,6)) AS kW,
+        CAST(Total_kWh AS DECIMAL(18,6)) AS Total_kWh,
+        R17Exclude,
+        KyzInvalidAlarm
+    FROM (
+        SELECT *, ROW_NUMBER() OVER (PARTITION BY IntervalEnd ORDER BY Seq DESC) AS Pick
+        FROM #KYZ_PlcCsvStage
+    ) AS staged
+    WHERE Pick = 1
+) AS source
+ON target.IntervalEnd = source.IntervalEnd
+WHEN MATCHED AND EXISTS (
+    SELECT source.PulseCount, source.kWh, source.kW, source.Total_kWh, source.R17Exclude, source.KyzInvalidAlarm
+    EXCEPT
+    SELECT target.PulseCount, target.kWh, target.kW, target.Total_kWh, target.R17Exclude, target.KyzInvalidAlarm
+) THEN
+    UPDATE SET
+        PulseCount = source.PulseCount,
+        kWh = source.kWh,
+        kW = source.kW,
+        Total_kWh = source.Total_kWh,
+        R17Exclude = source.R17Exclude,
+        KyzInvalidAlarm = source.KyzInvalidAlarm
+WHEN NOT MATCHED THEN
+    INSERT (IntervalEnd, PulseCount, kWh, kW, Total_kWh, R17Exclude, KyzInvalidAlarm)
+    VALUES (source.IntervalEnd, source.PulseCount, source.kWh, source.kW, source.Total_kWh, source.R17Exclude, source.KyzInvalidAlarm)
+OUTPUT $action, inserted.IntervalEnd INTO @changes (Action, IntervalEnd);
+
+SELECT
+    (SELECT COUNT_BIG(DISTINCT IntervalEnd) FROM #KYZ_PlcCsvStage) AS staged,
+    (SELECT MIN(IntervalEnd) FROM #KYZ_PlcCsvStage) AS interval_min,
+    (SELECT MAX(IntervalEnd) FROM #KYZ_PlcCsvStage) AS interval_max,
+    COUNT_BIG(CASE WHEN Action = 'INSERT' THEN 1 END) AS inserted,
+    COUNT_BIG(CASE WHEN Action = 'UPDATE' THEN 1 END) AS updated,
+    MIN(IntervalEnd) AS changed_min,
+    MAX(IntervalEnd) AS changed_max
+FROM @changes;
+"""
+
+
+@dataclass
+class MergeResult:
+    staged: int = 0
+    inserted: int = 0
+    updated: int = 0
+    interval_min: datetime | None = None
+    interval_max: datetime | None = None
+    changed_min: datetime | None = None
+    changed_max: datetime | None = None
+
+    @property
+    def unchanged(self) -> int:
+        return self.staged - self.inserted - self.updated
+
+
+def upsert_intervals(cursor: pyodbc.Cursor, rows: Iterable[dict], batch_size: int = 10000) -> MergeResult:
+    """Stage ``rows`` in ``batch_size`` array-bound inserts, then apply them with one MERGE.
+
+    ``rows`` may be a generator; at most one batch is held in memory. ``staged`` counts distinct intervals.
     """
-    params = [
-        (
-            row["IntervalEnd"],
-            row["PulseCount"],
-            row["kWh"],
-            row["kW"],
-            row["Total_kWh"],
-            row["R17Exclude"],
-            row["KyzInvalidAlarm"],
-        )
-        for row in rows
-    ]
+    iterator = iter(rows)
+    batch = list(islice(iterator, batch_size))
+    if not batch:
+        return MergeResult()
+
+    cursor.execute(STAGE_PREPARE_SQL)
     cursor.fast_executemany = True
-    cursor.executemany(sql, params)
+    while batch:
+        params = [
+            (
+                row["IntervalEnd"],
+                row["PulseCount"],
+                row["kWh"],
+                row["kW"],
+                row["Total_kWh"],
+                row["R17Exclude"],
+                row["KyzInvalidAlarm"],
+            )
+            for row in batch
+        ]
+        cursor.setinputsizes(STAGE_INPUT_SIZES)
+        cursor.executemany(STAGE_INSERT_SQL, params)
+        batch = list(islice(iterator, batch_size))
+
+    cursor.execute(STAGE_MERGE_SQL)
+    result = cursor.fetchone()
+    return MergeResult(
+        staged=int(result.staged or 0),
+        inserted=int(result.inserted or 0),
+        updated=int(result.updated or 0),
+        interval_min=result.interval_min,
+        interval_max=result.interval_max,
+        changed_min=result.changed_min,
+        changed_max=result.changed_max,
+    )
 
 
 def upsert_ingest_log(
@@ -219,6 +321,9 @@ def main() -> int:
         glob_pattern = os.getenv("PLC_CSV_GLOB") or "*.csv"
         min_age_seconds = get_env_int("PLC_CSV_MIN_AGE_SECONDS", 10)
         move_to_archive = get_env_bool("PLC_CSV_MOVE_TO_ARCHIVE", False)
+        update_rollups = get_env_bool("SQL_UPDATE_ROLLUPS", False)
+        mark_monthly_demand = get_env_bool("SQL_MARK_MONTHLY_DEMAND", False)
+        stage_batch_rows = get_env_int("PLC_CSV_STAGE_BATCH_ROWS", 10000)
 
         archive_dir_raw = os.getenv("PLC_CSV_ARCHIVE_DIR")
         archive_dir = Path(archive_dir_raw) if archive_dir_raw else (drop_dir / "archive")
@@ -228,6 +333,9 @@ def main() -> int:
 
         with pyodbc.connect(get_sql_connection_string(), autocommit=False) as conn:
             cursor = conn.cursor()
+            # PLC CSV exports are the main utility meter. Once sql/011_multi_meter.sql is applied this
+            # scopes the MERGE to MeterId 'main' (the column default for its inserts); harmless before that.
+            cursor.execute("EXEC sys.sp_set_session_context @key = N'kyz_meter_id', @value = N'main'")
             processed = 0
             skipped = 0
             errored = 0
@@ -257,12 +365,23 @@ def main() -> int:
                         continue
 
                 try:
-                    rows = parse_plc_csv(file_path)
-
-                    upsert_intervals(cursor, rows)
-
-                    interval_min = rows[0]["IntervalEnd"] if rows else None
-                    interval_max = rows[-1]["IntervalEnd"] if rows else None
+                    merged = upsert_intervals(cursor, iter_plc_csv(file_path), batch_size=stage_batch_rows)
+
+                    interval_min = merged.interval_min
+                    interval_max = merged.interval_max
+                    if update_rollups and merged.changed_min is not None:
+                        # Overwritten intervals change kW/kWh, so refresh their rollup buckets in the same commit.
+                        cursor.execute(
+                            "EXEC dbo.usp_KYZ_ApplyRollups @FromEnd = ?, @ToEnd = ?",
+                            merged.changed_min,
+                            merged.changed_max,
+                        )
+                    if mark_monthly_demand and merged.changed_min is not None:
+                        # CSV backfills often rewrite older months; the next incremental refresh starts there.
+                        cursor.execute(
+                            "EXEC dbo.usp_KYZ_MarkMonthlyDemandDirty @FromEnd = ?",
+                            merged.changed_min,
+                        )
 
                     upsert_ingest_log(
                         cursor,
@@ -271,7 +390,7 @@ def main() -> int:
                         write_time_utc=mtime_utc,
                         sha256=sha256,
                         status="ok",
-                        row_count=len(rows),
+                        row_count=merged.staged,
                         interval_min=interval_min,
                         interval_max=interval_max,
                         error_message=None,
@@ -280,9 +399,12 @@ def main() -> int:
                     conn.commit()
                     processed += 1
                     logger.info(
-                        "Processed %s rows=%s interval_min=%s interval_max=%s",
+                        "Processed %s rows=%s inserted=%s updated=%s unchanged=%s interval_min=%s interval_max=%s",
                         file_path,
-                        len(rows),
+                        merged.staged,
+                        merged.inserted,
+                        merged.updated,
+                        merged.unchanged,
                         interval_min,
                         interval_max,
                     )
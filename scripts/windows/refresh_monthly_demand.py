@@ -1,5 +1,7 @@
+import argparse
 import logging
 import os
+from datetime import date, datetime
 from pathlib import Path
 
 import pyodbc
@@ -49,19 +51,46 @@ def get_sql_connection_string() -> str:
     )
 
 
+def parse_month(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+def build_refresh_call(incremental: bool, from_month: date | None) -> tuple[str, tuple]:
+    if from_month is not None:
+        return "EXEC dbo.usp_KYZ_Refresh_MonthlyDemand @FromMonth = ?;", (from_month,)
+    if incremental:
+        return "EXEC dbo.usp_KYZ_Refresh_MonthlyDemand @Incremental = 1;", ()
+    return "EXEC dbo.usp_KYZ_Refresh_MonthlyDemand;", ()
+
+
 def main() -> int:
+    parser = argparse.ArgumentParser(description="Refresh dbo.KYZ_MonthlyDemand (sql/007_monthly_demand_billed.sql)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Recompute from the earliest changed month (change watermark) or the latest snapshot month",
+    )
+    mode.add_argument("--from-month", type=parse_month, help="Recompute from this month onward (YYYY-MM)")
+    mode.add_argument("--full", action="store_true", help="Recompute every month (default)")
+    args = parser.parse_args()
+
     repo_root = get_repo_root()
     logger = configure_logging(repo_root)
     load_dotenv(repo_root / ".env")
 
+    sql, params = build_refresh_call(args.incremental, args.from_month)
     try:
         with pyodbc.connect(get_sql_connection_string(), autocommit=True) as conn:
-            conn.execute("EXEC dbo.usp_KYZ_Refresh_MonthlyDemand;")
+            cursor = conn.execute(sql, *params)
+            # Procs from before the incremental mode return no result set.
+            result = cursor.fetchone() if cursor.description else None
     except (ConfigError, pyodbc.Error) as exc:
         logger.exception("Monthly demand refresh failed: %s", exc)
         return 1
 
-    logger.info("Monthly demand refresh completed.")
+    from_month, months = (result[0], result[1]) if result else (None, None)
+    logger.info("Monthly demand refresh completed (from=%s months=%s).", from_month or "all", months)
     return 0
 
 
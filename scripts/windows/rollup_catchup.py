@@ -0,0 +1,110 @@
+import argparse
+import logging
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pyodbc
+from dotenv import load_dotenv
+
+
+class ConfigError(Exception):
+    """Raised when required configuration is missing."""
+
+
+def get_repo_root() -> Path:
+    return Path(__file__).resolve().parents[2]
+
+
+def configure_logging(repo_root: Path) -> logging.Logger:
+    logs_dir = repo_root / "logs"
+    logs_dir.mkdir(parents=True, exist_ok=True)
+
+    logger = logging.getLogger("rollup_catchup")
+    logger.setLevel(logging.INFO)
+    logger.handlers.clear()
+
+    file_handler = logging.FileHandler(logs_dir / "rollup_catchup.log", encoding="utf-8")
+    formatter = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
+    file_handler.setFormatter(formatter)
+    logger.addHandler(file_handler)
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
+    logger.addHandler(console_handler)
+    return logger
+
+
+def get_required_env(name: str) -> str:
+    value = os.getenv(name)
+    if not value:
+        raise ConfigError(f"Missing required environment variable: {name}")
+    return value
+
+
+def get_sql_connection_string() -> str:
+    return (
+        "DRIVER={ODBC Driver 18 for SQL Server};"
+        f"SERVER={get_required_env('SQL_SERVER')};"
+        f"DATABASE={get_required_env('SQL_DATABASE')};"
+        f"UID={get_required_env('SQL_USERNAME')};"
+        f"PWD={get_required_env('SQL_PASSWORD')};"
+        "Encrypt=yes;"
+        "TrustServerCertificate=no;"
+        "Connection Timeout=15;"
+    )
+
+
+def month_chunks(start: datetime, end: datetime) -> list[tuple[datetime, datetime]]:
+    """Split [start, end] at calendar month boundaries so each proc call stays one month wide."""
+    chunks = []
+    cursor = start
+    while cursor <= end:
+        next_month = (cursor.replace(day=1, hour=0, minute=0, second=0, microsecond=0) + timedelta(days=32)).replace(day=1)
+        chunk_end = min(end, next_month - timedelta(seconds=1))
+        chunks.append((cursor, chunk_end))
+        cursor = next_month
+    return chunks
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Rebuild KYZ rollup tables (sql/012_rollups.sql) from dbo.KYZ_Interval")
+    parser.add_argument("--days", type=int, default=3, help="Recompute buckets for the last N days (default: 3)")
+    parser.add_argument("--full", action="store_true", help="Recompute all history (initial backfill)")
+    args = parser.parse_args()
+
+    repo_root = get_repo_root()
+    logger = configure_logging(repo_root)
+    load_dotenv(repo_root / ".env")
+
+    try:
+        with pyodbc.connect(get_sql_connection_string(), autocommit=True) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT OBJECT_ID('dbo.usp_KYZ_ApplyRollups')")
+            if cursor.fetchone()[0] is None:
+                logger.info("dbo.usp_KYZ_ApplyRollups not found; apply sql/012_rollups.sql to enable rollups.")
+                return 0
+            end = datetime.now()
+            if args.full:
+                cursor.execute("SELECT MIN(IntervalEnd) FROM dbo.KYZ_Interval")
+                first = cursor.fetchone()[0]
+                if first is None:
+                    logger.info("No intervals to roll up.")
+                    return 0
+                start = first
+            else:
+                start = datetime.combine((end - timedelta(days=max(1, args.days))).date(), datetime.min.time())
+
+            for chunk_start, chunk_end in month_chunks(start, end):
+                cursor.execute("EXEC dbo.usp_KYZ_ApplyRollups @FromEnd = ?, @ToEnd = ?", chunk_start, chunk_end)
+                logger.info("Rolled up intervals %s -> %s", chunk_start, chunk_end)
+    except (ConfigError, pyodbc.Error) as exc:
+        logger.exception("Rollup catch-up failed: %s", exc)
+        return 1
+
+    logger.info("Rollup catch-up completed.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
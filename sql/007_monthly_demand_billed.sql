@@ -4,12 +4,16 @@
    Creates/updates:
      - dbo.vw_KYZ_MonthlyBillingDemandEstimate  (raw: top3 avg + peak per month)
      - dbo.KYZ_MonthlyDemand                   (snapshot table; keep forever)
-     - dbo.usp_KYZ_Refresh_MonthlyDemand       (sequential ratchet calc; upserts)
+     - dbo.KYZ_MonthlyDemandWatermark          (earliest changed month since last refresh)
+     - dbo.usp_KYZ_MarkMonthlyDemandDirty      (writers lower the watermark)
+     - dbo.usp_KYZ_Refresh_MonthlyDemand       (sequential ratchet calc; upserts; full or incremental)
      - dbo.vw_KYZ_MonthlyBillingDemandBilled   (selects from snapshot)
      - dbo.v_KYZ_MonthlyDemand_Latest          (latest snapshot row)
 
    Notes:
      - Excludes invalid intervals and R17Exclude=1 for demand calcs.
+     - The snapshot bills the utility meter only (MeterId 'main', the PLC CSV / default
+       meter); the raw view reports every meter separately.
      - Billed_kW computed per Rate SL:
          billed = max(top3_avg_kW, 0.60 * max(billed over prior 11 months), 50)
    ========================================================= */
@@ -17,6 +21,13 @@
 SET NOCOUNT ON;
 GO
 
+-- MeterId normally arrives with sql/011_multi_meter.sql; added here too (same definition, so 011
+-- skips it) because this file is applied first on a fresh database.
+IF COL_LENGTH('dbo.KYZ_Interval', 'MeterId') IS NULL
+    ALTER TABLE dbo.KYZ_Interval
+    ADD MeterId NVARCHAR(32) NOT NULL CONSTRAINT DF_KYZ_Interval_MeterId DEFAULT (N'main');
+GO
+
 --------------------------------------------------------------------------------
 -- 0) If something weird exists with the table name, clear it
 --------------------------------------------------------------------------------
@@ -108,12 +119,13 @@ END
 GO
 
 --------------------------------------------------------------------------------
--- 4) Raw monthly view: top3 avg + peak per calendar month
+-- 4) Raw monthly view: top3 avg + peak per meter and calendar month
 --------------------------------------------------------------------------------
 CREATE OR ALTER VIEW dbo.vw_KYZ_MonthlyBillingDemandEstimate
 AS
 WITH cleaned AS (
     SELECT
+        MeterId,
         DATEFROMPARTS(YEAR(IntervalEnd), MONTH(IntervalEnd), 1) AS month_start,
         CAST(kW AS float) AS kW
     FROM dbo.KYZ_Interval
@@ -123,27 +135,105 @@ WITH cleaned AS (
 ),
 ranked AS (
     SELECT
+        MeterId,
         month_start,
         kW,
-        ROW_NUMBER() OVER (PARTITION BY month_start ORDER BY kW DESC) AS rn
+        ROW_NUMBER() OVER (PARTITION BY MeterId, month_start ORDER BY kW DESC) AS rn
     FROM cleaned
 )
 SELECT
+    MeterId,
     month_start,
     AVG(CASE WHEN rn <= 3 THEN kW END) AS top3_avg_kW,
     MAX(kW) AS peak_kW
 FROM ranked
-GROUP BY month_start;
+GROUP BY MeterId, month_start;
+GO
+
+--------------------------------------------------------------------------------
+-- 5) Change watermark: earliest month whose intervals changed since the last refresh.
+--    Writers lower it via usp_KYZ_MarkMonthlyDemandDirty; every mark bumps MarkVersion
+--    so a refresh only clears marks it has actually seen.
+--------------------------------------------------------------------------------
+IF OBJECT_ID('dbo.KYZ_MonthlyDemandWatermark', 'U') IS NULL
+BEGIN
+    CREATE TABLE dbo.KYZ_MonthlyDemandWatermark
+    (
+        Id              tinyint      NOT NULL PRIMARY KEY CLUSTERED CHECK (Id = 1),
+        DirtyFromMonth  date         NULL,
+        MarkVersion     bigint       NOT NULL DEFAULT 0,
+        MarkedAtUtc     datetime2(3) NULL,
+        RefreshedAtUtc  datetime2(3) NULL
+    );
+END
+GO
+
+IF NOT EXISTS (SELECT 1 FROM dbo.KYZ_MonthlyDemandWatermark WHERE Id = 1)
+BEGIN
+    INSERT INTO dbo.KYZ_MonthlyDemandWatermark (Id, DirtyFromMonth)
+    VALUES (1, (SELECT MIN(month_start) FROM dbo.KYZ_MonthlyDemand));
+END
+GO
+
+CREATE OR ALTER PROCEDURE dbo.usp_KYZ_MarkMonthlyDemandDirty
+    @FromEnd datetime2(0)
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    DECLARE @m date = DATEFROMPARTS(YEAR(@FromEnd), MONTH(@FromEnd), 1);
+
+    UPDATE dbo.KYZ_MonthlyDemandWatermark
+    SET DirtyFromMonth = CASE WHEN DirtyFromMonth IS NULL OR DirtyFromMonth > @m THEN @m ELSE DirtyFromMonth END,
+        MarkVersion = MarkVersion + 1,
+        MarkedAtUtc = SYSUTCDATETIME()
+    WHERE Id = 1;
+END;
 GO
 
 --------------------------------------------------------------------------------
--- 5) Refresh proc: sequentially computes billed demand (ratchet is recursive)
+-- 6) Refresh proc: sequentially computes billed demand (ratchet is recursive)
+--
+--    EXEC dbo.usp_KYZ_Refresh_MonthlyDemand;                       -- full rebuild
+--    EXEC dbo.usp_KYZ_Refresh_MonthlyDemand @Incremental = 1;      -- from the watermark
+--    EXEC dbo.usp_KYZ_Refresh_MonthlyDemand @FromMonth = '2025-06-01';
+--
+--    Months before the start month keep their snapshot rows and seed the ratchet, so
+--    an incremental run only scans intervals from the start month onward. Incremental
+--    runs always include the latest snapshot month, so ordinary live ingestion needs
+--    no marking; the watermark covers backfills and corrections to older months.
 --------------------------------------------------------------------------------
 CREATE OR ALTER PROCEDURE dbo.usp_KYZ_Refresh_MonthlyDemand
+    @FromMonth date = NULL,
+    @Incremental bit = 0
 AS
 BEGIN
     SET NOCOUNT ON;
 
+    DECLARE
+        -- The snapshot is the utility bill; sub-meter intervals must not feed it.
+        @MeterId nvarchar(32) = N'main',
+        @from date = NULL,
+        @mark_version bigint = NULL,
+        @dirty_from date = NULL,
+        @latest_month date = NULL;
+
+    SELECT @mark_version = MarkVersion, @dirty_from = DirtyFromMonth
+    FROM dbo.KYZ_MonthlyDemandWatermark
+    WHERE Id = 1;
+
+    IF @FromMonth IS NOT NULL
+        SET @from = DATEFROMPARTS(YEAR(@FromMonth), MONTH(@FromMonth), 1);
+    ELSE IF @Incremental = 1
+    BEGIN
+        SELECT @latest_month = MAX(month_start) FROM dbo.KYZ_MonthlyDemand;
+        -- An empty snapshot leaves @from NULL, i.e. a full rebuild.
+        IF @latest_month IS NOT NULL
+            SET @from = CASE WHEN @dirty_from < @latest_month THEN @dirty_from ELSE @latest_month END;
+    END
+
+    DECLARE @from_end datetime2(0) = CAST(@from AS datetime2(0));
+
     DECLARE @months TABLE
     (
         month_start date PRIMARY KEY,
@@ -152,27 +242,37 @@ BEGIN
         Energy_kWh  float NULL
     );
 
-    ;WITH energy AS (
+    -- One pass over the affected intervals; same figures as vw_KYZ_MonthlyBillingDemandEstimate
+    -- plus energy (ORDER BY kW DESC sorts NULL kW last, so they never displace a top-3 value).
+    ;WITH cleaned AS (
         SELECT
             DATEFROMPARTS(YEAR(IntervalEnd), MONTH(IntervalEnd), 1) AS month_start,
-            SUM(CAST(kWh AS float)) AS Energy_kWh
+            CAST(kW AS float) AS kW,
+            CAST(kWh AS float) AS kWh
         FROM dbo.KYZ_Interval
-        WHERE ISNULL(KyzInvalidAlarm, 0) = 0
+        WHERE (@from_end IS NULL OR IntervalEnd >= @from_end)
+          AND MeterId = @MeterId
+          AND ISNULL(KyzInvalidAlarm, 0) = 0
           AND ISNULL(R17Exclude, 0) = 0
-        GROUP BY DATEFROMPARTS(YEAR(IntervalEnd), MONTH(IntervalEnd), 1)
+    ),
+    ranked AS (
+        SELECT
+            month_start,
+            kW,
+            kWh,
+            ROW_NUMBER() OVER (PARTITION BY month_start ORDER BY kW DESC) AS rn
+        FROM cleaned
     )
     INSERT INTO @months (month_start, top3_avg_kW, peak_kW, Energy_kWh)
     SELECT
-        d.month_start,
-        d.top3_avg_kW,
-        d.peak_kW,
-        e.Energy_kWh
-    FROM dbo.vw_KYZ_MonthlyBillingDemandEstimate d
-    LEFT JOIN energy e
-        ON e.month_start = d.month_start;
-
-    IF NOT EXISTS (SELECT 1 FROM @months)
-        RETURN;
+        month_start,
+        AVG(CASE WHEN rn <= 3 THEN kW END),
+        MAX(kW),
+        SUM(kWh)
+    FROM ranked
+    GROUP BY month_start
+    HAVING COUNT(kW) > 0
+    OPTION (RECOMPILE);
 
     DECLARE
         @m date,
@@ -181,7 +281,8 @@ BEGIN
         @kwh float,
         @prev11_max float,
         @ratchet float,
-        @billed float;
+        @billed float,
+        @refreshed int = 0;
 
     DECLARE cur CURSOR LOCAL FAST_FORWARD FOR
         SELECT month_start FROM @months ORDER BY month_start;
@@ -244,16 +345,28 @@ BEGIN
                 SYSUTCDATETIME()
             );
 
+        SET @refreshed += 1;
         FETCH NEXT FROM cur INTO @m;
     END
 
     CLOSE cur;
     DEALLOCATE cur;
+
+    -- Clear the watermark only if no writer marked a change while we were recomputing
+    -- and the mark falls inside the range we just rebuilt.
+    UPDATE dbo.KYZ_MonthlyDemandWatermark
+    SET DirtyFromMonth = NULL,
+        RefreshedAtUtc = SYSUTCDATETIME()
+    WHERE Id = 1
+      AND MarkVersion = @mark_version
+      AND (@from IS NULL OR DirtyFromMonth IS NULL OR DirtyFromMonth >= @from);
+
+    SELECT @from AS FromMonth, @refreshed AS MonthsRefreshed;
 END;
 GO
 
 --------------------------------------------------------------------------------
--- 6) Billed view: reads from snapshot (audit-friendly)
+-- 7) Billed view: reads from snapshot (audit-friendly)
 --------------------------------------------------------------------------------
 CREATE OR ALTER VIEW dbo.vw_KYZ_MonthlyBillingDemandBilled
 AS
@@ -270,7 +383,7 @@ FROM dbo.KYZ_MonthlyDemand;
 GO
 
 --------------------------------------------------------------------------------
--- 7) Latest snapshot row
+-- 8) Latest snapshot row
 --------------------------------------------------------------------------------
 CREATE OR ALTER VIEW dbo.v_KYZ_MonthlyDemand_Latest
 AS
@@ -288,7 +401,7 @@ ORDER BY month_start DESC;
 GO
 
 --------------------------------------------------------------------------------
--- 8) Grants (only if principals exist)
+-- 9) Grants (only if principals exist)
 --------------------------------------------------------------------------------
 IF DATABASE_PRINCIPAL_ID('kyz_dashboard') IS NOT NULL
 BEGIN
@@ -301,5 +414,6 @@ END
 IF DATABASE_PRINCIPAL_ID('kyz_ingestor') IS NOT NULL
 BEGIN
     GRANT EXECUTE ON dbo.usp_KYZ_Refresh_MonthlyDemand TO kyz_ingestor;
+    GRANT EXECUTE ON dbo.usp_KYZ_MarkMonthlyDemandDirty TO kyz_ingestor;
 END
 GO
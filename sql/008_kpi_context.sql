@@ -1,77 +1,113 @@
 /*
-  KPI context baseline procedure for KYZ Energy Monitor.
-  NOTE: The FastAPI /api/summary endpoint currently computes these values inline.
-  This proc is intended for future optimization / change control standardization.
+  KPI context procedure for KYZ Energy Monitor.
+  Backs the FastAPI /api/summary endpoint: every interval/live KPI the kiosk shows comes
+  back as one row from one round trip. Valid intervals for the last 11 months are
+  aggregated once per day and then folded into the today / month-to-date /
+  yesterday-to-time / 30-day / 11-month figures, instead of scanning dbo.KYZ_Interval
+  once per KPI. Column names are read by name in dashboard/api/app.py (SUMMARY_KPI_COLUMNS).
+  Re-run after changes; CREATE OR ALTER keeps existing grants.
+  Every read is scoped to @MeterId (the dashboard passes DASHBOARD_METER_ID, default 'main'),
+  so sub-meters are never summed into the utility meter's KPIs.
 */
+
+-- MeterId normally arrives with sql/011_multi_meter.sql; added here too (same definition, so 011
+-- skips it) because this file is applied first on a fresh database.
+IF COL_LENGTH('dbo.KYZ_Interval', 'MeterId') IS NULL
+    ALTER TABLE dbo.KYZ_Interval
+    ADD MeterId NVARCHAR(32) NOT NULL CONSTRAINT DF_KYZ_Interval_MeterId DEFAULT (N'main');
+GO
+
+IF COL_LENGTH('dbo.KYZ_Live15s', 'MeterId') IS NULL
+    ALTER TABLE dbo.KYZ_Live15s
+    ADD MeterId NVARCHAR(32) NOT NULL CONSTRAINT DF_KYZ_Live15s_MeterId DEFAULT (N'main');
+GO
+
 CREATE OR ALTER PROCEDURE dbo.usp_KYZ_KpiContext
+    @MeterId nvarchar(32) = N'main'
 AS
 BEGIN
   SET NOCOUNT ON;
 
-  DECLARE @today date = CAST(GETDATE() AS date);
+  DECLARE @now datetime = GETDATE();
+  DECLARE @today date = CAST(@now AS date);
+  DECLARE @month_start date = DATEFROMPARTS(YEAR(@now), MONTH(@now), 1);
   DECLARE @yesterday_start datetime = DATEADD(day, -1, @today);
-  DECLARE @seconds_since_midnight int = DATEDIFF(second, @today, GETDATE());
+  DECLARE @seconds_since_midnight int = DATEDIFF(second, @today, @now);
   DECLARE @yesterday_end datetime = DATEADD(second, @seconds_since_midnight, @yesterday_start);
+  DECLARE @daily_start date = DATEADD(day, -30, @today);
+  -- Earliest of all KPI windows (11 months back always precedes the month start and 30 days back).
+  DECLARE @window_start date = DATEADD(month, -11, @today);
 
-  ;WITH latest_two AS (
-      SELECT TOP (2)
-          IntervalEnd,
-          CAST(kW AS float) AS kW,
-          ROW_NUMBER() OVER (ORDER BY IntervalEnd DESC) AS rn
-      FROM dbo.KYZ_Interval
-      WHERE kW IS NOT NULL
-        AND ISNULL(KyzInvalidAlarm, 0) = 0
-      ORDER BY IntervalEnd DESC
-  ),
-  pivot_latest AS (
-      SELECT
-          MAX(CASE WHEN rn = 1 THEN kW END) AS current_kw,
-          MAX(CASE WHEN rn = 2 THEN kW END) AS prev_kw
-      FROM latest_two
-  ),
-  today_agg AS (
-      SELECT COALESCE(SUM(CAST(kWh AS float)), 0.0) AS today_kwh
-      FROM dbo.KYZ_Interval
-      WHERE CAST(IntervalEnd AS date) = @today
-        AND ISNULL(KyzInvalidAlarm, 0) = 0
-  ),
-  yday_to_time AS (
-      SELECT COALESCE(SUM(CAST(kWh AS float)), 0.0) AS yday_kwh_to_time
-      FROM dbo.KYZ_Interval
-      WHERE IntervalEnd >= @yesterday_start
-        AND IntervalEnd < @yesterday_end
-        AND ISNULL(KyzInvalidAlarm, 0) = 0
-  ),
-  daily_30 AS (
+  ;WITH daily AS (
       SELECT
           CAST(IntervalEnd AS date) AS d,
-          SUM(CAST(kWh AS float)) AS daily_kwh
+          SUM(CAST(kWh AS float)) AS kwh,
+          MAX(CAST(kW AS float)) AS peak_kw,
+          MAX(CASE WHEN ISNULL(R17Exclude, 0) = 0 THEN CAST(kW AS float) END) AS peak_kw_billable,
+          SUM(CASE WHEN IntervalEnd >= @yesterday_start AND IntervalEnd < @yesterday_end THEN CAST(kWh AS float) END) AS kwh_to_time,
+          MAX(IntervalEnd) AS last_end
       FROM dbo.KYZ_Interval
-      WHERE IntervalEnd >= DATEADD(day, -30, @today)
-        AND IntervalEnd < @today
+      WHERE IntervalEnd >= @window_start
+        AND MeterId = @MeterId
         AND ISNULL(KyzInvalidAlarm, 0) = 0
       GROUP BY CAST(IntervalEnd AS date)
+  ),
+  totals AS (
+      SELECT
+          SUM(CASE WHEN d = @today THEN kwh END) AS today_kwh,
+          MAX(CASE WHEN d = @today THEN peak_kw END) AS today_peak_kw,
+          SUM(CASE WHEN d >= @month_start THEN kwh END) AS mtd_kwh,
+          MAX(CASE WHEN d >= @month_start THEN last_end END) AS last_updated,
+          SUM(kwh_to_time) AS yday_kwh_to_time,
+          AVG(CASE WHEN d >= @daily_start AND d < @today THEN kwh END) AS avg_daily_kwh_30d,
+          MAX(peak_kw_billable) AS max_kw_11mo
+      FROM daily
   )
   SELECT
-      pl.current_kw,
-      pl.prev_kw,
+      li.kW AS latest_kw,
+      ll.kW AS latest_live_kw,
+      lv.current_kw,
+      lv.prev_kw,
       (
           SELECT AVG(CAST(l.kW AS float))
           FROM dbo.KYZ_Live15s l
-          WHERE l.SampleEnd >= DATEADD(minute, -5, GETDATE())
+          WHERE l.SampleEnd >= DATEADD(minute, -5, @now)
+            AND l.MeterId = @MeterId
       ) AS live_kw_avg_5m,
-      ta.today_kwh,
-      yt.yday_kwh_to_time,
-      (SELECT AVG(daily_kwh) FROM daily_30) AS avg_daily_kwh_30d,
-      (
-          SELECT MAX(CAST(i.kW AS float))
-          FROM dbo.KYZ_Interval i
-          WHERE i.IntervalEnd >= DATEADD(month, -11, @today)
-            AND ISNULL(i.KyzInvalidAlarm, 0) = 0
-            AND ISNULL(i.R17Exclude, 0) = 0
-      ) AS max_kw_11mo
-  FROM pivot_latest pl
-  CROSS JOIN today_agg ta
-  CROSS JOIN yday_to_time yt;
+      t.today_kwh,
+      t.today_peak_kw,
+      t.mtd_kwh,
+      t.last_updated,
+      t.yday_kwh_to_time,
+      t.avg_daily_kwh_30d,
+      t.max_kw_11mo
+  FROM totals t
+  OUTER APPLY (
+      SELECT TOP (1) CAST(kW AS float) AS kW
+      FROM dbo.KYZ_Interval
+      WHERE MeterId = @MeterId
+      ORDER BY IntervalEnd DESC
+  ) li
+  OUTER APPLY (
+      SELECT TOP (1) CAST(kW AS float) AS kW
+      FROM dbo.KYZ_Live15s
+      WHERE MeterId = @MeterId
+      ORDER BY SampleEnd DESC
+  ) ll
+  CROSS APPLY (
+      SELECT
+          MAX(CASE WHEN rn = 1 THEN kW END) AS current_kw,
+          MAX(CASE WHEN rn = 2 THEN kW END) AS prev_kw
+      FROM (
+          SELECT TOP (2)
+              CAST(kW AS float) AS kW,
+              ROW_NUMBER() OVER (ORDER BY IntervalEnd DESC) AS rn
+          FROM dbo.KYZ_Interval
+          WHERE kW IS NOT NULL
+            AND MeterId = @MeterId
+            AND ISNULL(KyzInvalidAlarm, 0) = 0
+          ORDER BY IntervalEnd DESC
+      ) latest_two
+  ) lv;
 END;
 GO
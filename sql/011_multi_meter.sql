@@ -0,0 +1,104 @@
+/*
+Migration: multi-meter ingestion (MeterId on dbo.KYZ_Interval / dbo.KYZ_Live15s).
+
+- Adds MeterId NVARCHAR(32) NOT NULL DEFAULT N'main' to both tables, so existing rows and
+  single-meter writers (including scripts/windows/plc_csv_sync.py) land on meter 'main'.
+- Widens the clustered primary keys to (IntervalEnd, MeterId) / (SampleEnd, MeterId).
+  IntervalEnd stays the leading key so existing time-range scans are unchanged.
+- Adds a row-level security filter keyed on SESSION_CONTEXT(N'kyz_meter_id'):
+  connections that set it (the dashboard, always, with DASHBOARD_METER_ID defaulting to 'main';
+  plc_csv_sync) only see that meter; connections that do not set it (the ingestor, ad-hoc
+  queries) see every meter. Procedures that aggregate (usp_KYZ_KpiContext,
+  usp_KYZ_Refresh_MonthlyDemand) filter on MeterId themselves.
+
+Apply before enabling a wildcard MQTT_TOPIC_PULSE or SQL_WRITE_METER_ID=true on the ingestor.
+Note: the security policy schema-binds both tables; drop it before later ALTER TABLE changes
+on those columns and re-run the policy section afterwards.
+*/
+
+IF COL_LENGTH('dbo.KYZ_Interval', 'MeterId') IS NULL
+BEGIN
+    ALTER TABLE dbo.KYZ_Interval
+    ADD MeterId NVARCHAR(32) NOT NULL CONSTRAINT DF_KYZ_Interval_MeterId DEFAULT (N'main');
+END
+GO
+
+IF COL_LENGTH('dbo.KYZ_Live15s', 'MeterId') IS NULL
+BEGIN
+    ALTER TABLE dbo.KYZ_Live15s
+    ADD MeterId NVARCHAR(32) NOT NULL CONSTRAINT DF_KYZ_Live15s_MeterId DEFAULT (N'main');
+END
+GO
+
+SET XACT_ABORT ON;
+BEGIN TRAN;
+
+IF NOT EXISTS (
+    SELECT 1
+    FROM sys.key_constraints k
+    JOIN sys.index_columns ic
+      ON ic.object_id = k.parent_object_id AND ic.index_id = k.unique_index_id
+    JOIN sys.columns c
+      ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+    WHERE k.name = 'PK_KYZ_Interval'
+      AND c.name = 'MeterId'
+)
+BEGIN
+    ALTER TABLE dbo.KYZ_Interval DROP CONSTRAINT PK_KYZ_Interval;
+    ALTER TABLE dbo.KYZ_Interval
+    ADD CONSTRAINT PK_KYZ_Interval PRIMARY KEY CLUSTERED (IntervalEnd, MeterId);
+END
+
+IF NOT EXISTS (
+    SELECT 1
+    FROM sys.key_constraints k
+    JOIN sys.index_columns ic
+      ON ic.object_id = k.parent_object_id AND ic.index_id = k.unique_index_id
+    JOIN sys.columns c
+      ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+    WHERE k.name = 'PK_KYZ_Live15s'
+      AND c.name = 'MeterId'
+)
+BEGIN
+    ALTER TABLE dbo.KYZ_Live15s DROP CONSTRAINT PK_KYZ_Live15s;
+    ALTER TABLE dbo.KYZ_Live15s
+    ADD CONSTRAINT PK_KYZ_Live15s PRIMARY KEY CLUSTERED (SampleEnd, MeterId);
+END
+
+COMMIT;
+GO
+
+IF EXISTS (SELECT 1 FROM sys.security_policies WHERE name = 'KYZ_MeterPolicy')
+    DROP SECURITY POLICY dbo.KYZ_MeterPolicy;
+GO
+
+CREATE OR ALTER FUNCTION dbo.fn_KYZ_MeterFilter (@MeterId NVARCHAR(32))
+RETURNS TABLE
+WITH SCHEMABINDING
+AS
+RETURN
+    SELECT 1 AS allowed
+    WHERE SESSION_CONTEXT(N'kyz_meter_id') IS NULL
+       OR @MeterId = CAST(SESSION_CONTEXT(N'kyz_meter_id') AS NVARCHAR(32));
+GO
+
+CREATE SECURITY POLICY dbo.KYZ_MeterPolicy
+    ADD FILTER PREDICATE dbo.fn_KYZ_MeterFilter(MeterId) ON dbo.KYZ_Interval,
+    ADD FILTER PREDICATE dbo.fn_KYZ_MeterFilter(MeterId) ON dbo.KYZ_Live15s
+    WITH (STATE = ON);
+GO
+
+-- Post-check validation
+SELECT MeterId, COUNT_BIG(*) AS interval_rows, MIN(IntervalEnd) AS first_interval, MAX(IntervalEnd) AS last_interval
+FROM dbo.KYZ_Interval
+GROUP BY MeterId
+ORDER BY MeterId;
+
+SELECT k.name AS PrimaryKey, c.name AS ColumnName, ic.key_ordinal
+FROM sys.key_constraints k
+JOIN sys.index_columns ic
+  ON ic.object_id = k.parent_object_id AND ic.index_id = k.unique_index_id
+JOIN sys.columns c
+  ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+WHERE k.name IN ('PK_KYZ_Interval', 'PK_KYZ_Live15s')
+ORDER BY k.name, ic.key_ordinal;
@@ -0,0 +1,313 @@
+/* =========================================================
+   012_rollups.sql
+   ---------------------------------------------------------
+   Creates/updates:
+     - dbo.KYZ_RollupHourly / dbo.KYZ_RollupDaily / dbo.KYZ_RollupMonthly
+     - dbo.usp_KYZ_ApplyRollups  (recomputes the buckets touched by an IntervalEnd range)
+     - dbo.vw_KYZ_DailySummaryRollup (vw_KYZ_DailySummary's columns from dbo.KYZ_RollupDaily)
+     - row-level security predicates for the rollup tables
+
+   Requires sql/011_multi_meter.sql (rollups are keyed by MeterId).
+
+   Buckets follow the API's existing convention: an interval belongs to the hour/day/month
+   of its IntervalEnd. Energy and peaks count valid intervals only (KyzInvalidAlarm = 0);
+   Top1..Top3_kW are the three highest valid, non-R17 interval kW values in the bucket, so a
+   month's top-3 demand average is exact from its days' candidates.
+
+   dbo.vw_KYZ_DailySummary (sql/003) keeps reading dbo.KYZ_Interval: rollups are only as
+   current as SQL_UPDATE_ROLLUPS / rollup_catchup.py keep them, so readers opt in to the
+   rollup view the same way the API opts in with DASHBOARD_USE_ROLLUPS. Databases that ran an
+   earlier revision of this script (which redefined vw_KYZ_DailySummary) get the interval-backed
+   view back by re-running sql/003_dashboard_views.sql.
+
+   Maintained by:
+     - main.py when SQL_UPDATE_ROLLUPS=true (same transaction as each interval batch)
+     - scripts/windows/plc_csv_sync.py after each imported file (same flag)
+     - scripts/windows/rollup_catchup.py (initial backfill and nightly safety net)
+   ========================================================= */
+
+SET NOCOUNT ON;
+GO
+
+IF OBJECT_ID('dbo.KYZ_RollupHourly', 'U') IS NULL
+BEGIN
+    CREATE TABLE dbo.KYZ_RollupHourly
+    (
+        BucketStart       datetime2(0)  NOT NULL,
+        MeterId           nvarchar(32)  NOT NULL,
+        IntervalCount     int           NOT NULL,
+        ValidCount        int           NOT NULL,
+        InvalidCount      int           NOT NULL,
+        R17Count          int           NOT NULL,
+        Energy_kWh        float         NULL,
+        Peak_kW           float         NULL,
+        PeakExR17_kW      float         NULL,
+        Top1_kW           float         NULL,
+        Top2_kW           float         NULL,
+        Top3_kW           float         NULL,
+        UpdatedAtUtc      datetime2(3)  NOT NULL CONSTRAINT DF_KYZ_RollupHourly_UpdatedAtUtc DEFAULT SYSUTCDATETIME(),
+        CONSTRAINT PK_KYZ_RollupHourly PRIMARY KEY CLUSTERED (BucketStart, MeterId)
+    );
+END
+GO
+
+IF OBJECT_ID('dbo.KYZ_RollupDaily', 'U') IS NULL
+BEGIN
+    CREATE TABLE dbo.KYZ_RollupDaily
+    (
+        BucketStart       date          NOT NULL,
+        MeterId           nvarchar(32)  NOT NULL,
+        IntervalCount     int           NOT NULL,
+        ValidCount        int           NOT NULL,
+        InvalidCount      int           NOT NULL,
+        R17Count          int           NOT NULL,
+        Energy_kWh        float         NULL,
+        Peak_kW           float         NULL,
+        PeakExR17_kW      float         NULL,
+        Top1_kW           float         NULL,
+        Top2_kW           float         NULL,
+        Top3_kW           float         NULL,
+        UpdatedAtUtc      datetime2(3)  NOT NULL CONSTRAINT DF_KYZ_RollupDaily_UpdatedAtUtc DEFAULT SYSUTCDATETIME(),
+        CONSTRAINT PK_KYZ_RollupDaily PRIMARY KEY CLUSTERED (BucketStart, MeterId)
+    );
+END
+GO
+
+IF OBJECT_ID('dbo.KYZ_RollupMonthly', 'U') IS NULL
+BEGIN
+    CREATE TABLE dbo.KYZ_RollupMonthly
+    (
+        BucketStart       date          NOT NULL,
+        MeterId           nvarchar(32)  NOT NULL,
+        IntervalCount     int           NOT NULL,
+        ValidCount        int           NOT NULL,
+        InvalidCount      int           NOT NULL,
+        R17Count          int           NOT NULL,
+        Energy_kWh        float         NULL,
+        Peak_kW           float         NULL,
+        PeakExR17_kW      float         NULL,
+        Top1_kW           float         NULL,
+        Top2_kW           float         NULL,
+        Top3_kW           float         NULL,
+        UpdatedAtUtc      datetime2(3)  NOT NULL CONSTRAINT DF_KYZ_RollupMonthly_UpdatedAtUtc DEFAULT SYSUTCDATETIME(),
+        CONSTRAINT PK_KYZ_RollupMonthly PRIMARY KEY CLUSTERED (BucketStart, MeterId)
+    );
+END
+GO
+
+CREATE OR ALTER PROCEDURE dbo.usp_KYZ_ApplyRollups
+    @FromEnd datetime2(0),
+    @ToEnd   datetime2(0)
+AS
+BEGIN
+    SET NOCOUNT ON;
+    SET XACT_ABORT ON;
+
+    -- Widen to whole buckets: hours and days from raw intervals, months from daily rows.
+    DECLARE @hour_from  datetime2(0) = DATEADD(hour, DATEDIFF(hour, '20000101', @FromEnd), CAST('20000101' AS datetime2(0)));
+    DECLARE @hour_to    datetime2(0) = DATEADD(hour, 1, DATEADD(hour, DATEDIFF(hour, '20000101', @ToEnd), CAST('20000101' AS datetime2(0))));
+    DECLARE @day_from   date = CAST(@FromEnd AS date);
+    DECLARE @day_to     date = DATEADD(day, 1, CAST(@ToEnd AS date));
+    DECLARE @month_from date = DATEFROMPARTS(YEAR(@FromEnd), MONTH(@FromEnd), 1);
+    DECLARE @month_to   date = DATEADD(month, 1, DATEFROMPARTS(YEAR(@ToEnd), MONTH(@ToEnd), 1));
+
+    BEGIN TRANSACTION;
+
+    ;WITH src AS (
+        SELECT
+            DATEADD(hour, DATEDIFF(hour, '20000101', IntervalEnd), CAST('20000101' AS datetime2(0))) AS BucketStart,
+            MeterId,
+            CAST(kW AS float) AS kW,
+            CAST(kWh AS float) AS kWh,
+            ISNULL(KyzInvalidAlarm, 0) AS invalid,
+            ISNULL(R17Exclude, 0) AS r17,
+            CASE WHEN ISNULL(KyzInvalidAlarm, 0) = 0 AND ISNULL(R17Exclude, 0) = 0
+                 THEN ROW_NUMBER() OVER (
+                     PARTITION BY DATEADD(hour, DATEDIFF(hour, '20000101', IntervalEnd), CAST('20000101' AS datetime2(0))), MeterId,
+                                  CASE WHEN ISNULL(KyzInvalidAlarm, 0) = 0 AND ISNULL(R17Exclude, 0) = 0 THEN 0 ELSE 1 END
+                     ORDER BY kW DESC)
+            END AS billable_rank
+        FROM dbo.KYZ_Interval
+        WHERE IntervalEnd >= @hour_from AND IntervalEnd < @hour_to
+    ),
+    agg AS (
+        SELECT
+            BucketStart,
+            MeterId,
+            COUNT(*) AS IntervalCount,
+            SUM(CASE WHEN invalid = 0 THEN 1 ELSE 0 END) AS ValidCount,
+            SUM(CASE WHEN invalid = 1 THEN 1 ELSE 0 END) AS InvalidCount,
+            SUM(CASE WHEN r17 = 1 THEN 1 ELSE 0 END) AS R17Count,
+            SUM(CASE WHEN invalid = 0 THEN kWh END) AS Energy_kWh,
+            MAX(CASE WHEN invalid = 0 THEN kW END) AS Peak_kW,
+            MAX(CASE WHEN invalid = 0 AND r17 = 0 THEN kW END) AS PeakExR17_kW,
+            MAX(CASE WHEN billable_rank = 1 THEN kW END) AS Top1_kW,
+            MAX(CASE WHEN billable_rank = 2 THEN kW END) AS Top2_kW,
+            MAX(CASE WHEN billable_rank = 3 THEN kW END) AS Top3_kW
+        FROM src
+        GROUP BY BucketStart, MeterId
+    ),
+    -- Scope the MERGE target to the recomputed buckets so NOT MATCHED BY SOURCE only deletes there.
+    tgt AS (
+        SELECT * FROM dbo.KYZ_RollupHourly WHERE BucketStart >= @hour_from AND BucketStart < @hour_to
+    )
+    MERGE tgt WITH (HOLDLOCK) AS target
+    USING agg AS source
+       ON target.BucketStart = source.BucketStart AND target.MeterId = source.MeterId
+    WHEN MATCHED THEN UPDATE SET
+        IntervalCount = source.IntervalCount, ValidCount = source.ValidCount, InvalidCount = source.InvalidCount,
+        R17Count = source.R17Count, Energy_kWh = source.Energy_kWh, Peak_kW = source.Peak_kW,
+        PeakExR17_kW = source.PeakExR17_kW, Top1_kW = source.Top1_kW, Top2_kW = source.Top2_kW,
+        Top3_kW = source.Top3_kW, UpdatedAtUtc = SYSUTCDATETIME()
+    WHEN NOT MATCHED BY TARGET THEN INSERT
+        (BucketStart, MeterId, IntervalCount, ValidCount, InvalidCount, R17Count, Energy_kWh, Peak_kW, PeakExR17_kW, Top1_kW, Top2_kW, Top3_kW)
+        VALUES (source.BucketStart, source.MeterId, source.IntervalCount, source.ValidCount, source.InvalidCount, source.R17Count,
+                source.Energy_kWh, source.Peak_kW, source.PeakExR17_kW, source.Top1_kW, source.Top2_kW, source.Top3_kW)
+    WHEN NOT MATCHED BY SOURCE THEN DELETE;
+
+    ;WITH src AS (
+        SELECT
+            CAST(IntervalEnd AS date) AS BucketStart,
+            MeterId,
+            CAST(kW AS float) AS kW,
+            CAST(kWh AS float) AS kWh,
+            ISNULL(KyzInvalidAlarm, 0) AS invalid,
+            ISNULL(R17Exclude, 0) AS r17,
+            CASE WHEN ISNULL(KyzInvalidAlarm, 0) = 0 AND ISNULL(R17Exclude, 0) = 0
+                 THEN ROW_NUMBER() OVER (
+                     PARTITION BY CAST(IntervalEnd AS date), MeterId,
+                                  CASE WHEN ISNULL(KyzInvalidAlarm, 0) = 0 AND ISNULL(R17Exclude, 0) = 0 THEN 0 ELSE 1 END
+                     ORDER BY kW DESC)
+            END AS billable_rank
+        FROM dbo.KYZ_Interval
+        WHERE IntervalEnd >= @day_from AND IntervalEnd < @day_to
+    ),
+    agg AS (
+        SELECT
+            BucketStart,
+            MeterId,
+            COUNT(*) AS IntervalCount,
+            SUM(CASE WHEN invalid = 0 THEN 1 ELSE 0 END) AS ValidCount,
+            SUM(CASE WHEN invalid = 1 THEN 1 ELSE 0 END) AS InvalidCount,
+            SUM(CASE WHEN r17 = 1 THEN 1 ELSE 0 END) AS R17Count,
+            SUM(CASE WHEN invalid = 0 THEN kWh END) AS Energy_kWh,
+            MAX(CASE WHEN invalid = 0 THEN kW END) AS Peak_kW,
+            MAX(CASE WHEN invalid = 0 AND r17 = 0 THEN kW END) AS PeakExR17_kW,
+            MAX(CASE WHEN billable_rank = 1 THEN kW END) AS Top1_kW,
+            MAX(CASE WHEN billable_rank = 2 THEN kW END) AS Top2_kW,
+            MAX(CASE WHEN billable_rank = 3 THEN kW END) AS Top3_kW
+        FROM src
+        GROUP BY BucketStart, MeterId
+    ),
+    -- Scope the MERGE target to the recomputed buckets so NOT MATCHED BY SOURCE only deletes there.
+    tgt AS (
+        SELECT * FROM dbo.KYZ_RollupDaily WHERE BucketStart >= @day_from AND BucketStart < @day_to
+    )
+    MERGE tgt WITH (HOLDLOCK) AS target
+    USING agg AS source
+       ON target.BucketStart = source.BucketStart AND target.MeterId = source.MeterId
+    WHEN MATCHED THEN UPDATE SET
+        IntervalCount = source.IntervalCount, ValidCount = source.ValidCount, InvalidCount = source.InvalidCount,
+        R17Count = source.R17Count, Energy_kWh = source.Energy_kWh, Peak_kW = source.Peak_kW,
+        PeakExR17_kW = source.PeakExR17_kW, Top1_kW = source.Top1_kW, Top2_kW = source.Top2_kW,
+        Top3_kW = source.Top3_kW, UpdatedAtUtc = SYSUTCDATETIME()
+    WHEN NOT MATCHED BY TARGET THEN INSERT
+        (BucketStart, MeterId, IntervalCount, ValidCount, InvalidCount, R17Count, Energy_kWh, Peak_kW, PeakExR17_kW, Top1_kW, Top2_kW, Top3_kW)
+        VALUES (source.BucketStart, source.MeterId, source.IntervalCount, source.ValidCount, source.InvalidCount, source.R17Count,
+                source.Energy_kWh, source.Peak_kW, source.PeakExR17_kW, source.Top1_kW, source.Top2_kW, source.Top3_kW)
+    WHEN NOT MATCHED BY SOURCE THEN DELETE;
+
+    -- Months fold the (already current) daily rows: at most 31 rows per meter, never raw intervals.
+    ;WITH candidates AS (
+        SELECT DATEFROMPARTS(YEAR(d.BucketStart), MONTH(d.BucketStart), 1) AS BucketStart, d.MeterId, v.kW
+        FROM dbo.KYZ_RollupDaily d
+        CROSS APPLY (VALUES (d.Top1_kW), (d.Top2_kW), (d.Top3_kW)) v(kW)
+        WHERE d.BucketStart >= @month_from AND d.BucketStart < @month_to
+          AND v.kW IS NOT NULL
+    ),
+    ranked AS (
+        SELECT BucketStart, MeterId, kW, ROW_NUMBER() OVER (PARTITION BY BucketStart, MeterId ORDER BY kW DESC) AS rn
+        FROM candidates
+    ),
+    top3 AS (
+        SELECT
+            BucketStart,
+            MeterId,
+            MAX(CASE WHEN rn = 1 THEN kW END) AS Top1_kW,
+            MAX(CASE WHEN rn = 2 THEN kW END) AS Top2_kW,
+            MAX(CASE WHEN rn = 3 THEN kW END) AS Top3_kW
+        FROM ranked
+        WHERE rn <= 3
+        GROUP BY BucketStart, MeterId
+    ),
+    agg AS (
+        SELECT
+            DATEFROMPARTS(YEAR(d.BucketStart), MONTH(d.BucketStart), 1) AS BucketStart,
+            d.MeterId,
+            SUM(d.IntervalCount) AS IntervalCount,
+            SUM(d.ValidCount) AS ValidCount,
+            SUM(d.InvalidCount) AS InvalidCount,
+            SUM(d.R17Count) AS R17Count,
+            SUM(d.Energy_kWh) AS Energy_kWh,
+            MAX(d.Peak_kW) AS Peak_kW,
+            MAX(d.PeakExR17_kW) AS PeakExR17_kW
+        FROM dbo.KYZ_RollupDaily d
+        WHERE d.BucketStart >= @month_from AND d.BucketStart < @month_to
+        GROUP BY DATEFROMPARTS(YEAR(d.BucketStart), MONTH(d.BucketStart), 1), d.MeterId
+    ),
+    months AS (
+        SELECT a.*, t.Top1_kW, t.Top2_kW, t.Top3_kW
+        FROM agg a
+        LEFT JOIN top3 t ON t.BucketStart = a.BucketStart AND t.MeterId = a.MeterId
+    ),
+    -- Scope the MERGE target to the recomputed buckets so NOT MATCHED BY SOURCE only deletes there.
+    tgt AS (
+        SELECT * FROM dbo.KYZ_RollupMonthly WHERE BucketStart >= @month_from AND BucketStart < @month_to
+    )
+    MERGE tgt WITH (HOLDLOCK) AS target
+    USING months AS source
+       ON target.BucketStart = source.BucketStart AND target.MeterId = source.MeterId
+    WHEN MATCHED THEN UPDATE SET
+        IntervalCount = source.IntervalCount, ValidCount = source.ValidCount, InvalidCount = source.InvalidCount,
+        R17Count = source.R17Count, Energy_kWh = source.Energy_kWh, Peak_kW = source.Peak_kW,
+        PeakExR17_kW = source.PeakExR17_kW, Top1_kW = source.Top1_kW, Top2_kW = source.Top2_kW,
+        Top3_kW = source.Top3_kW, UpdatedAtUtc = SYSUTCDATETIME()
+    WHEN NOT MATCHED BY TARGET THEN INSERT
+        (BucketStart, MeterId, IntervalCount, ValidCount, InvalidCount, R17Count, Energy_kWh, Peak_kW, PeakExR17_kW, Top1_kW, Top2_kW, Top3_kW)
+        VALUES (source.BucketStart, source.MeterId, source.IntervalCount, source.ValidCount, source.InvalidCount, source.R17Count,
+                source.Energy_kWh, source.Peak_kW, source.PeakExR17_kW, source.Top1_kW, source.Top2_kW, source.Top3_kW)
+    WHEN NOT MATCHED BY SOURCE THEN DELETE;
+
+    COMMIT;
+END;
+GO
+
+CREATE OR ALTER VIEW dbo.vw_KYZ_DailySummaryRollup
+AS
+SELECT
+    BucketStart AS [date],
+    SUM(Energy_kWh) AS kWh_sum,
+    MAX(Peak_kW) AS kW_peak,
+    MAX(PeakExR17_kW) AS kW_peak_excluding_r17,
+    SUM(CAST(ValidCount AS bigint)) AS interval_count
+FROM dbo.KYZ_RollupDaily
+GROUP BY BucketStart;
+GO
+
+IF EXISTS (SELECT 1 FROM sys.security_policies WHERE name = 'KYZ_MeterPolicy')
+   AND NOT EXISTS (
+       SELECT 1
+       FROM sys.security_predicates p
+       JOIN sys.security_policies s ON s.object_id = p.object_id
+       WHERE s.name = 'KYZ_MeterPolicy' AND p.target_object_id = OBJECT_ID('dbo.KYZ_RollupDaily')
+   )
+BEGIN
+    ALTER SECURITY POLICY dbo.KYZ_MeterPolicy
+        ADD FILTER PREDICATE dbo.fn_KYZ_MeterFilter(MeterId) ON dbo.KYZ_RollupHourly,
+        ADD FILTER PREDICATE dbo.fn_KYZ_MeterFilter(MeterId) ON dbo.KYZ_RollupDaily,
+        ADD FILTER PREDICATE dbo.fn_KYZ_MeterFilter(MeterId) ON dbo.KYZ_RollupMonthly;
+END
+GO
+
+-- Post-check validation (run scripts/windows/rollup_catchup.py --full first on existing data)
+SELECT TOP (7) * FROM dbo.KYZ_RollupDaily ORDER BY BucketStart DESC, MeterId;
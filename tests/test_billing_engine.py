@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+
+from dashboard.api.billing_engine import BillingEngine, aggregate_periods
+
+
+def _rows(start: datetime, end: datetime, kw=lambda ts: 100.0):
+    rows = []
+    ts = start
+    while ts < end:
+        rows.append((ts, kw(ts), 25.0, 0, 0))
+        ts += timedelta(minutes=15)
+    return rows
+
+
+def test_single_pass_fills_calendar_and_billing_periods() -> None:
+    rows = [
+        (datetime(2026, 1, 10, 8, 0), 300.0, 75.0, 0, 0),
+        (datetime(2026, 1, 12, 8, 0), 900.0, 10.0, 1, 0),  # R17: energy only
+        (datetime(2026, 1, 14, 8, 0), 999.0, 50.0, 0, 1),  # invalid: ignored
+        (datetime(2026, 1, 15, 0, 0), 200.0, 25.0, 0, 0),
+        (datetime(2026, 1, 20, 8, 0), 400.0, 100.0, 0, 0),
+        (datetime(2026, 1, 21, 8, 0), 100.0, 25.0, 0, 0),
+        (datetime(2026, 2, 1, 0, 0), 500.0, 125.0, 0, 0),
+    ]
+
+    periods = aggregate_periods(rows, anchor=datetime(2025, 12, 15))
+
+    january = periods["calendar"][datetime(2026, 1, 1)]
+    assert january.top3_avg_kw == (400.0 + 300.0 + 200.0) / 3
+    assert january.energy_kwh == 235.0
+    assert january.intervals == 6
+    assert periods["calendar"][datetime(2026, 2, 1)].top3_avg_kw == 500.0
+
+    assert sorted(periods["billing"]) == [datetime(2025, 12, 15), datetime(2026, 1, 15)]
+    billing = periods["billing"][datetime(2026, 1, 15)]
+    assert billing.top3_avg_kw == (500.0 + 400.0 + 200.0) / 3
+    assert billing.energy_kwh == 275.0
+
+
+def test_closed_periods_are_cached_and_only_open_period_rescanned() -> None:
+    now = datetime(2026, 3, 10, 12, 0)
+    history = _rows(datetime(2025, 1, 1), now, kw=lambda ts: float(ts.month * 10))
+    scans: list[datetime] = []
+
+    def fetch_since(start: datetime):
+        scans.append(start)
+        return (row for row in history if row[0] >= start)
+
+    engine = BillingEngine(fetch_since)
+
+    first = engine.periods("billing", 12, anchor=datetime(2025, 1, 5), now=now)
+    assert [p.start for p in first][0] == datetime(2025, 3, 5)
+    assert first[-1].start == datetime(2026, 3, 5)
+
+    calendar = engine.periods("calendar", 12, anchor=datetime(2025, 1, 5), now=now)
+    assert [p.start for p in calendar][0] == datetime(2025, 3, 1)
+    assert calendar[-2].top3_avg_kw == 20.0
+
+    again = engine.periods("billing", 12, anchor=datetime(2025, 1, 5), now=now)
+    assert [p.top3_avg_kw for p in again] == [p.top3_avg_kw for p in first]
+    # Calendar months from 2025-03 were filled by the first scan; later calls only read the open period.
+    assert scans == [datetime(2025, 3, 1), datetime(2026, 3, 1), datetime(2026, 3, 1)]
+    assert engine.stats()["scans"] == 3
+
+
+def test_scan_runs_outside_the_lock_and_change_marks_drop_closed_periods() -> None:
+    now = datetime(2026, 3, 10, 12, 0)
+    history = _rows(datetime(2025, 12, 1), now)
+    scans: list[datetime] = []
+
+    def fetch_since(start: datetime):
+        scans.append(start)
+        engine.stats()  # would deadlock if the scan held the engine lock
+        return (row for row in history if row[0] >= start)
+
+    engine = BillingEngine(fetch_since)
+    engine.observe_change_mark(7, None)
+    engine.periods("calendar", 3, now=now)
+    assert engine.stats()["closedPeriods"] == 3
+
+    # A backfill rewrote January: it and everything after it are recomputed.
+    history = [(ts, 500.0 if ts.month == 1 else kw, kwh, r17, invalid) for ts, kw, kwh, r17, invalid in history]
+    engine.observe_change_mark(7, datetime(2026, 1, 1))
+    assert engine.stats()["closedPeriods"] == 3
+    engine.observe_change_mark(8, datetime(2026, 1, 1))
+    assert engine.stats()["closedPeriods"] == 1
+
+    january = engine.periods("calendar", 3, now=now)[1]
+    assert january.start == datetime(2026, 1, 1) and january.top3_avg_kw == 500.0
+    assert scans == [datetime(2025, 12, 1), datetime(2026, 1, 1)]
+
+
+def test_invalidation_during_a_scan_is_not_published() -> None:
+    now = datetime(2026, 3, 10, 12, 0)
+    history = _rows(datetime(2026, 1, 1), now)
+
+    def fetch_since(start: datetime):
+        engine.invalidate()
+        return (row for row in history if row[0] >= start)
+
+    engine = BillingEngine(fetch_since)
+    assert len(engine.periods("calendar", 2, now=now)) == 3
+    assert engine.stats()["closedPeriods"] == 0
@@ -0,0 +1,123 @@
+import json
+import logging
+from datetime import datetime
+
+import pyodbc
+
+from ingest_spool import BucketSpool
+from main import BatchWriteResult, BucketWriter, build_batch_insert_sql
+
+
+class _FakeIngestor:
+    def __init__(self) -> None:
+        self.live: list[dict] = []
+        self.intervals: list[dict] = []
+        self.batches: list[int] = []
+
+    def insert_live_many(self, rows: list[dict]) -> BatchWriteResult:
+        self.batches.append(len(rows))
+        self.live.extend(rows)
+        return BatchWriteResult(inserted=len(rows), deduplicated=0)
+
+    def insert_interval_many(self, rows: list[dict]) -> BatchWriteResult:
+        self.batches.append(len(rows))
+        keys = {row["intervalEnd"] for row in rows}
+        self.intervals.extend(rows)
+        return BatchWriteResult(inserted=len(keys), deduplicated=len(rows) - len(keys))
+
+
+def _interval(end: datetime) -> dict:
+    return {"intervalEnd": end, "pulseCount": 1, "kWh": 1.0, "kW": 4.0, "total_kWh": None}
+
+
+def test_writer_commits_queued_rows_and_tracks_metrics() -> None:
+    ingestor = _FakeIngestor()
+    writer = BucketWriter(logging.getLogger("test"), ingestor, max_depth=10)
+
+    assert writer.submit("live", {"sampleEnd": datetime(2025, 1, 1, 0, 0, 15), "pulseCount": 2, "kWh": 0.1, "kW": 24.0})
+    assert writer.submit("interval", _interval(datetime(2025, 1, 1, 0, 15)))
+    assert writer.submit("interval", _interval(datetime(2025, 1, 1, 0, 15)))
+    writer.start()
+    writer.stop()
+
+    stats = writer.stats()
+    assert len(ingestor.live) == 1
+    assert len(ingestor.intervals) == 2
+    assert ingestor.batches == [1, 2]
+    assert stats["depth"] == 0
+    assert stats["highWater"] == 3
+    assert stats["committed"] == 2
+    assert stats["deduplicated"] == 1
+    assert stats["latencyMsP99"] is not None
+
+
+def test_writer_drops_when_queue_is_full() -> None:
+    writer = BucketWriter(logging.getLogger("test"), _FakeIngestor(), max_depth=1)
+
+    assert writer.submit("interval", _interval(datetime(2025, 1, 1, 0, 15)))
+    assert not writer.submit("interval", _interval(datetime(2025, 1, 1, 0, 30)))
+    assert writer.stats()["dropped"] == 1
+
+
+def test_batch_insert_sql_is_single_set_based_statement() -> None:
+    sql = build_batch_insert_sql("dbo.KYZ_Live15s", ("SampleEnd", "PulseCount", "kWh"), ("SampleEnd",), 3)
+
+    assert sql.count("INSERT INTO") == 1
+    assert "FROM (VALUES (?, ?, ?), (?, ?, ?), (?, ?, ?)) AS v (SampleEnd, PulseCount, kWh)" in sql
+    assert "WHERE t.SampleEnd = v.SampleEnd" in sql
+
+
+class _OfflineIngestor(_FakeIngestor):
+    def __init__(self) -> None:
+        super().__init__()
+        self.online = False
+
+    def insert_interval_many(self, rows: list[dict]) -> BatchWriteResult:
+        if not self.online:
+            raise pyodbc.OperationalError("08S01", "SQL unavailable")
+        return super().insert_interval_many(rows)
+
+
+def test_writer_spools_while_sql_is_down_and_replays_in_order(tmp_path) -> None:
+    ingestor = _OfflineIngestor()
+    spool = BucketSpool(tmp_path / "kyz.spool", logging.getLogger("test"))
+    writer = BucketWriter(logging.getLogger("test"), ingestor, max_depth=10, spool=spool)
+
+    writer._write_batch([("interval", _interval(datetime(2025, 1, 1, 0, 15)), 0.0)])
+    writer._write_batch([("interval", _interval(datetime(2025, 1, 1, 0, 30)), 0.0)])
+    assert spool.pending() == 2
+    assert ingestor.intervals == []
+
+    ingestor.online = True
+    writer.sql_retry_at = 0.0
+    writer._replay_spool()
+
+    assert spool.pending() == 0
+    assert [row["intervalEnd"].minute for row in ingestor.intervals] == [15, 30]
+    assert writer.stats()["replayed"] == 2
+
+
+class _RejectingIngestor(_FakeIngestor):
+    def insert_interval_many(self, rows: list[dict]) -> BatchWriteResult:
+        if any(row["pulseCount"] < 0 for row in rows):
+            raise pyodbc.IntegrityError("23000", "CHECK constraint violated")
+        return super().insert_interval_many(rows)
+
+
+def test_rejected_spool_row_is_set_aside_and_later_rows_reach_sql(tmp_path) -> None:
+    ingestor = _RejectingIngestor()
+    spool = BucketSpool(tmp_path / "kyz.spool", logging.getLogger("test"))
+    writer = BucketWriter(logging.getLogger("test"), ingestor, max_depth=10, spool=spool)
+    rows = [_interval(datetime(2025, 1, 1, 0, 15 * minute)) for minute in range(4)]
+    rows[1]["pulseCount"] = -1
+    spool.append_many("interval", rows)
+
+    writer._replay_spool()
+    writer._write_batch([("interval", _interval(datetime(2025, 1, 1, 1, 0)), 0.0)])
+
+    assert spool.pending() == 0
+    assert [row["intervalEnd"].minute for row in ingestor.intervals] == [0, 30, 45, 0]
+    assert writer.stats()["rejected"] == 1
+    (rejected,) = [json.loads(line) for line in writer.rejected_path.read_text().splitlines()]
+    assert rejected["kind"] == "interval" and rejected["row"]["intervalEnd"] == "2025-01-01 00:15:00"
+    assert rejected["error"].startswith("IntegrityError")
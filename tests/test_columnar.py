@@ -0,0 +1,80 @@
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from dashboard.api.app import get_series
+from dashboard.api.columnar import BINARY_MEDIA_TYPE, decode_binary, encode_binary, negotiate_format, pack_bits
+
+
+def test_negotiation_prefers_query_then_accept_header() -> None:
+    assert negotiate_format(None, None) == "rows"
+    assert negotiate_format(None, f"{BINARY_MEDIA_TYPE}, application/json") == "binary"
+    assert negotiate_format(None, "application/vnd.kyz.columns+json") == "columns"
+    assert negotiate_format("columns", BINARY_MEDIA_TYPE) == "columns"
+    with pytest.raises(ValueError):
+        negotiate_format("arrow", None)
+
+
+def test_binary_roundtrip_aligns_columns() -> None:
+    assert pack_bits([1, 0, 0, 0, 0, 0, 0, 0, 1, 1]) == bytes([0b00000001, 0b00000011])
+
+    payload = encode_binary(
+        [("t", "u32", [1700000000, 1700000900, 1700001800]), ("kW", "f32", [1.5, 2.5, float("nan")]), ("bad", "bits", [0, 1, 0])],
+        3,
+        {"resolution": {"bucketSeconds": 900}},
+    )
+    header, columns = decode_binary(payload)
+
+    assert header["resolution"] == {"bucketSeconds": 900}
+    assert all(column["offset"] % 8 == 0 for column in header["columns"])
+    assert list(columns["t"]) == [1700000000, 1700000900, 1700001800]
+    assert columns["kW"][:2].tolist() == [1.5, 2.5]
+    assert columns["bad"] == [False, True, False]
+
+
+def _install_rows(monkeypatch, count: int) -> datetime:
+    start = datetime(2026, 1, 1)
+    rows = [
+        SimpleNamespace(IntervalEnd=start + timedelta(minutes=15 * i), kW=412.75 + i % 7, kWh=103.1875, R17Exclude=i == 5, KyzInvalidAlarm=0)
+        for i in range(count)
+    ]
+
+    class _Conn:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return False
+
+        def cursor(self):
+            return SimpleNamespace(execute=lambda *args: None, fetchall=lambda: rows)
+
+    monkeypatch.setattr("dashboard.api.app.get_db_connection", lambda: _Conn())
+    monkeypatch.setattr("dashboard.api.app.enforce_series_window", lambda *args: None)
+    return start
+
+
+def test_series_formats_carry_same_points_and_binary_is_compact(monkeypatch) -> None:
+    start = _install_rows(monkeypatch, 60 * 96)
+    window = {"start": start.isoformat(), "end": (start + timedelta(days=60)).isoformat()}
+
+    rows_payload = get_series(**window)
+    columns_payload = json.loads(get_series(**window, format="columns").body)
+    binary = get_series(**window, accept=BINARY_MEDIA_TYPE)
+
+    assert binary.media_type == BINARY_MEDIA_TYPE
+    header, columns = decode_binary(binary.body)
+    assert header["rows"] == columns_payload["rows"] == len(rows_payload["points"]) == 5760
+    assert (datetime(1970, 1, 1) + timedelta(seconds=columns["t"][5])).isoformat() == rows_payload["points"][5]["t"]
+    assert columns["r17Exclude"][5] is True and columns_payload["columns"]["r17Exclude"][5] == 1
+    assert columns_payload["columns"]["kW"][3] == rows_payload["points"][3]["kW"]
+
+    rows_size = len(json.dumps(rows_payload))
+    assert len(binary.body) * 4 < rows_size
+    assert len(get_series(**window, format="columns").body) * 2 < rows_size
+
+    with pytest.raises(HTTPException):
+        get_series(**window, format="xml")
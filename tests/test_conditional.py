@@ -0,0 +1,118 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from fastapi.responses import JSONResponse
+from starlette.requests import Request
+
+from dashboard.api.app import conditional_get_middleware, get_daily, get_live_latest, get_series
+from dashboard.api.conditional import build_etag, etag_matches
+from dashboard.api.live_cache import LiveSampleCache
+from dashboard.api.ttl_cache import TTLCache
+
+
+class _Conn:
+    def __init__(self, rows, executed):
+        self._rows = rows
+        self._executed = executed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def cursor(self):
+        return SimpleNamespace(execute=lambda sql, *params: self._executed.append(params), fetchall=lambda: self._rows)
+
+
+def test_etag_changes_with_version_params_and_format_only() -> None:
+    base = dict(path="/api/series", query=[("minutes", "240")], accept=None, versions={"interval": "a/1"}, datasets=("interval",), now_epoch=1000.0)
+
+    etag = build_etag(**base)
+    assert build_etag(**{**base, "query": [("minutes", "240"), ("token", "secret")]}) == etag
+    assert build_etag(**{**base, "versions": {"interval": "b/2"}}) != etag
+    assert build_etag(**{**base, "accept": "application/vnd.kyz.columnar"}) != etag
+    assert build_etag(**{**base, "now_epoch": 1000.0 + 900}) != etag
+    assert etag_matches(f'W/{etag}, "other"', etag)
+    assert not etag_matches(None, etag)
+
+
+def _get(path: str, query: str, headers: dict[str, str], handler) -> object:
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": query.encode(),
+        "headers": [(key.lower().encode(), value.encode()) for key, value in headers.items()],
+    }
+
+    async def call_next(request):
+        return JSONResponse(handler())
+
+    return asyncio.run(conditional_get_middleware(Request(scope), call_next))
+
+
+def test_unchanged_dataset_returns_304_without_running_handler(monkeypatch) -> None:
+    calls: list = []
+    handler = lambda: calls.append(1) or {"points": []}
+    monkeypatch.setattr("dashboard.api.app.get_dataset_versions", lambda: {"interval": "2026-01-01T00:45:00/4", "live": "-/0"})
+
+    first = _get("/api/series", "minutes=240", {}, handler)
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "no-cache"
+
+    second = _get("/api/series", "minutes=240", {"If-None-Match": first.headers["etag"]}, handler)
+    assert second.status_code == 304
+    assert len(calls) == 1
+
+    monkeypatch.setattr("dashboard.api.app.get_dataset_versions", lambda: {"interval": "2026-01-01T01:00:00/5", "live": "-/0"})
+    third = _get("/api/series", "minutes=240", {"If-None-Match": first.headers["etag"]}, handler)
+    assert third.status_code == 200
+    assert third.headers["etag"] != first.headers["etag"]
+
+    assert "etag" not in _get("/api/health", "", {}, handler).headers
+
+
+def test_since_only_queries_rows_after_last_point(monkeypatch) -> None:
+    executed: list = []
+    monkeypatch.setattr("dashboard.api.app.get_db_connection", lambda: _Conn([], executed))
+
+    get_series(start="2026-01-01T00:00:00", end="2026-01-02T00:00:00", since="2026-01-01T12:15:00.250")
+
+    assert executed[0] == (datetime(2026, 1, 1, 12, 15, 1), datetime(2026, 1, 2))
+
+
+def test_cached_body_is_rebuilt_when_the_version_moves(monkeypatch) -> None:
+    monkeypatch.setattr("dashboard.api.app.cache", TTLCache())
+    day = lambda kwh: SimpleNamespace(date=datetime(2026, 1, 1).date(), kWh_sum=kwh, kW_peak=400.0, interval_count=4)
+    monkeypatch.setattr("dashboard.api.app.get_db_connection", lambda: _Conn([day(100.0)], []))
+    monkeypatch.setattr("dashboard.api.app.get_dataset_versions", lambda: {"interval": "2026-01-01T00:45:00/4", "live": "-/0"})
+    handler = lambda: get_daily(days=7)
+
+    first = _get("/api/daily", "days=7", {}, handler)
+
+    # A late row lands while the first body is still fresh in the response cache.
+    monkeypatch.setattr("dashboard.api.app.get_db_connection", lambda: _Conn([day(125.0)], []))
+    monkeypatch.setattr("dashboard.api.app.get_dataset_versions", lambda: {"interval": "2026-01-01T00:45:00/5", "live": "-/0"})
+    second = _get("/api/daily", "days=7", {"If-None-Match": first.headers["etag"]}, handler)
+
+    assert second.status_code == 200
+    assert second.headers["etag"] != first.headers["etag"]
+    assert json.loads(second.body)["days"][0]["kWh_sum"] == 125.0
+
+
+def test_live_cache_catches_up_to_the_version_in_the_etag(monkeypatch) -> None:
+    start = datetime.now().replace(microsecond=0) - timedelta(minutes=1)
+    sample = lambda seconds: SimpleNamespace(SampleEnd=start + timedelta(seconds=seconds), PulseCount=1, kWh=0.1, kW=24.0, Total_kWh=10.0)
+    rows = [sample(0)]
+    live = LiveSampleCache(lambda since: [row for row in rows if row.SampleEnd >= since], retention_seconds=7200, refresh_seconds=3600)
+    monkeypatch.setattr("dashboard.api.app.live_cache", live)
+    live.refresh(now=start)
+
+    rows.append(sample(15))
+    monkeypatch.setattr("dashboard.api.app.get_dataset_versions", lambda: {"interval": "-/0", "live": f"{(start + timedelta(seconds=15)).isoformat()}/2"})
+    response = _get("/api/live/latest", "", {}, get_live_latest)
+
+    assert json.loads(response.body)["SampleEnd"] == (start + timedelta(seconds=15)).isoformat()
@@ -0,0 +1,59 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from dashboard.api.app import app
+from dashboard.api.db_executor import DbExecutor, EndpointBusyError
+
+
+def test_endpoint_concurrency_is_capped_and_queue_time_recorded() -> None:
+    executor = DbExecutor(max_workers=4, max_concurrency=2)
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def query() -> int:
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+        return 1
+
+    async def main() -> list[int]:
+        return await asyncio.gather(*(executor.run("billing", query) for _ in range(6)))
+
+    assert asyncio.run(main()) == [1] * 6
+    stats = executor.stats()["endpoints"]["billing"]
+    executor.close()
+
+    assert peak == 2
+    assert stats["calls"] == 6
+    assert stats["queueMsMax"] >= 40
+    assert stats["running"] == stats["waiting"] == 0
+
+
+def test_full_queue_rejects_instead_of_piling_up() -> None:
+    executor = DbExecutor(max_workers=2, max_concurrency=1, max_queue=1)
+
+    async def main() -> list:
+        return await asyncio.gather(*(executor.run("series", time.sleep, 0.05) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    executor.close()
+
+    assert sum(isinstance(result, EndpointBusyError) for result in results) == 1
+    assert executor.stats()["endpoints"]["series"]["rejected"] == 1
+
+
+@pytest.mark.parametrize("path", ["/api/series", "/api/billing", "/api/summary", "/api/usage/pageview"])
+def test_db_routes_are_async_and_keep_handler_parameters(path: str) -> None:
+    route = next(route for route in app.routes if getattr(route, "path", None) == path)
+
+    assert asyncio.iscoroutinefunction(route.endpoint)
+    if path == "/api/series":
+        assert {"maxPoints", "since", "format"} <= {param.name for param in route.dependant.query_params}
@@ -0,0 +1,163 @@
+import threading
+import time
+
+import pytest
+
+from dashboard.api.db_pool import ConnectionPool, PoolTimeoutError
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self._conn = conn
+        self.closed = False
+
+    def execute(self, _query: str) -> None:
+        if self._conn.broken:
+            raise RuntimeError("connection reset")
+
+    def fetchone(self):
+        return (1,)
+
+    def close(self) -> None:
+        if self._conn.broken:
+            raise RuntimeError("connection reset")
+        self.closed = True
+
+
+class _Conn:
+    def __init__(self, ident: int):
+        self.ident = ident
+        self.broken = False
+        self.closed = False
+        self.autocommit = True
+        self.rollbacks = 0
+
+    def rollback(self) -> None:
+        self.rollbacks += 1
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class _Factory:
+    def __init__(self):
+        self.made: list[_Conn] = []
+
+    def __call__(self) -> _Conn:
+        conn = _Conn(len(self.made))
+        self.made.append(conn)
+        return conn
+
+
+def test_pool_reuses_released_connection() -> None:
+    factory = _Factory()
+    pool = ConnectionPool(factory, max_size=2)
+
+    with pool.lease() as first:
+        pass
+    with pool.lease() as second:
+        pass
+
+    assert first.raw is second.raw
+    assert len(factory.made) == 1
+    stats = pool.stats()
+    assert stats["acquires"] == 2
+    assert stats["created"] == 1
+    assert stats["idle"] == 1
+    assert stats["inUse"] == 0
+
+
+def test_pool_times_out_when_exhausted_and_wakes_waiters() -> None:
+    pool = ConnectionPool(_Factory(), max_size=1, acquire_timeout_seconds=0.05)
+    held = pool.acquire()
+
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
+    assert pool.stats()["timeouts"] == 1
+
+    pool.acquire_timeout_seconds = 5
+    result = {}
+
+    def waiter() -> None:
+        result["conn"] = pool.acquire()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    time.sleep(0.05)
+    pool.release(held)
+    thread.join(timeout=5)
+
+    assert result["conn"] is held
+    assert pool.stats()["waits"] == 1
+
+
+def test_pool_discards_connection_after_matching_error() -> None:
+    factory = _Factory()
+    pool = ConnectionPool(factory, max_size=2, discard_on=(ConnectionError,))
+
+    with pytest.raises(ConnectionError):
+        with pool.lease():
+            raise ConnectionError("link failure")
+    with pytest.raises(ValueError):
+        with pool.lease():
+            raise ValueError("bad parameter")
+
+    assert factory.made[0].closed
+    assert not factory.made[1].closed
+    stats = pool.stats()
+    assert stats["discarded"] == 1
+    assert stats["open"] == 1
+
+
+def test_lease_closes_its_cursors_and_rolls_back_before_release() -> None:
+    factory = _Factory()
+    pool = ConnectionPool(factory, max_size=1)
+
+    with pool.lease() as conn:
+        cursors = [conn.cursor(), conn.cursor()]
+        conn.raw.autocommit = False
+    assert all(cursor.closed for cursor in cursors)
+    assert factory.made[0].rollbacks == 1
+    assert pool.stats()["idle"] == 1
+
+    # A connection whose cursors cannot be closed is not handed to the next lease.
+    with pool.lease() as conn:
+        conn.cursor()
+        conn.raw.broken = True
+    assert factory.made[0].closed
+    assert pool.stats()["discarded"] == 1
+
+
+def test_pool_recycles_old_and_revalidates_idle_connections() -> None:
+    factory = _Factory()
+    pool = ConnectionPool(factory, max_size=1, max_lifetime_seconds=3600, validate_after_idle_seconds=0)
+
+    with pool.lease() as leased:
+        conn = leased.raw
+    conn.broken = True
+    with pool.lease() as leased:
+        replacement = leased.raw
+    assert replacement is not conn and conn.closed
+    assert pool.stats()["validationFailures"] == 1
+
+    pool.max_lifetime_seconds = 0
+    with pool.lease() as leased:
+        recycled = leased.raw
+    assert recycled is not replacement and replacement.closed
+    assert pool.stats()["recycled"] >= 1
+
+
+def test_pool_close_closes_idle_connections() -> None:
+    factory = _Factory()
+    pool = ConnectionPool(factory, max_size=2)
+    with pool.lease():
+        pass
+
+    pool.close()
+
+    assert factory.made[0].closed
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
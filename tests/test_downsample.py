@@ -0,0 +1,89 @@
+import math
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from dashboard.api import downsample
+from dashboard.api.app import get_series
+from dashboard.api.downsample import downsample_indices, lttb_indices, minmax_indices
+
+
+def _series(count: int, spike_at: int) -> tuple[list[int], list[float]]:
+    epochs = [index * 900 for index in range(count)]
+    values = [100.0 + 20.0 * math.sin(index / 7.0) for index in range(count)]
+    values[spike_at] = 950.0
+    values[spike_at + 1] = 5.0
+    return epochs, values
+
+
+def test_minmax_keeps_peaks_and_respects_budget() -> None:
+    epochs, values = _series(8640, spike_at=4321)
+
+    indices, bucket_seconds = minmax_indices(epochs, values, 400, 900)
+
+    assert len(indices) <= 400
+    assert indices == sorted(indices)
+    assert 4321 in indices and 4322 in indices
+    assert bucket_seconds % 900 == 0 and bucket_seconds >= 8640 * 900 / 200
+
+
+def test_minmax_leaves_gaps_and_short_series_alone() -> None:
+    epochs = [0, 900, 1800] + [86400 + 900 * index for index in range(100)]
+    values = [1.0] * len(epochs)
+
+    indices, bucket_seconds = minmax_indices(epochs, values, 10, 900)
+    assert all(not (1800 < epochs[index] < 86400) for index in indices)
+
+    assert minmax_indices(epochs[:3], values[:3], 10, 900) == ([0, 1, 2], 900)
+
+
+def test_lttb_pins_global_peak_and_endpoints() -> None:
+    epochs, values = _series(5000, spike_at=2500)
+
+    indices, _ = lttb_indices(epochs, values, 300, 15)
+
+    assert len(indices) == 300
+    assert indices[0] == 0 and indices[-1] == 4999
+    assert 2500 in indices
+    assert downsample_indices(epochs, values, 300, 15, "lttb") == (indices, _)
+
+
+def test_numpy_and_python_paths_pick_the_same_samples(monkeypatch) -> None:
+    pytest.importorskip("numpy")
+    epochs, values = _series(20000, spike_at=12345)
+    epochs[5000:] = [epoch + 86400 for epoch in epochs[5000:]]  # a gap
+    values[700:710] = [values[700]] * 10  # ties resolve to the earliest sample
+
+    vectorized = (minmax_indices(epochs, values, 500, 900), lttb_indices(epochs, values, 500, 900))
+    monkeypatch.setattr(downsample, "np", None)
+    assert (minmax_indices(epochs, values, 500, 900), lttb_indices(epochs, values, 500, 900)) == vectorized
+
+
+def test_series_endpoint_reports_effective_resolution(monkeypatch) -> None:
+    start = datetime(2026, 1, 1)
+    rows = [
+        SimpleNamespace(IntervalEnd=start + timedelta(minutes=15 * index), kW=500.0 if index == 77 else 100.0, kWh=25.0, R17Exclude=0, KyzInvalidAlarm=0)
+        for index in range(2880)
+    ]
+
+    class _Conn:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return False
+
+        def cursor(self):
+            return SimpleNamespace(execute=lambda *args: None, fetchall=lambda: rows)
+
+    monkeypatch.setattr("dashboard.api.app.get_db_connection", lambda: _Conn())
+    monkeypatch.setattr("dashboard.api.app.enforce_series_window", lambda *args: None)
+
+    payload = get_series(start=start.isoformat(), end=(start + timedelta(days=30)).isoformat(), maxPoints=200)
+
+    assert len(payload["points"]) <= 200
+    assert max(point["kW"] for point in payload["points"]) == 500.0
+    assert payload["resolution"]["sourcePoints"] == 2880
+    assert payload["resolution"]["downsampled"] is True
+    assert payload["resolution"]["bucketSeconds"] >= 30 * 86400 / 100
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import struct
+from datetime import datetime
+
+from ingest_async import AsyncBucketWriter, AsyncMqttSqlService
+from main import BatchWriteResult
+
+LOGGER = logging.getLogger("test")
+
+
+class _FakeIngestor:
+    def __init__(self) -> None:
+        self.intervals: list[dict] = []
+        self.closed = False
+
+    def insert_live_many(self, rows: list[dict]) -> BatchWriteResult:
+        return BatchWriteResult(inserted=len(rows), deduplicated=0)
+
+    def insert_interval_many(self, rows: list[dict]) -> BatchWriteResult:
+        self.intervals.extend(rows)
+        return BatchWriteResult(inserted=len(rows), deduplicated=0)
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def _interval(minute: int) -> dict:
+    return {"intervalEnd": datetime(2025, 1, 1, 12, minute), "pulseCount": 1, "kWh": 1.0, "kW": 4.0, "total_kWh": None}
+
+
+def test_async_writer_drains_queue_on_executor_before_stopping() -> None:
+    ingestor = _FakeIngestor()
+
+    async def scenario() -> None:
+        writer = AsyncBucketWriter(LOGGER, ingestor, max_depth=10)
+        writer.start()
+        writer.submit("interval", _interval(15))
+        await asyncio.sleep(0.05)
+        writer.submit("interval", _interval(30))
+        writer.submit("interval", _interval(45))
+        await writer.stop_async()
+
+    asyncio.run(scenario())
+
+    assert [row["intervalEnd"].minute for row in ingestor.intervals] == [15, 30, 45]
+
+
+def _packet(packet_type: int, body: bytes) -> bytes:
+    assert len(body) < 128
+    return bytes([packet_type, len(body)]) + body
+
+
+async def _fake_broker(messages: list[tuple[str, bytes]], subscribed: asyncio.Event):
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        while True:
+            header = await reader.read(1)
+            if not header:
+                return
+            length, multiplier = 0, 1
+            while True:
+                byte = (await reader.readexactly(1))[0]
+                length += (byte & 0x7F) * multiplier
+                multiplier *= 128
+                if byte < 0x80:
+                    break
+            body = await reader.readexactly(length)
+            packet_type = header[0] & 0xF0
+            if packet_type == 0x10:  # CONNECT
+                writer.write(_packet(0x20, b"\x00\x00"))
+            elif packet_type == 0x80:  # SUBSCRIBE
+                writer.write(_packet(0x90, body[:2] + b"\x00"))
+                subscribed.set()
+                for topic, payload in messages:
+                    writer.write(_packet(0x30, struct.pack("!H", len(topic)) + topic.encode() + payload))
+            elif packet_type == 0xC0:  # PINGREQ
+                writer.write(_packet(0xD0, b""))
+            elif packet_type == 0xE0:  # DISCONNECT
+                writer.close()
+                return
+            await writer.drain()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+def test_asyncio_engine_ingests_from_broker_and_shuts_down(monkeypatch, tmp_path) -> None:
+    monkeypatch.setenv("KYZ_PULSES_PER_KWH", "1")
+    monkeypatch.setenv("MQTT_TOPIC_PULSE", "pri/energy/+/pulseCount")
+    ingestor = _FakeIngestor()
+    messages = [
+        ("pri/energy/press-1/pulseCount", b"d=0,c=100"),
+        ("pri/energy/press-1/pulseCount", b"d=5,c=105"),
+        ("pri/energy/press-2/pulseCount", b'{"d": 0, "c": 7}'),
+    ]
+
+    async def scenario() -> AsyncMqttSqlService:
+        subscribed = asyncio.Event()
+        server = await _fake_broker(messages, subscribed)
+        monkeypatch.setenv("MQTT_HOST", "127.0.0.1")
+        monkeypatch.setenv("MQTT_PORT", str(server.sockets[0].getsockname()[1]))
+        service = AsyncMqttSqlService(LOGGER, ingestor)  # type: ignore[arg-type]
+        run_task = asyncio.create_task(service.run_async())
+        await asyncio.wait_for(subscribed.wait(), 5)
+        for _ in range(100):
+            if len(service.meters) == 2 and service.meters["press-1"].last_total_pulses == 105:
+                break
+            await asyncio.sleep(0.02)
+        service.stop()
+        await asyncio.wait_for(run_task, 10)
+        server.close()
+        return service
+
+    service = asyncio.run(scenario())
+
+    assert service.meters["press-1"].last_total_pulses == 105
+    assert service.meters["press-2"].last_total_pulses == 7
+    assert ingestor.closed
@@ -0,0 +1,64 @@
+import logging
+import time
+from datetime import datetime
+
+from ingest_checkpoint import AggregatorSnapshot, CheckpointStore, MeterSnapshot
+from main import MqttSqlService
+
+LOGGER = logging.getLogger("test")
+
+
+def _snapshot(saved_at: float) -> AggregatorSnapshot:
+    return AggregatorSnapshot(
+        seq=42,
+        saved_at=saved_at,
+        meters={
+            "main": MeterSnapshot(
+                last_total_pulses=1234567,
+                last_total_kwh=2098765.25,
+                live_buckets={datetime(2025, 1, 1, 12, 7, 30): {"pulseCount": 3, "r17Exclude": None, "kyzInvalidAlarm": False}},
+                interval_buckets={datetime(2025, 1, 1, 12, 15): {"pulseCount": 180, "r17Exclude": True, "kyzInvalidAlarm": None}},
+            ),
+            "press-2": MeterSnapshot(last_total_pulses=None, last_total_kwh=None),
+        },
+    )
+
+
+def test_checkpoint_round_trip(tmp_path) -> None:
+    store = CheckpointStore(tmp_path / "kyz.checkpoint", LOGGER)
+    snapshot = _snapshot(time.time())
+
+    store.save(snapshot)
+
+    assert store.load() == snapshot
+
+
+def test_corrupt_checkpoint_is_ignored(tmp_path) -> None:
+    path = tmp_path / "kyz.checkpoint"
+    store = CheckpointStore(path, LOGGER)
+    store.save(_snapshot(time.time()))
+    raw = bytearray(path.read_bytes())
+    raw[20] ^= 0xFF
+    path.write_bytes(bytes(raw))
+
+    assert store.load() is None
+
+
+def _service(monkeypatch) -> MqttSqlService:
+    monkeypatch.setenv("MQTT_HOST", "localhost")
+    monkeypatch.setenv("KYZ_PULSES_PER_KWH", "1")
+    monkeypatch.setenv("INGEST_CHECKPOINT_MAX_AGE_SECONDS", "300")
+    return MqttSqlService(LOGGER, ingestor=None)  # type: ignore[arg-type]
+
+
+def test_restore_keeps_pulse_total_only_for_fresh_checkpoints(monkeypatch) -> None:
+    fresh = _service(monkeypatch)
+    fresh.restore_state(_snapshot(time.time() - 10))
+    stale = _service(monkeypatch)
+    stale.restore_state(_snapshot(time.time() - 3600))
+
+    assert fresh.meters["main"].last_total_pulses == 1234567
+    assert fresh.meters["main"].interval_store.to_snapshot()[datetime(2025, 1, 1, 12, 15)]["pulseCount"] == 180
+    assert set(fresh.meters) == {"main", "press-2"}
+    assert stale.meters["main"].last_total_pulses is None
+    assert stale.meters["main"].interval_store.to_snapshot()[datetime(2025, 1, 1, 12, 15)]["pulseCount"] == 180
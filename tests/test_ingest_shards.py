@@ -0,0 +1,53 @@
+import logging
+from collections import Counter
+from datetime import datetime
+
+import pytest
+
+from ingest_shards import HashRing, ShardedMqttService
+from main import ConfigError
+
+LOGGER = logging.getLogger("test")
+
+
+def test_hash_ring_is_stable_balanced_and_moves_few_meters() -> None:
+    meters = [f"meter-{index}" for index in range(2000)]
+    four = HashRing(4)
+    five = HashRing(5)
+
+    assignments = [four.shard_for(meter) for meter in meters]
+    assert assignments == [HashRing(4).shard_for(meter) for meter in meters]
+    assert min(Counter(assignments).values()) > 300
+
+    moved = sum(1 for meter, shard in zip(meters, assignments) if five.shard_for(meter) != shard)
+    assert moved < len(meters) * 0.35
+
+
+def test_supervisor_routes_each_meter_to_one_shard(monkeypatch) -> None:
+    monkeypatch.setenv("MQTT_HOST", "localhost")
+    monkeypatch.setenv("MQTT_TOPIC_PULSE", "pri/energy/+/pulseCount")
+    monkeypatch.setenv("KYZ_PULSES_PER_KWH", "1")
+    service = ShardedMqttService(LOGGER, worker_count=3)
+
+    for meter_id in ("press-1", "press-2", "press-1"):
+        service.handle_message(f"pri/energy/{meter_id}/pulseCount", b"d=1,c=2", datetime(2025, 1, 1, 12))
+
+    shard = service.meter_shards["press-1"]
+    assert service.dispatched[shard] >= 2
+    assert sum(service.dispatched) == 3
+    topic, payload, _ = service.inboxes[shard].get(timeout=5)
+    assert topic.startswith("pri/energy/")
+    assert payload == b"d=1,c=2"
+
+
+def test_supervisor_builds_no_sql_side_objects(monkeypatch) -> None:
+    monkeypatch.setenv("MQTT_HOST", "localhost")
+    monkeypatch.setenv("KYZ_PULSES_PER_KWH", "1")
+    service = ShardedMqttService(LOGGER, worker_count=2)
+
+    for name in ("writer", "ingestor", "checkpoint", "meters"):
+        assert not hasattr(service, name)
+
+    monkeypatch.setenv("KYZ_PULSES_PER_KWH", "0")
+    with pytest.raises(ConfigError):
+        ShardedMqttService(LOGGER, worker_count=2)
@@ -0,0 +1,84 @@
+import logging
+from datetime import datetime
+
+from ingest_spool import HEADER, RECORD, BucketSpool
+
+LOGGER = logging.getLogger("test")
+
+
+def _interval(minute: int, r17: bool = False, meter_id: str = "main") -> dict:
+    return {
+        "meterId": meter_id,
+        "intervalEnd": datetime(2025, 1, 1, 12, minute),
+        "pulseCount": 10 + minute,
+        "kWh": 1.5,
+        "kW": 6.0,
+        "total_kWh": 1234.5,
+        "r17Exclude": r17,
+        "kyzInvalidAlarm": False,
+    }
+
+
+def _live(second: int) -> dict:
+    return {"meterId": "main", "sampleEnd": datetime(2025, 1, 1, 12, 0, second), "pulseCount": 2, "kWh": 0.1, "kW": 24.0, "total_kWh": None}
+
+
+def test_spool_round_trips_records_and_survives_reopen(tmp_path) -> None:
+    path = tmp_path / "kyz.spool"
+    spool = BucketSpool(path, LOGGER)
+    assert spool.append_many("interval", [_interval(15, r17=True), _interval(30, meter_id="press-2")]) == 2
+    assert spool.append("live", _live(15))
+    spool.close()
+
+    reopened = BucketSpool(path, LOGGER)
+    records, next_offset = reopened.read_batch(10)
+
+    assert [kind for kind, _ in records] == ["interval", "interval", "live"]
+    assert records[0][1] == _interval(15, r17=True)
+    assert records[1][1] == _interval(30, meter_id="press-2")
+    assert records[2][1] == _live(15)
+
+    reopened.commit(next_offset)
+    assert reopened.pending() == 0
+    assert reopened.size_bytes() == HEADER.size
+
+
+def test_spool_resumes_from_committed_offset_and_truncates_torn_tail(tmp_path) -> None:
+    path = tmp_path / "kyz.spool"
+    spool = BucketSpool(path, LOGGER)
+    spool.append_many("interval", [_interval(15), _interval(30), _interval(45)])
+    records, next_offset = spool.read_batch(1)
+    spool.commit(next_offset)
+    spool.close()
+    with open(path, "ab") as handle:
+        handle.write(b"\x01\x02\x03")
+
+    reopened = BucketSpool(path, LOGGER)
+    records, _ = reopened.read_batch(10)
+
+    assert [payload["intervalEnd"].minute for _, payload in records] == [30, 45]
+    assert reopened.size_bytes() == HEADER.size + 3 * RECORD.size
+
+
+def test_spool_enforces_disk_budget_with_headroom_for_intervals(tmp_path) -> None:
+    spool = BucketSpool(tmp_path / "kyz.spool", LOGGER, max_bytes=HEADER.size + 4 * RECORD.size)
+
+    assert spool.append_many("live", [_live(second) for second in range(0, 60, 15)]) == 1
+    assert spool.append_many("interval", [_interval(15), _interval(30), _interval(45), _interval(0)]) == 3
+    assert spool.dropped == 4
+
+
+def test_compaction_during_an_uncommitted_batch_keeps_unreplayed_rows(tmp_path) -> None:
+    spool = BucketSpool(tmp_path / "kyz.spool", LOGGER, max_bytes=HEADER.size + 9 * RECORD.size)
+    spool.append_many("interval", [_interval(minute) for minute in range(8)])
+    _, next_offset = spool.read_batch(2)
+    spool.commit(next_offset)
+
+    in_flight, next_offset = spool.read_batch(2)
+    # The MQTT thread spools while the replay is writing to SQL; going over budget compacts the file.
+    assert spool.append_many("interval", [_interval(8), _interval(9)]) == 2
+    spool.commit(next_offset)
+
+    records, _ = spool.read_batch(10)
+    assert [payload["intervalEnd"].minute for _, payload in in_flight] == [2, 3]
+    assert [payload["intervalEnd"].minute for _, payload in records] == [4, 5, 6, 7, 8, 9]
@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from dashboard.api.live_cache import LiveSampleCache
+
+START = datetime(2026, 3, 1, 8, 0, 0)
+
+
+def _row(offset_samples: int, kw: float | None = 100.0):
+    return SimpleNamespace(
+        SampleEnd=START + timedelta(seconds=15 * offset_samples),
+        PulseCount=offset_samples,
+        kWh=0.5,
+        kW=kw,
+        Total_kWh=1000.0 + offset_samples,
+    )
+
+
+class _Source:
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.calls: list[datetime] = []
+
+    def __call__(self, since: datetime):
+        self.calls.append(since)
+        return [row for row in self.rows if row.SampleEnd >= since]
+
+
+def test_cache_fetches_incrementally_and_serves_slices() -> None:
+    source = _Source(_row(i) for i in range(240))
+    cache = LiveSampleCache(source, retention_seconds=7200, refresh_seconds=0, overlap_seconds=30)
+    now = START + timedelta(hours=1)
+
+    cache.refresh(now=now)
+    source.rows += [_row(i) for i in range(240, 244)] + [_row(100)]
+    cache.refresh(now=now + timedelta(minutes=1))
+
+    assert len(cache) == 244
+    assert source.calls[1] == START + timedelta(seconds=15 * 239 - 30)
+    assert cache.stats()["rowsFetched"] == 240 + 7
+    points = cache.series(START + timedelta(minutes=10), START + timedelta(minutes=11))
+    assert [point["t"] for point in points] == [(START + timedelta(seconds=15 * i)).isoformat() for i in range(40, 45)]
+    assert cache.latest() == {
+        "SampleEnd": (START + timedelta(seconds=15 * 243)).isoformat(),
+        "kW": 100.0,
+        "kWh": 0.5,
+        "PulseCount": 243,
+        "Total_kWh": 1243.0,
+    }
+
+
+def test_cache_inserts_late_rows_in_order_and_keeps_nulls() -> None:
+    source = _Source([_row(0), _row(2)])
+    cache = LiveSampleCache(source, retention_seconds=3600, refresh_seconds=0)
+    cache.refresh(now=START + timedelta(minutes=5))
+
+    source.rows.append(_row(1, kw=None))
+    cache.refresh(now=START + timedelta(minutes=5))
+
+    points = cache.series(START, START + timedelta(minutes=1))
+    assert [point["kW"] for point in points] == [100.0, None, 100.0]
+
+
+def test_cache_evicts_rows_older_than_retention() -> None:
+    source = _Source(_row(i) for i in range(400))
+    cache = LiveSampleCache(source, retention_seconds=600, refresh_seconds=0)
+    cache.refresh(now=START + timedelta(seconds=15 * 399))
+
+    assert len(cache) == 41
+    assert not cache.covers(START)
+    assert cache.covers(START + timedelta(seconds=15 * 399 - 300))
+
+    cache.refresh(now=START + timedelta(seconds=15 * 399 + 300))
+    assert len(cache) == 21
+    assert cache.series(START, START + timedelta(hours=2))[0]["t"] == (START + timedelta(seconds=15 * 379)).isoformat()
+
+
+def test_cache_serves_stale_rows_when_refresh_fails() -> None:
+    source = _Source([_row(0)])
+    cache = LiveSampleCache(source, retention_seconds=3600, refresh_seconds=0)
+    cache.refresh(now=START)
+
+    def broken(_since):
+        raise RuntimeError("connection reset")
+
+    cache._fetch_since = broken
+    cache.refresh(now=START)
+    assert cache.latest()["PulseCount"] == 0
+    assert cache.stats()["refreshFailures"] == 1
+
+    empty = LiveSampleCache(broken, retention_seconds=3600, refresh_seconds=0)
+    with pytest.raises(RuntimeError):
+        empty.refresh(now=START)
+
+
+def test_cache_ignores_rows_from_other_meters() -> None:
+    rows = [_row(i) for i in range(4)]
+    rows[1].MeterId = "sub-a"
+    rows[2].MeterId = "main"
+    cache = LiveSampleCache(_Source(rows), meter_id="main", retention_seconds=7200, refresh_seconds=0)
+
+    cache.refresh(now=START + timedelta(minutes=5))
+
+    assert len(cache) == 3
+    assert cache.stats()["meterId"] == "main"
+
+
+def test_live_fetch_does_not_need_the_meter_column(monkeypatch) -> None:
+    from dashboard.api import app
+
+    executed: list[str] = []
+
+    class _Conn:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return False
+
+        def cursor(self):
+            return SimpleNamespace(execute=lambda sql, *params: executed.append(sql), fetchall=lambda: [])
+
+    monkeypatch.setattr(app, "get_db_connection", lambda: _Conn())
+    app.fetch_live_samples_since(START)
+
+    # Databases without sql/008 or sql/011 have no MeterId column on KYZ_Live15s.
+    assert "MeterId" not in executed[0]
@@ -0,0 +1,53 @@
+import asyncio
+
+from dashboard.api.live_feed import LiveFeed, format_sse
+
+
+def test_live_feed_polls_once_for_all_subscribers_and_sends_changes_only() -> None:
+    snapshots = [
+        {"latest": {"IntervalEnd": "2026-03-01T10:00:00"}, "live": {"SampleEnd": "2026-03-01T10:00:15"}},
+        {"latest": {"IntervalEnd": "2026-03-01T10:00:00"}, "live": {"SampleEnd": "2026-03-01T10:00:30"}},
+    ]
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return snapshots[min(len(calls), len(snapshots)) - 1]
+
+    async def scenario() -> tuple[list[list[str]], list[str]]:
+        feed = LiveFeed(fetch, poll_seconds=0.01, heartbeat_seconds=60)
+        queues = [feed.subscribe() for _ in range(20)]
+        await asyncio.sleep(0.05)
+        late = feed.subscribe()
+        received = [[queue.get_nowait() for _ in range(3)] for queue in queues]
+        late_frames = [late.get_nowait(), late.get_nowait()]
+        for queue in queues + [late]:
+            feed.unsubscribe(queue)
+        await asyncio.sleep(0.03)
+        assert feed.stats()["subscribers"] == 0
+        return received, late_frames
+
+    received, late_frames = asyncio.run(scenario())
+
+    expected = [
+        format_sse("latest", snapshots[0]["latest"]),
+        format_sse("live", snapshots[0]["live"]),
+        format_sse("live", snapshots[1]["live"]),
+    ]
+    assert all(frames == expected for frames in received)
+    assert late_frames == [format_sse("latest", snapshots[1]["latest"]), format_sse("live", snapshots[1]["live"])]
+    # One poll per interval no matter how many subscribers are connected.
+    assert len(calls) < 20
+
+
+def test_live_feed_drops_oldest_frame_for_slow_subscriber() -> None:
+    async def scenario() -> list[str]:
+        feed = LiveFeed(lambda: {}, queue_size=2)
+        queue = feed.subscribe()
+        for index in range(4):
+            feed.publish(f"frame{index}")
+        feed.unsubscribe(queue)
+        assert feed.dropped == 2
+        return [queue.get_nowait(), queue.get_nowait()]
+
+    assert asyncio.run(scenario()) == ["frame2", "frame3"]
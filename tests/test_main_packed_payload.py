@@ -2,10 +2,12 @@ import pytest
 from datetime import datetime
 
 from main import (
+    BucketStore,
     bucket_end,
     compute_effective_pulse_delta,
     compute_energy_metrics,
     parse_packed_pulse_payload,
+    payload_looks_like_json,
 )
 
 
@@ -68,6 +70,19 @@ def test_parse_packed_payload_parses_boolean_string_variants() -> None:
     assert kyz_invalid_alarm is False
 
 
+def test_parse_packed_payload_fast_path_matches_general_parser() -> None:
+    assert parse_packed_pulse_payload("d=-2,c=99,r17Exclude=1") == parse_packed_pulse_payload(" d = -2 , c = 99 , r17Exclude = true ")
+    assert parse_packed_pulse_payload("d=0,c=5,kyzInvalidAlarm=1") == (0, 5, None, True)
+
+
+def test_payload_sniffing_routes_only_objects_and_arrays_to_json() -> None:
+    assert payload_looks_like_json(' \n{"d": 1}')
+    assert payload_looks_like_json("[1]")
+    assert not payload_looks_like_json("d=1,c=2")
+    assert not payload_looks_like_json("t=5")
+    assert not payload_looks_like_json("   ")
+
+
 def test_effective_delta_prefers_total_delta_when_available() -> None:
     effective_delta, new_last_total = compute_effective_pulse_delta(0, 108, 100)
 
@@ -103,6 +118,23 @@ def test_bucket_end_aligns_to_boundary() -> None:
     assert bucket_end(t2, 15) == datetime(2025, 1, 1, 12, 0, 15)
 
 
+def test_bucket_store_pops_closed_buckets_in_order() -> None:
+    store = BucketStore(15)
+    for second, delta, r17 in ((31, 2, None), (3, 1, False), (14, 4, True), (40, 5, None)):
+        store.add(int(datetime(2025, 1, 1, 12, 0, second).timestamp()), delta, r17, None)
+
+    assert store.pop_closed(datetime(2025, 1, 1, 12, 0, 14).timestamp()) == []
+    assert store.next_end_epoch() == int(datetime(2025, 1, 1, 12, 0, 15).timestamp())
+
+    closed = store.pop_closed(datetime(2025, 1, 1, 12, 0, 45).timestamp())
+
+    assert [(end.second, bucket.pulse_count, bucket.r17_exclude) for end, bucket in closed] == [
+        (15, 5, True),
+        (45, 7, None),
+    ]
+    assert len(store) == 0
+
+
 def test_compute_energy_metrics_uses_bucket_seconds() -> None:
     metrics = compute_energy_metrics(30, pulses_per_kwh=1000.0, bucket_seconds=15, pulse_total=1200)
 
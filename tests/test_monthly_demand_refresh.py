@@ -0,0 +1,55 @@
+import importlib.util
+from datetime import date, datetime
+from pathlib import Path
+
+from main import MONTHLY_DEMAND_MARK_SQL, ROLLUP_APPLY_SQL, IntervalIngestor
+
+_SCRIPT = Path(__file__).resolve().parents[1] / "scripts" / "windows" / "refresh_monthly_demand.py"
+
+
+def _load_script():
+    spec = importlib.util.spec_from_file_location("refresh_monthly_demand", _SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _interval(day: int) -> dict:
+    return {
+        "intervalEnd": datetime(2026, 1, day, 8, 15),
+        "pulseCount": 10,
+        "kWh": 2.5,
+        "kW": 10.0,
+        "total_kWh": 100.0,
+        "r17Exclude": False,
+        "kyzInvalidAlarm": False,
+    }
+
+
+def test_interval_batch_marks_earliest_changed_month() -> None:
+    ingestor = IntervalIngestor.__new__(IntervalIngestor)
+    ingestor.include_meter_id = False
+    ingestor.update_rollups = True
+    ingestor.mark_monthly_demand = True
+    captured: list = []
+    ingestor._execute_with_retry = lambda statements, key, label: captured.extend(statements) or 2  # type: ignore[method-assign]
+
+    ingestor.insert_interval_many([_interval(20), _interval(3)])
+
+    assert captured[-2][0] == ROLLUP_APPLY_SQL
+    assert captured[-1] == (MONTHLY_DEMAND_MARK_SQL, (datetime(2026, 1, 3, 8, 15),))
+
+    ingestor.mark_monthly_demand = False
+    captured.clear()
+    ingestor.insert_interval_many([_interval(3)])
+    assert all(sql != MONTHLY_DEMAND_MARK_SQL for sql, _ in captured)
+
+
+def test_refresh_script_modes() -> None:
+    script = _load_script()
+
+    assert script.build_refresh_call(False, None) == ("EXEC dbo.usp_KYZ_Refresh_MonthlyDemand;", ())
+    assert script.build_refresh_call(True, None) == ("EXEC dbo.usp_KYZ_Refresh_MonthlyDemand @Incremental = 1;", ())
+    sql, params = script.build_refresh_call(False, script.parse_month("2025-06"))
+    assert "@FromMonth = ?" in sql
+    assert params == (date(2025, 6, 1),)
@@ -0,0 +1,62 @@
+import logging
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from main import ConfigError, IntervalIngestor, MqttSqlService, meter_id_from_topic, parse_meter_pulses_per_kwh
+
+LOGGER = logging.getLogger("test")
+
+
+def test_meter_id_from_topic_uses_first_wildcard_segment() -> None:
+    assert meter_id_from_topic("pri/energy/+/pulseCount", "pri/energy/press-2/pulseCount") == "press-2"
+    assert meter_id_from_topic("pri/energy/+/pulseCount", "pri/energy/press-2/interval") is None
+    assert meter_id_from_topic("pri/energy/kyz/pulseCount", "pri/energy/kyz/pulseCount") is None
+
+
+def test_parse_meter_pulses_per_kwh_rejects_bad_entries() -> None:
+    assert parse_meter_pulses_per_kwh("main=0.5, press-2=2") == {"main": 0.5, "press-2": 2.0}
+    with pytest.raises(ConfigError):
+        parse_meter_pulses_per_kwh("press-2=0")
+    with pytest.raises(ConfigError):
+        parse_meter_pulses_per_kwh("press 2=1")
+
+
+def test_wildcard_topic_keeps_separate_state_per_meter(monkeypatch) -> None:
+    monkeypatch.setenv("MQTT_HOST", "localhost")
+    monkeypatch.setenv("MQTT_TOPIC_PULSE", "pri/energy/+/pulseCount")
+    monkeypatch.setenv("KYZ_PULSES_PER_KWH", "1")
+    monkeypatch.setenv("KYZ_METER_PULSES_PER_KWH", "press-2=2")
+    service = MqttSqlService(LOGGER, ingestor=None)  # type: ignore[arg-type]
+
+    for meter_id, payload in (("main", b"d=0,c=100"), ("press-2", b"d=0,c=500"), ("main", b"d=4,c=104"), ("press-2", b"d=6,c=506")):
+        service.on_message(None, None, SimpleNamespace(topic=f"pri/energy/{meter_id}/pulseCount", payload=payload))  # type: ignore[arg-type]
+    service._flush_closed_buckets(datetime(2100, 1, 1))
+
+    intervals = {}
+    while not service.writer.queue.empty():
+        kind, row, _ = service.writer.queue.get_nowait()
+        if kind == "interval":
+            intervals[row["meterId"]] = row
+    assert intervals["main"]["pulseCount"] == 4
+    assert intervals["main"]["kWh"] == 4.0
+    assert intervals["press-2"]["pulseCount"] == 6
+    assert intervals["press-2"]["kWh"] == 3.0
+    assert intervals["press-2"]["total_kWh"] == 253.0
+
+
+def test_meter_id_column_is_added_to_batch_key(monkeypatch) -> None:
+    ingestor = IntervalIngestor.__new__(IntervalIngestor)
+    ingestor.include_meter_id = True
+    captured = []
+    ingestor._execute_with_retry = lambda statements, key, label: captured.extend(statements) or 2  # type: ignore[method-assign]
+    row = {"sampleEnd": datetime(2025, 1, 1, 12, 0, 15), "pulseCount": 1, "kWh": 0.1, "kW": 24.0, "total_kWh": None}
+
+    result = ingestor.insert_live_many([{**row, "meterId": "main"}, {**row, "meterId": "press-2"}, {**row, "meterId": "main"}])
+
+    sql, params = captured[0]
+    assert "t.SampleEnd = v.SampleEnd AND t.MeterId = v.MeterId" in sql
+    assert params[-1] == "press-2"
+    assert result.inserted == 2
+    assert result.deduplicated == 1
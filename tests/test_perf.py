@@ -0,0 +1,113 @@
+import asyncio
+import contextvars
+import logging
+from types import SimpleNamespace
+
+from fastapi.responses import JSONResponse
+from starlette.requests import Request
+
+from dashboard.api.app import perf_middleware
+from dashboard.api.db_executor import DbExecutor
+from dashboard.api.perf import Histogram, PerfRecorder
+
+
+class _Lease:
+    def __init__(self, rows):
+        self.rows = rows
+        self.released = 0
+
+    def __enter__(self):
+        rows = self.rows
+        cursor = SimpleNamespace(execute=lambda sql, *params: None, fetchall=lambda: list(rows), fetchone=lambda: rows[0])
+        return SimpleNamespace(cursor=lambda: cursor)
+
+    def __exit__(self, exc_type, exc, tb):
+        self.released += 1
+        return False
+
+
+def _run_queries(recorder: PerfRecorder, lease: _Lease) -> None:
+    with recorder.lease(lease) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchall()
+        cursor.execute("SELECT 2").fetchone()
+
+
+def test_statements_are_labelled_by_caller_and_attributed_to_the_request() -> None:
+    recorder = PerfRecorder(slow_query_ms=10_000)
+    lease = _Lease([1, 2, 3])
+
+    def request() -> None:
+        trace = recorder.start_request()
+        trace.route = "/api/summary"
+        _run_queries(recorder, lease)
+        recorder.observe_request("GET", trace.route, 200, trace)
+
+    contextvars.copy_context().run(request)
+
+    stats = recorder.stats()
+    labels = list(stats["queries"])
+    assert len(labels) == 2 and all(label.startswith("_run_queries:") for label in labels)
+    assert sorted(query["rows"] for query in stats["queries"].values()) == [1, 3]
+    assert stats["queries"][labels[0]]["routes"] == ["/api/summary"]
+    route = stats["routes"]["GET /api/summary"]
+    assert route["latencyMs"]["count"] == 1
+    assert route["sqlQueriesAvg"] == 2 and route["rowsAvg"] == 4
+    assert stats["poolWaitMs"]["count"] == 1
+    assert lease.released == 1
+
+
+def test_slow_statements_are_logged_with_their_label(caplog) -> None:
+    recorder = PerfRecorder(slow_query_ms=0, logger=logging.getLogger("perf-test"))
+    with caplog.at_level(logging.WARNING, logger="perf-test"):
+        _run_queries(recorder, _Lease([1]))
+
+    assert [record.args[0].split(":")[0] for record in caplog.records] == ["_run_queries", "_run_queries"]
+    assert all(query["slow"] == 1 for query in recorder.stats()["queries"].values())
+
+
+def test_trace_follows_handlers_onto_db_executor_threads() -> None:
+    recorder = PerfRecorder()
+    executor = DbExecutor(max_workers=2)
+
+    async def request() -> dict:
+        trace = recorder.start_request()
+        await executor.run("/api/billing", _run_queries, recorder, _Lease([1, 2]))
+        return {"queries": trace.sql_queries, "rows": trace.rows}
+
+    try:
+        assert asyncio.run(request()) == {"queries": 2, "rows": 3}
+    finally:
+        executor.close()
+
+
+def test_histogram_quantiles_and_prometheus_text() -> None:
+    hist = Histogram()
+    for ms in (3, 7, 7, 40, 900):
+        hist.observe(ms)
+    assert hist.quantile(0.5) == 10
+    assert hist.quantile(0.99) == 900
+
+    recorder = PerfRecorder()
+    _run_queries(recorder, _Lease([1]))
+    text = recorder.prometheus({"kyz_cache_hit_ratio": 0.75, "kyz_db_pool_in_use": None})
+    assert '# TYPE kyz_sql_statement_duration_seconds histogram' in text
+    assert 'le="+Inf"' in text
+    assert "kyz_cache_hit_ratio 0.75" in text
+    assert "kyz_db_pool_in_use" not in text
+
+
+def test_middleware_records_route_template(monkeypatch) -> None:
+    recorder = PerfRecorder()
+    monkeypatch.setattr("dashboard.api.app.perf", recorder)
+    scope = {"type": "http", "method": "GET", "path": "/api/quality", "query_string": b"", "headers": []}
+
+    async def call_next(request):
+        request.scope["route"] = SimpleNamespace(path="/api/quality")
+        return JSONResponse({"ok": True})
+
+    response = asyncio.run(perf_middleware(Request(scope), call_next))
+
+    assert response.status_code == 200
+    assert recorder.stats()["routes"]["GET /api/quality"]["statuses"] == {"200": 1}
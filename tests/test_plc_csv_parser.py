@@ -1,6 +1,9 @@
+from datetime import datetime
 from pathlib import Path
 
-from plc_csv import parse_plc_csv
+import pytest
+
+from plc_csv import iter_plc_csv, iter_plc_csv_columns, parse_plc_csv
 
 
 def test_parse_plc_csv_mapping_and_dedupe(tmp_path: Path) -> None:
@@ -26,3 +29,50 @@ def test_parse_plc_csv_mapping_and_dedupe(tmp_path: Path) -> None:
 
     second = rows[1]
     assert str(second["IntervalEnd"]) == "2026-02-25 16:00:00"
+
+
+_HEADER = "Date, Time, counter15min, LastEnergyUsage, LastDemand, TotalEnergyUsed, R17_Last_ExcludeDemand, KYZ_InvalidAlarm\n"
+
+
+def test_streaming_and_columnar_parsers_keep_file_order(tmp_path: Path) -> None:
+    path = tmp_path / "plc.csv"
+    path.write_text(
+        _HEADER
+        + "12/31/2025, 23:45:00.5, 10, 2.5, 10, 100, OFF - 0, ON - 1\n"
+        + "\n"
+        + "1/1/2026, 0:00:00, 12, 3, 12, 103, ON - 1, OFF - 0\n"
+        + "12/31/2025, 23:45:00, 11, 2.75, 11, 101, OFF - 0, OFF - 0\n",
+        encoding="utf-8",
+    )
+
+    rows = list(iter_plc_csv(path))
+    assert [row["IntervalEnd"] for row in rows] == [datetime(2025, 12, 31, 23, 45), datetime(2026, 1, 1), datetime(2025, 12, 31, 23, 45)]
+    assert [row["PulseCount"] for row in parse_plc_csv(path)] == [11, 12]
+
+    chunks = list(iter_plc_csv_columns(path, chunk_rows=2))
+    assert [len(chunk["IntervalEnd"]) for chunk in chunks] == [2, 1]
+    assert chunks[0]["IntervalEnd"][1] == int((datetime(2026, 1, 1) - datetime(1970, 1, 1)).total_seconds())
+    assert list(chunks[0]["R17Exclude"]) == [0, 1]
+    assert list(chunks[0]["KyzInvalidAlarm"]) == [1, 0]
+
+
+def test_numpy_columns_are_zero_copy_views(tmp_path: Path) -> None:
+    np = pytest.importorskip("numpy")
+    path = tmp_path / "plc.csv"
+    path.write_text(_HEADER + "2/25/2026, 15:45:00, 538, 915, 3660, 966067, OFF - 0, ON - 1\n", encoding="utf-8")
+
+    (chunk,) = iter_plc_csv_columns(path, as_numpy=True)
+
+    assert chunk["IntervalEnd"][0] == np.datetime64("2026-02-25T15:45:00")
+    assert chunk["kW"].dtype == np.float64
+
+
+def test_bad_timestamps_and_missing_columns_are_rejected(tmp_path: Path) -> None:
+    path = tmp_path / "plc.csv"
+    path.write_text(_HEADER + "2/25/2026, 25:00:00, 1, 1, 1, 1, 0, 0\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        parse_plc_csv(path)
+
+    path.write_text("Date, Time\n2/25/2026, 15:45:00\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="counter15min"):
+        parse_plc_csv(path)
@@ -0,0 +1,83 @@
+import importlib.util
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+_SCRIPT = Path(__file__).resolve().parents[1] / "scripts" / "windows" / "plc_csv_sync.py"
+
+
+def _load_script():
+    spec = importlib.util.spec_from_file_location("plc_csv_sync", _SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class _Cursor:
+    def __init__(self, result):
+        self.result = result
+        self.executed: list = []
+        self.batches: list = []
+        self.fast_executemany = False
+
+    def execute(self, sql, *params):
+        self.executed.append(sql)
+
+    def setinputsizes(self, sizes):
+        self.sizes = sizes
+
+    def executemany(self, sql, params):
+        self.batches.append(params)
+
+    def fetchone(self):
+        return self.result
+
+
+def _rows(count: int):
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        yield {
+            "IntervalEnd": start + timedelta(minutes=15 * i),
+            "PulseCount": i,
+            "kWh": 1.5,
+            "kW": 6.0,
+            "Total_kWh": 100.0 + i,
+            "R17Exclude": 0,
+            "KyzInvalidAlarm": 0,
+        }
+
+
+def test_rows_are_staged_in_batches_then_merged_once() -> None:
+    module = _load_script()
+    changed = datetime(2024, 1, 1, 2, 0)
+    cursor = _Cursor(
+        SimpleNamespace(
+            staged=25,
+            interval_min=datetime(2024, 1, 1),
+            interval_max=datetime(2024, 1, 1, 6, 0),
+            inserted=4,
+            updated=6,
+            changed_min=changed,
+            changed_max=changed,
+        )
+    )
+
+    result = module.upsert_intervals(cursor, _rows(25), batch_size=10)
+
+    assert [len(batch) for batch in cursor.batches] == [10, 10, 5]
+    assert cursor.fast_executemany
+    assert len(cursor.sizes) == len(cursor.batches[0][0])
+    assert cursor.executed == [module.STAGE_PREPARE_SQL, module.STAGE_MERGE_SQL]
+    assert (result.inserted, result.updated, result.unchanged) == (4, 6, 15)
+    assert result.changed_min == changed
+    assert result.interval_max == datetime(2024, 1, 1, 6, 0)
+
+
+def test_empty_file_touches_nothing() -> None:
+    module = _load_script()
+    cursor = _Cursor(None)
+
+    result = module.upsert_intervals(cursor, [])
+
+    assert cursor.executed == [] and cursor.batches == []
+    assert result.unchanged == 0 and result.changed_min is None
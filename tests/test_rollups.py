@@ -0,0 +1,84 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from dashboard.api.app import build_rollup_billing_query, get_billing, get_daily
+from main import ROLLUP_APPLY_SQL, IntervalIngestor
+
+
+def _interval(minute: int) -> dict:
+    return {
+        "intervalEnd": datetime(2026, 2, 28, 23, minute),
+        "pulseCount": 10,
+        "kWh": 2.5,
+        "kW": 10.0,
+        "total_kWh": 100.0,
+        "r17Exclude": False,
+        "kyzInvalidAlarm": False,
+    }
+
+
+def _ingestor(update_rollups: bool) -> tuple[IntervalIngestor, list]:
+    ingestor = IntervalIngestor.__new__(IntervalIngestor)
+    ingestor.include_meter_id = False
+    ingestor.update_rollups = update_rollups
+    ingestor.mark_monthly_demand = False
+    captured: list = []
+    ingestor._execute_with_retry = lambda statements, key, label: captured.extend(statements) or 2  # type: ignore[method-assign]
+    return ingestor, captured
+
+
+def test_interval_batch_refreshes_rollups_in_same_transaction() -> None:
+    ingestor, captured = _ingestor(update_rollups=True)
+
+    ingestor.insert_interval_many([_interval(45), _interval(15), _interval(30)])
+
+    assert captured[-1] == (ROLLUP_APPLY_SQL, (datetime(2026, 2, 28, 23, 15), datetime(2026, 2, 28, 23, 45)))
+    assert len(captured) == 2
+
+    ingestor, captured = _ingestor(update_rollups=False)
+    ingestor.insert_interval_many([_interval(15)])
+    assert all("usp_KYZ_ApplyRollups" not in sql for sql, _ in captured)
+
+
+class _Conn:
+    def __init__(self, rows):
+        self.executed: list = []
+        self._rows = rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def cursor(self):
+        return SimpleNamespace(execute=lambda sql, *params: self.executed.append((sql, params)), fetchall=lambda: self._rows)
+
+
+def test_daily_and_billing_read_rollups_when_enabled(monkeypatch) -> None:
+    monkeypatch.setenv("DASHBOARD_USE_ROLLUPS", "true")
+    monkeypatch.setattr("dashboard.api.app.cache.get_or_set", lambda key, ttl_seconds, producer, stale_seconds=None: producer())
+    monkeypatch.setattr("dashboard.api.app.get_billing_anchor", lambda: None)
+    conn = _Conn([SimpleNamespace(date=datetime(2026, 3, 1).date(), kWh_sum=2400.0, kW_peak=410.0, interval_count=96)])
+    monkeypatch.setattr("dashboard.api.app.get_db_connection", lambda: conn)
+
+    daily = get_daily(7)
+    assert daily["days"] == [{"date": "2026-03-01", "kWh_sum": 2400.0, "kW_peak": 410.0, "interval_count": 96}]
+
+    conn._rows = [SimpleNamespace(month_start=datetime(2026, 3, 1).date(), top3_avg_kW=400.0, energy_kWh=2400.0)]
+    billing = get_billing(12)
+    assert billing["months"][0]["top3AvgKW"] == 400.0
+
+    assert "dbo.KYZ_RollupDaily" in conn.executed[0][0]
+    assert "dbo.KYZ_RollupMonthly" in conn.executed[1][0]
+    assert all("dbo.KYZ_Interval" not in sql for sql, _ in conn.executed)
+
+
+def test_rollup_billing_query_binds_anchor_for_billing_periods() -> None:
+    anchor = datetime(2026, 1, 17)
+
+    sql, params = build_rollup_billing_query("billing", 24, anchor)
+
+    assert "dbo.KYZ_RollupDaily" in sql
+    assert sql.count("?") == len(params) == 7
+    assert params == (24,) + (anchor,) * 6
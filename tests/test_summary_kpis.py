@@ -0,0 +1,158 @@
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pyodbc
+
+import dashboard.api.app as app_module
+from dashboard.api.app import KPI_PROC_RETRY_SECONDS, SUMMARY_KPI_COLUMNS, fetch_summary_kpis, get_summary
+
+LAST_UPDATED = datetime(2026, 3, 12, 9, 45)
+
+
+def _proc_row(**overrides) -> SimpleNamespace:
+    values = dict.fromkeys(SUMMARY_KPI_COLUMNS, None)
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+class _Cursor:
+    """Answers usp_KYZ_KpiContext with ``proc`` (an exception is raised) and every inline query with ``inline``."""
+
+    def __init__(self, proc, inline=None):
+        self.proc = proc
+        self.inline = inline
+        self.queries: list[str] = []
+        self.params: tuple = ()
+        self._result = None
+
+    def execute(self, query: str, *params) -> None:
+        self.queries.append(query)
+        if "usp_KYZ_KpiContext" in query:
+            self.params = params
+            if isinstance(self.proc, Exception):
+                raise self.proc
+            self._result = self.proc
+            return
+        self._result = self.inline
+
+    def fetchone(self):
+        return self._result
+
+    def fetchall(self):
+        return [self._result] if self._result is not None else []
+
+
+class _Conn:
+    def __init__(self, cursor: _Cursor):
+        self._cursor = cursor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def cursor(self):
+        return self._cursor
+
+
+def _billing(months: int = 24, basis: str = "calendar") -> dict:
+    month = {"top3AvgKW": 500.0, "ratchetFloorKW": 300.0, "billedDemandKW": 500.0, "demandCost": 12370.0}
+    return {"basis": "calendar", "months": [month, dict(month, top3AvgKW=520.0)]}
+
+
+def _missing_proc() -> pyodbc.Error:
+    return pyodbc.Error("42000", "Could not find stored procedure 'dbo.usp_KYZ_KpiContext'")
+
+
+def test_summary_uses_single_kpi_procedure_call(monkeypatch) -> None:
+    cursor = _Cursor(_proc_row(latest_kw=412.0, today_kwh=3650.0, last_updated=LAST_UPDATED))
+    monkeypatch.setattr(app_module, "_kpi_proc_retry_at", 0.0)
+    monkeypatch.setattr(app_module, "get_db_connection", lambda: _Conn(cursor))
+    monkeypatch.setattr(app_module, "get_billing", _billing)
+    monkeypatch.setattr(app_module, "get_billing_anchor", lambda: None)
+
+    payload = get_summary()
+
+    assert cursor.queries == ["EXEC dbo.usp_KYZ_KpiContext @MeterId = ?"]
+    assert cursor.params == ("main",)
+    assert payload["currentKW"] == 412.0
+    assert payload["todayKWh"] == 3650.0
+    assert payload["todayPeakKW"] == 0.0  # NULL from the proc falls back like the inline path
+    assert payload["lastUpdated"] == LAST_UPDATED.isoformat()
+
+
+def test_procedure_columns_are_mapped_to_floats_and_nulls_kept(monkeypatch) -> None:
+    monkeypatch.setattr(app_module, "_kpi_proc_retry_at", 0.0)
+    row = _proc_row(latest_kw=Decimal("412.50"), mtd_kwh=41200, max_kw_11mo=612.0, last_updated=LAST_UPDATED)
+
+    kpis = fetch_summary_kpis(_Cursor(row))
+
+    assert list(kpis) == list(SUMMARY_KPI_COLUMNS)
+    assert kpis["latest_kw"] == 412.5 and type(kpis["latest_kw"]) is float
+    assert kpis["mtd_kwh"] == 41200.0 and type(kpis["mtd_kwh"]) is float
+    assert kpis["last_updated"] is LAST_UPDATED
+    assert kpis["prev_kw"] is None and kpis["live_kw_avg_5m"] is None
+
+
+def test_missing_procedure_falls_back_to_inline_queries_and_backs_off(monkeypatch) -> None:
+    monkeypatch.setattr(app_module, "_kpi_proc_retry_at", 0.0)
+    monkeypatch.setattr(app_module.time, "monotonic", lambda: 1000.0)
+    cursor = _Cursor(_missing_proc(), inline=None)
+
+    kpis = fetch_summary_kpis(cursor)
+
+    # Empty tables: every inline query returns no row, and every KPI is None rather than 0.
+    assert kpis == dict.fromkeys(SUMMARY_KPI_COLUMNS, None)
+    assert len(cursor.queries) == 1 + 8
+    assert app_module._kpi_proc_retry_at == 1000.0 + KPI_PROC_RETRY_SECONDS
+
+
+def test_procedure_is_retried_only_after_the_back_off_window(monkeypatch) -> None:
+    monkeypatch.setattr(app_module, "_kpi_proc_retry_at", 0.0)
+    clock = [1000.0]
+    monkeypatch.setattr(app_module.time, "monotonic", lambda: clock[0])
+    fetch_summary_kpis(_Cursor(_missing_proc()))
+
+    clock[0] += KPI_PROC_RETRY_SECONDS - 1
+    waiting = _Cursor(_proc_row(latest_kw=1.0))
+    assert fetch_summary_kpis(waiting)["latest_kw"] is None
+    assert not any("usp_KYZ_KpiContext" in query for query in waiting.queries)
+
+    clock[0] += 1
+    retried = _Cursor(_proc_row(latest_kw=1.0))
+    assert fetch_summary_kpis(retried)["latest_kw"] == 1.0
+    assert len(retried.queries) == 1
+
+
+def test_old_procedure_without_every_column_falls_back(monkeypatch) -> None:
+    monkeypatch.setattr(app_module, "_kpi_proc_retry_at", 0.0)
+    old_row = SimpleNamespace(latest_kw=412.0)  # pre single-pass procedure: AttributeError on the rest
+    inline = SimpleNamespace(
+        kW=398.0,
+        todayKwh=None,
+        todayPeakKw=None,
+        mtdKwh=None,
+        lastUpdated=None,
+        avg_kw_5m=None,
+        yday_kwh_to_time=None,
+        avg_daily_kwh_30d=None,
+        max_kw=None,
+    )
+    cursor = _Cursor(old_row, inline=inline)
+
+    kpis = fetch_summary_kpis(cursor)
+
+    assert kpis["latest_kw"] == 398.0 and kpis["current_kw"] == 398.0
+    assert len(cursor.queries) == 1 + 8
+
+
+def test_procedure_without_a_row_uses_inline_queries_without_backing_off(monkeypatch) -> None:
+    monkeypatch.setattr(app_module, "_kpi_proc_retry_at", 0.0)
+    cursor = _Cursor(None, inline=None)
+
+    fetch_summary_kpis(cursor)
+
+    assert len(cursor.queries) == 1 + 8
+    assert app_module._kpi_proc_retry_at == 0.0
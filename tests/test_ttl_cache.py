@@ -0,0 +1,86 @@
+import threading
+import time
+
+from dashboard.api.ttl_cache import TTLCache
+
+
+def test_concurrent_misses_share_one_producer_call() -> None:
+    cache = TTLCache()
+    release = threading.Event()
+    calls: list[int] = []
+
+    def producer() -> str:
+        calls.append(1)
+        release.wait(2)
+        return "payload"
+
+    results: list[str] = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_set("k", 30, producer))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 2
+    while cache.stats()["coalesced"] < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["payload"] * 5
+    assert len(calls) == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_expired_entry_is_served_stale_while_refreshing() -> None:
+    cache = TTLCache(stale_seconds=60)
+    cache.get_or_set("k", 0, lambda: "old")
+    refreshed = threading.Event()
+
+    def producer() -> str:
+        refreshed.set()
+        return "new"
+
+    assert cache.get_or_set("k", 30, producer) == "old"
+    assert refreshed.wait(2)
+    deadline = time.monotonic() + 2
+    while cache.stats()["refreshes"] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.get_or_set("k", 30, lambda: "unused") == "new"
+    assert cache.stats()["staleHits"] == 1
+    cache.close()
+
+
+def test_failed_refresh_keeps_stale_payload() -> None:
+    cache = TTLCache(stale_seconds=60)
+    cache.get_or_set("k", 0, lambda: "old")
+
+    def broken() -> str:
+        raise RuntimeError("db down")
+
+    assert cache.get_or_set("k", 30, broken) == "old"
+    deadline = time.monotonic() + 2
+    while cache.stats()["refreshFailures"] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.stats()["refreshFailures"] == 1
+    assert cache.get_or_set("k", 30, lambda: "new") == "old"
+    cache.close()
+
+
+def test_lru_bound_evicts_least_recently_used_key() -> None:
+    cache = TTLCache(max_entries=2)
+    cache.get_or_set("a", 30, lambda: 1)
+    cache.get_or_set("b", 30, lambda: 2)
+    cache.get_or_set("a", 30, lambda: 0)
+    cache.get_or_set("c", 30, lambda: 3)
+
+    assert cache.get_or_set("a", 30, lambda: "again") == 1
+    assert cache.get_or_set("b", 30, lambda: "again") == "again"
+    assert cache.stats()["evictions"] == 2
+
+
+def test_expired_entries_are_not_served_stale_unless_the_caller_opts_in() -> None:
+    cache = TTLCache()
+    cache.get_or_set("k", 0, lambda: "old")
+    assert cache.get_or_set("k", 30, lambda: "new") == "new"
+
+    cache.get_or_set("opt-in", 0, lambda: "old", stale_seconds=60)
+    assert cache.get_or_set("opt-in", 30, lambda: "new", stale_seconds=60) == "old"